@@ -0,0 +1,189 @@
+# Near-duplicate answer cache for search summaries. Queries are reduced to a MinHash
+# signature over character n-grams of their content words, so "Austin weather today" and
+# "what's the weather in Austin" share one cached summary. Words that change what is being
+# asked about (names, products, "not", "from boston to denver", "uninstall") must agree
+# exactly, so a similar question about a different thing never gets this answer. Runs fully offline.
+import os
+import re
+import time
+import zlib
+import random
+import logging
+from datetime import date
+from collections import OrderedDict
+
+from .textUtils import normalize_dates, tokenize, light_stem, NEGATION_WORDS, DIRECTION_WORDS
+from .searchCache import is_temporal_query, TEMPORAL_TTL
+
+logger = logging.getLogger("AnswerCache")
+logger.setLevel(logging.INFO)
+
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.85"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", str(24 * 3600)))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "256"))
+
+NUM_PERMUTATIONS = 64
+SHINGLE_CHARS = 3
+# Verbs with these prefixes usually mean the opposite of the bare verb: install/uninstall
+NEGATING_PREFIXES = ("un", "dis", "non")
+NEGATING_PREFIX_MIN_LENGTH = 6
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(1337)  # fixed seed keeps signatures comparable across processes
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+                 for _ in range(NUM_PERMUTATIONS)]
+
+ISO_DATE = re.compile(r'\d{4}-\d{2}-\d{2}')
+
+# Everyday query words that rephrasings add, drop or inflect. Any other content word is
+# taken to name the thing asked about (ibuprofen, ubuntu, iphone, austin) and guards the match.
+COMMON_QUERY_WORDS = frozenset(light_stem(word) for word in """
+best top good great bad cheap cheapest free new latest current today tonight tomorrow yesterday
+now near nearby around local open hours price cost much many long far big small fast easy quick
+simple how way guide tutorial tip step example help learn meaning definition mean difference
+compare comparison vs versus review list idea option alternative install setup set update
+upgrade fix reset change remove delete add make use using get buy sell cook start stop run close
+turn enable disable connect download work working play watch read write side effect symptom
+dose dosage treatment cause child children kid baby adult people person year old age day week
+month time hour minute server computer laptop phone password account app application error
+problem issue setting file version weather forecast temperature rain news score restaurant
+place food recipe movie show game event store hotel flight ticket city
+""".split())
+# Answers that only describe a failure should never be replayed
+ERROR_PREFIXES = ("An error occurred", "Sorry, I")
+
+
+def word_shingles(word: str) -> set:
+    """Character n-grams of a word with its boundaries marked, so "place" and "places" overlap"""
+    padded = f" {word} "
+    return {padded[i:i + SHINGLE_CHARS] for i in range(max(1, len(padded) - SHINGLE_CHARS + 1))}
+
+
+def query_signature(query: str) -> tuple:
+    """Return (minhash signature, guard tokens) for a processed query.
+    Shingles are character n-grams of the content words, plus each direction word bound to
+    the word after it, so "from boston to denver" and "from denver to boston" differ. Guard
+    tokens must agree for two queries to match: dates, numbers, negations bound to the word
+    they negate, negated verbs such as "uninstall", and every content word that isn't an
+    everyday query word."""
+    normalized = normalize_dates(query.lower())
+    iso_dates = ISO_DATE.findall(normalized)
+    tokens = tokenize(ISO_DATE.sub(" ", normalized), keep=NEGATION_WORDS | DIRECTION_WORDS)
+    numbers = [token for token in tokens if any(ch.isdigit() for ch in token)]
+    guards = set(iso_dates + numbers)
+    if not guards and is_temporal_query(query):
+        # "weather in austin" means today, the same as "austin weather today" once its date is resolved
+        guards.add(date.today().isoformat())
+
+    shingles = set()
+    for position, token in enumerate(tokens):
+        if token in numbers:
+            continue
+        if token in NEGATION_WORDS or token in DIRECTION_WORDS:
+            following = next((t for t in tokens[position + 1:]
+                              if t not in NEGATION_WORDS and t not in DIRECTION_WORDS), "")
+            binding = f"{token} {light_stem(following)}"
+            (guards if token in NEGATION_WORDS else shingles).add(binding)
+            continue
+        word = light_stem(token)
+        if word not in COMMON_QUERY_WORDS or \
+                (word.startswith(NEGATING_PREFIXES) and len(word) >= NEGATING_PREFIX_MIN_LENGTH):
+            guards.add(word)
+        shingles.update(word_shingles(word))
+
+    hashes = [zlib.crc32(shingle.encode("utf-8")) for shingle in shingles]
+    if not hashes:
+        return None, frozenset(guards)
+    signature = tuple(
+        min((a * h + b) % _MERSENNE_PRIME for h in hashes)
+        for a, b in _PERMUTATIONS
+    )
+    return signature, frozenset(guards)
+
+
+def estimated_similarity(first: tuple, second: tuple) -> float:
+    """MinHash estimate of the Jaccard similarity between two shingle sets"""
+    return sum(1 for x, y in zip(first, second) if x == y) / NUM_PERMUTATIONS
+
+
+class AnswerCache:
+    """LRU cache of summaries looked up by query similarity rather than exact key"""
+
+    def __init__(self, threshold: float = ANSWER_CACHE_THRESHOLD, ttl: float = ANSWER_CACHE_TTL,
+                 max_entries: int = ANSWER_CACHE_MAX_ENTRIES) -> None:
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._next_id = 0
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, query: str):
+        """Return the cached entry for the most similar recent query, or None"""
+        signature, guards = query_signature(query)
+        if signature is None:
+            return None
+
+        now = time.time()
+        best_id, best_similarity = None, 0.0
+        for entry_id, entry in list(self._entries.items()):
+            if entry["expires_at"] <= now:
+                del self._entries[entry_id]
+                continue
+            # Different dates, numbers or subjects mean a different question, however similar the words
+            if guards != entry["guards"]:
+                continue
+            similarity = estimated_similarity(signature, entry["signature"])
+            if similarity > best_similarity:
+                best_id, best_similarity = entry_id, similarity
+
+        if best_id is None or best_similarity < self.threshold:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(best_id)
+        entry = self._entries[best_id]
+        logger.info(f"Answer cache hit for '{query}' ~ '{entry['query']}' (similarity {best_similarity:.2f})")
+        return entry
+
+    def store(self, query: str, answer: str, results: list = None, original_query: str = None):
+        if not answer or answer.startswith(ERROR_PREFIXES):
+            return
+        signature, guards = query_signature(query)
+        if signature is None:
+            return
+        ttl = min(self.ttl, TEMPORAL_TTL) if is_temporal_query(original_query, query) else self.ttl
+        self._entries[self._next_id] = {
+            "query": query,
+            "signature": signature,
+            "guards": guards,
+            "answer": answer,
+            "results": results or [],
+            "expires_at": time.time() + ttl,
+        }
+        self._next_id += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def record_stream(self, chunks, query: str, results: list = None, original_query: str = None):
+        """Pass a streamed answer through and cache its full text once it completes"""
+        parts = []
+        async for chunk in chunks:
+            parts.append(chunk)
+            yield chunk
+        # A stream that failed part way ends with an apology rather than starting with one
+        if not any(part.startswith(ERROR_PREFIXES) for part in parts):
+            self.store(query, " ".join(parts), results, original_query)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "entries": len(self._entries),
+        }
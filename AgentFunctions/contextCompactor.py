@@ -0,0 +1,221 @@
+# Rolling compaction of the voice agent's chat context. The last few turns stay verbatim,
+# older turns are folded into a running summary written by a background task, stale tool
+# results shrink to short references and the whole prompt is held under a token ceiling.
+# Everything on the reply path is local work, so time-to-first-token doesn't grow with
+# the length of the session.
+import os
+import asyncio
+import logging
+from functools import lru_cache
+
+import aiohttp
+from livekit.agents import llm
+
+from .httpClient import get_http_pool, OPENAI_CHAT_URL
+from .memoryStore import message_text
+from .promptBudget import count_tokens, truncate_to_tokens, DEFAULT_MODEL
+
+logger = logging.getLogger("ContextCompactor")
+logger.setLevel(logging.INFO)
+
+openai_api_key = os.getenv("OPENAI_API_KEY")
+
+CONTEXT_COMPACTION = os.getenv("CONTEXT_COMPACTION", "1") == "1"
+CONTEXT_KEEP_TURNS = int(os.getenv("CONTEXT_KEEP_TURNS", "6"))
+CONTEXT_TOKEN_CEILING = int(os.getenv("CONTEXT_TOKEN_CEILING", "6000"))
+CONTEXT_SUMMARY_TOKENS = int(os.getenv("CONTEXT_SUMMARY_TOKENS", "300"))
+FRESH_TOOL_TURNS = 2  # tool results in this many latest turns are never collapsed
+TOOL_REFERENCE_TOKENS = 40
+PENDING_NOTE_TOKENS = 40
+MESSAGE_OVERHEAD_TOKENS = 4
+SUMMARY_HEADER = "Summary of the earlier conversation:"
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a voice conversation between a user and their assistant. "
+    "Merge the new exchanges into the existing summary. Keep names, places, numbers, decisions, "
+    "open questions and what each tool found; drop small talk. Write plain sentences, no lists, "
+    "at most {words} words."
+)
+
+
+@lru_cache(maxsize=4096)
+def _cached_tokens(text: str) -> int:
+    return count_tokens(text, DEFAULT_MODEL)
+
+
+def message_tokens(message) -> int:
+    """Prompt tokens for one ChatMessage, including any tool call arguments"""
+    tokens = MESSAGE_OVERHEAD_TOKENS + _cached_tokens(message_text(message))
+    for call in getattr(message, "tool_calls", None) or ():
+        tokens += _cached_tokens(f"{call.function_info.name} {call.raw_arguments}")
+    return tokens
+
+
+def is_summary(message) -> bool:
+    return message.role == "system" and message_text(message).startswith(SUMMARY_HEADER)
+
+
+def transcript_line(message) -> str:
+    """One line of plain transcript for the summarizer"""
+    text = message_text(message)
+    if message.role == "tool":
+        return f"Tool {message.name or 'result'}: {text}"
+    if getattr(message, "tool_calls", None):
+        names = ", ".join(call.function_info.name for call in message.tool_calls)
+        return f"Assistant called: {names}" + (f" ({text})" if text else "")
+    return f"{message.role.capitalize()}: {text}" if text else ""
+
+
+def split_turns(messages: list) -> list:
+    """Group message indices into turns; each turn starts at a user message. A tool call and
+    its results always land in the same turn, so folding whole turns never orphans either."""
+    turns = []
+    for index, message in enumerate(messages):
+        if message.role == "user" or not turns:
+            turns.append([])
+        turns[-1].append(index)
+    return turns
+
+
+class ContextCompactor:
+    """Keep a VoicePipelineAgent's chat context bounded for sessions of any length"""
+
+    def __init__(self, keep_turns: int = CONTEXT_KEEP_TURNS, token_ceiling: int = CONTEXT_TOKEN_CEILING,
+                 summary_tokens: int = CONTEXT_SUMMARY_TOKENS, summarizer=None) -> None:
+        self.keep_turns = max(1, keep_turns)
+        self.token_ceiling = token_ceiling
+        self.summary_tokens = summary_tokens
+        # async (previous summary, transcript lines) -> new summary; defaults to gpt-4o-mini
+        self.summarizer = summarizer or self._summarize_with_openai
+        self.summary = ""
+        self._pending = []  # transcript lines folded out but not summarized yet
+        self._task = None
+
+    def summary_text(self) -> str:
+        """The running summary plus short notes for turns still waiting on the summarizer"""
+        notes = [truncate_to_tokens(line, PENDING_NOTE_TOKENS) for line in self._pending]
+        text = "\n".join(part for part in [self.summary] + notes if part)
+        return truncate_to_tokens(text, self.summary_tokens * 2)
+
+    def compact(self, messages: list) -> list:
+        """Compacted copy of a message list; the turns it drops are handed to the summarizer"""
+        prefix_end = 0
+        while prefix_end < len(messages) and messages[prefix_end].role == "system" \
+                and not is_summary(messages[prefix_end]):
+            prefix_end += 1
+        prefix = messages[:prefix_end]
+        body = [m for m in messages[prefix_end:] if not is_summary(m)]
+        turns = [[body[i] for i in turn] for turn in split_turns(body)]
+
+        folded = turns[:-self.keep_turns]
+        kept = turns[-self.keep_turns:]
+
+        # Tool results the conversation has moved past become short references
+        for turn in kept[:-FRESH_TOOL_TURNS]:
+            for position, message in enumerate(turn):
+                if message.role == "tool" and message_tokens(message) > TOOL_REFERENCE_TOKENS * 2:
+                    turn[position] = self._tool_reference(message)
+
+        # Hard ceiling: fold the oldest kept turns, then cut the biggest tool results in what's left
+        fixed = sum(message_tokens(m) for m in prefix) + MESSAGE_OVERHEAD_TOKENS + self.summary_tokens * 2
+        sizes = [sum(message_tokens(m) for m in turn) for turn in kept]
+        while len(kept) > 1 and fixed + sum(sizes) > self.token_ceiling:
+            folded.append(kept.pop(0))
+            sizes.pop(0)
+        over = fixed + sum(sizes) - self.token_ceiling
+        if over > 0 and kept:
+            tools = sorted((m for m in kept[0] if m.role == "tool"), key=message_tokens, reverse=True)
+            for message in tools:
+                if over <= 0:
+                    break
+                shortened = self._with_content(message, truncate_to_tokens(
+                    message_text(message), max(TOOL_REFERENCE_TOKENS, message_tokens(message) - over)))
+                over -= message_tokens(message) - message_tokens(shortened)
+                kept[0][kept[0].index(message)] = shortened
+
+        if folded:
+            lines = [transcript_line(m) for turn in folded for m in turn]
+            self._fold([line for line in lines if line])
+
+        compacted = list(prefix)
+        summary = self.summary_text()
+        if summary:
+            compacted.append(llm.ChatMessage.create(text=f"{SUMMARY_HEADER}\n{summary}", role="system"))
+        for turn in kept:
+            compacted.extend(turn)
+        return compacted
+
+    @staticmethod
+    def _with_content(message, content: str):
+        copied = message.copy()
+        copied.content = content
+        return copied
+
+    def _tool_reference(self, message):
+        text = message_text(message)
+        reference = (f"[Earlier {message.name or 'tool'} result, {message_tokens(message)} tokens, "
+                     f"shortened: {truncate_to_tokens(text, TOOL_REFERENCE_TOKENS)}]")
+        return self._with_content(message, reference)
+
+    def _fold(self, lines: list):
+        self._pending.extend(lines)
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._summarize_pending())
+
+    async def _summarize_pending(self):
+        """Background loop: fold pending transcript lines into the summary until none are left"""
+        while self._pending:
+            batch = list(self._pending)
+            try:
+                summary = await self.summarizer(self.summary, batch)
+            except Exception as e:
+                logger.error(f"Context summary failed, keeping short notes instead: {str(e)}")
+                summary = self.summary_text()
+            del self._pending[:len(batch)]
+            self.summary = truncate_to_tokens(summary or self.summary, self.summary_tokens)
+            logger.info(f"Folded {len(batch)} message(s) into the rolling summary "
+                        f"({count_tokens(self.summary)} tokens)")
+
+    async def _summarize_with_openai(self, previous: str, lines: list) -> str:
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {openai_api_key}"
+        }
+        transcript = "\n".join(truncate_to_tokens(line, 400) for line in lines)
+        payload = {
+            "model": DEFAULT_MODEL,
+            "messages": [
+                {"role": "system", "content": SUMMARY_PROMPT.format(words=int(self.summary_tokens * 0.7))},
+                {"role": "user", "content": f"Existing summary:\n{previous or '(none)'}\n\nNew exchanges:\n{transcript}"}
+            ],
+            "max_tokens": self.summary_tokens,
+            "temperature": 0.2
+        }
+        try:
+            result = await get_http_pool().post_json(OPENAI_CHAT_URL, payload, headers=headers)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise RuntimeError(f"OpenAI API error: {str(e)}") from e
+        return result["choices"][0]["message"]["content"].strip()
+
+    async def before_llm(self, agent, chat_ctx):
+        """VoicePipelineAgent before_llm_cb. The copy about to be sent is compacted, and the
+        agent's own context is trimmed in place so the next user turn starts from the compacted
+        history. The follow-up call after a tool result doesn't go through before_llm_cb, so it
+        sees whatever the turn started with. Returns None."""
+        real = agent.chat_ctx.messages
+        before = len(real)
+        # The copy is the real context plus this turn's new messages, which always stay
+        current_turn = chat_ctx.messages[before:]
+        real[:] = self.compact(real)
+        chat_ctx.messages[:] = list(real) + current_turn
+        if len(real) != before:
+            logger.info(f"Compacted chat context from {before} to {len(real)} messages")
+        return None
+
+    async def close(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
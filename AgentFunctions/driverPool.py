@@ -0,0 +1,165 @@
+# Pool of headless Chrome drivers for the screenshot fallback in webHelp.
+# Chrome is started lazily (or pre-warmed in the background), concurrency is bounded,
+# and drivers are health-checked and recycled after N pages or past a memory threshold.
+import os
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+import psutil
+
+logger = logging.getLogger("DriverPool")
+logger.setLevel(logging.INFO)
+
+CHROME_POOL_SIZE = int(os.getenv("CHROME_POOL_SIZE", "1"))
+CHROME_MAX_PAGES = int(os.getenv("CHROME_MAX_PAGES", "25"))
+CHROME_MAX_MEMORY_MB = float(os.getenv("CHROME_MAX_MEMORY_MB", "1024"))
+CHROME_PREWARM = os.getenv("CHROME_PREWARM", "0") == "1"
+# Below the tool deadline, so a hung page load frees its worker thread instead of holding it forever
+CHROME_PAGE_LOAD_TIMEOUT = float(os.getenv("CHROME_PAGE_LOAD_TIMEOUT", "30"))
+
+
+def create_chrome_driver():
+    """Start a headless Chrome browser"""
+    # Imported here so importing the pool doesn't load selenium until a browser is needed
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")  # Run in headless mode
+    chrome_options.add_argument("--window-size=1920,1080")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument('--disable-dev-shm-usage')
+    driver = webdriver.Chrome(options=chrome_options)
+    driver.set_page_load_timeout(CHROME_PAGE_LOAD_TIMEOUT)
+    return driver
+
+
+def driver_memory_mb(driver) -> float:
+    """Resident memory of chromedriver and every browser process it spawned"""
+    try:
+        root = psutil.Process(driver.service.process.pid)
+        processes = [root] + root.children(recursive=True)
+        total = 0
+        for process in processes:
+            try:
+                total += process.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        return total / (1024 * 1024)
+    except Exception:
+        return 0.0
+
+
+def driver_is_healthy(driver) -> bool:
+    try:
+        return driver.execute_script("return 1") == 1
+    except Exception:
+        return False
+
+
+def quit_driver(driver):
+    try:
+        driver.quit()
+    except Exception as e:
+        logger.warning(f"Error while quitting Chrome: {str(e)}")
+
+
+class ChromeDriverPool:
+    """Bounded, lazily started pool of recycled Chrome drivers"""
+
+    def __init__(self, max_drivers: int = CHROME_POOL_SIZE, max_pages: int = CHROME_MAX_PAGES,
+                 max_memory_mb: float = CHROME_MAX_MEMORY_MB) -> None:
+        self.max_drivers = max_drivers
+        self.max_pages = max_pages
+        self.max_memory_mb = max_memory_mb
+
+        self._semaphore = asyncio.Semaphore(max_drivers)
+        self._idle = []
+        self._pages = {}  # driver -> pages served since launch
+        self._prewarm_task = None
+        self._closed = False
+
+    async def _launch(self):
+        loop = asyncio.get_event_loop()
+        driver = await loop.run_in_executor(None, create_chrome_driver)
+        self._pages[driver] = 0
+        logger.info("Started headless Chrome")
+        return driver
+
+    async def _retire(self, driver, reason: str):
+        logger.info(f"Recycling Chrome driver: {reason}")
+        self._pages.pop(driver, None)
+        await asyncio.get_event_loop().run_in_executor(None, quit_driver, driver)
+
+    def prewarm(self):
+        """Start one driver in the background so the first fallback doesn't pay Chrome startup"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if self._prewarm_task is None and not self._idle:
+            self._prewarm_task = loop.create_task(self._prewarm())
+
+    async def _prewarm(self):
+        try:
+            async with self._semaphore:
+                if self._closed or self._idle:
+                    return
+                self._idle.append(await self._launch())
+        except Exception as e:
+            logger.warning(f"Chrome pre-warm failed: {str(e)}")
+
+    @asynccontextmanager
+    async def driver(self):
+        """Borrow a healthy driver; it is recycled on return once it has served enough pages"""
+        if self._closed:
+            raise RuntimeError("Chrome driver pool is shut down")
+
+        loop = asyncio.get_event_loop()
+        async with self._semaphore:
+            driver = None
+            while self._idle and driver is None:
+                candidate = self._idle.pop()
+                if await loop.run_in_executor(None, driver_is_healthy, candidate):
+                    driver = candidate
+                else:
+                    await self._retire(candidate, "failed health check")
+            if driver is None:
+                driver = await self._launch()
+
+            cancelled = False
+            try:
+                yield driver
+            except asyncio.CancelledError:
+                cancelled = True
+                raise
+            finally:
+                if cancelled:
+                    # Cancelled at its deadline while an executor thread may still be driving this
+                    # browser: never hand it out again. Quitting it also unblocks that thread.
+                    logger.info("Recycling Chrome driver: its job was cancelled")
+                    self._pages.pop(driver, None)
+                    loop.run_in_executor(None, quit_driver, driver)
+                else:
+                    self._pages[driver] = self._pages.get(driver, 0) + 1
+                    memory = await loop.run_in_executor(None, driver_memory_mb, driver)
+                    if self._closed:
+                        await self._retire(driver, "pool shut down")
+                    elif self._pages[driver] >= self.max_pages:
+                        await self._retire(driver, f"served {self._pages[driver]} pages")
+                    elif memory > self.max_memory_mb:
+                        await self._retire(driver, f"using {memory:.0f} MB")
+                    else:
+                        self._idle.append(driver)
+
+    async def shutdown(self):
+        """Quit every idle driver; drivers still in use are quit when they are returned"""
+        self._closed = True
+        if self._prewarm_task and not self._prewarm_task.done():
+            self._prewarm_task.cancel()
+        idle, self._idle = self._idle, []
+        for driver in idle:
+            await self._retire(driver, "pool shut down")
+        logger.info("Chrome driver pool shut down")
@@ -0,0 +1,274 @@
+# Offline geocoder for cities and landmarks. A GeoNames-style TSV is compiled once into
+# NumPy arrays (coordinates, population, a sorted name index and display labels) that are
+# memory-mapped at startup, so lookups cost a binary search instead of a Nominatim call.
+#
+# Build:  python -m AgentFunctions.gazetteer build cities1000.txt --out cache/gazetteer
+# Lookup: python -m AgentFunctions.gazetteer lookup "austin, tx" --dir cache/gazetteer
+import os
+import re
+import csv
+import sys
+import json
+import time
+import difflib
+import logging
+import argparse
+
+import numpy as np
+
+from .geocodeCache import canonical_place, fold_text
+
+logger = logging.getLogger("Gazetteer")
+logger.setLevel(logging.INFO)
+
+GAZETTEER_DIR = os.getenv("GAZETTEER_DIR", "")
+NAME_KEY_BYTES = 48
+FUZZY_MIN_RATIO = 0.8
+FUZZY_MAX_CANDIDATES = 200
+
+# GeoNames "geoname" table columns
+COL_NAME, COL_ASCII_NAME, COL_ALTERNATE_NAMES = 1, 2, 3
+COL_LATITUDE, COL_LONGITUDE = 4, 5
+COL_FEATURE_CLASS, COL_COUNTRY, COL_ADMIN1, COL_POPULATION = 6, 8, 10, 14
+# Populated places (P), administrative areas (A), spots and buildings (S), parks and areas (L)
+# and mountains, hills and other terrain (T); streams, roads, forests and undersea features are skipped
+FEATURE_CLASSES = {"P", "A", "S", "L", "T"}
+
+# Labels carry GeoNames admin1 and country codes ("Paris, TX, US"), so qualifiers written
+# out in full are mapped to those codes before filtering
+US_STATES = {
+    "alabama": "al", "alaska": "ak", "arizona": "az", "arkansas": "ar", "california": "ca",
+    "colorado": "co", "connecticut": "ct", "delaware": "de", "district of columbia": "dc",
+    "florida": "fl", "georgia": "ga", "hawaii": "hi", "idaho": "id", "illinois": "il",
+    "indiana": "in", "iowa": "ia", "kansas": "ks", "kentucky": "ky", "louisiana": "la",
+    "maine": "me", "maryland": "md", "massachusetts": "ma", "michigan": "mi", "minnesota": "mn",
+    "mississippi": "ms", "missouri": "mo", "montana": "mt", "nebraska": "ne", "nevada": "nv",
+    "new hampshire": "nh", "new jersey": "nj", "new mexico": "nm", "new york": "ny",
+    "north carolina": "nc", "north dakota": "nd", "ohio": "oh", "oklahoma": "ok", "oregon": "or",
+    "pennsylvania": "pa", "rhode island": "ri", "south carolina": "sc", "south dakota": "sd",
+    "tennessee": "tn", "texas": "tx", "utah": "ut", "vermont": "vt", "virginia": "va",
+    "washington": "wa", "west virginia": "wv", "wisconsin": "wi", "wyoming": "wy",
+}
+COUNTRIES = {
+    "united states": "us", "united states of america": "us", "usa": "us", "america": "us",
+    "canada": "ca", "mexico": "mx", "united kingdom": "gb", "uk": "gb", "great britain": "gb",
+    "england": "gb", "scotland": "gb", "wales": "gb", "ireland": "ie", "france": "fr",
+    "germany": "de", "spain": "es", "portugal": "pt", "italy": "it", "netherlands": "nl",
+    "belgium": "be", "switzerland": "ch", "austria": "at", "sweden": "se", "norway": "no",
+    "denmark": "dk", "finland": "fi", "poland": "pl", "greece": "gr", "turkey": "tr",
+    "russia": "ru", "china": "cn", "japan": "jp", "south korea": "kr", "korea": "kr",
+    "india": "in", "australia": "au", "new zealand": "nz", "brazil": "br", "argentina": "ar",
+    "chile": "cl", "colombia": "co", "peru": "pe", "egypt": "eg", "south africa": "za",
+    "nigeria": "ng", "kenya": "ke", "israel": "il", "united arab emirates": "ae", "uae": "ae",
+}
+
+STREET_WORDS = {
+    "street", "avenue", "road", "boulevard", "drive", "lane", "court", "place", "highway",
+    "parkway", "way", "terrace", "circle", "trail", "suite", "apt", "unit", "#",
+}
+HOUSE_NUMBER = re.compile(r'^\d+[a-z]?$')
+
+
+def is_street_address(query: str) -> bool:
+    """True for street-level queries ("123 Main St"), which still need the online geocoder"""
+    words = canonical_place(query).split()
+    return bool(words) and (HOUSE_NUMBER.match(words[0]) is not None or any(w in STREET_WORDS for w in words))
+
+
+def qualifier_terms(qualifier: str) -> list:
+    """Terms a label must contain for "Paris, Texas" or "Paris, TX, USA"; full state and
+    country names become the codes that labels use"""
+    terms = []
+    for part in qualifier.split(","):
+        part = fold_text(part)
+        if not part:
+            continue
+        code = US_STATES.get(part) or COUNTRIES.get(part)
+        if code:
+            terms.append(code)
+        else:
+            terms.extend(US_STATES.get(word) or COUNTRIES.get(word) or word for word in part.split())
+    return terms
+
+
+def _name_key(name: str) -> bytes:
+    return canonical_place(name).encode("utf-8")[:NAME_KEY_BYTES]
+
+
+def build_gazetteer(tsv_path: str, out_dir: str, min_population: int = 0,
+                    alternate_names: bool = False) -> int:
+    """Compile a GeoNames TSV into the memory-mappable arrays Gazetteer loads. Returns the place count."""
+    started = time.time()
+    coordinates, populations, labels = [], [], []
+    keys, key_rows = [], []
+    csv.field_size_limit(sys.maxsize)
+    with open(tsv_path, encoding="utf-8", newline="") as f:
+        for fields in csv.reader(f, delimiter="\t", quoting=csv.QUOTE_NONE):
+            if len(fields) <= COL_POPULATION or fields[COL_FEATURE_CLASS] not in FEATURE_CLASSES:
+                continue
+            population = int(fields[COL_POPULATION] or 0)
+            if population < min_population:
+                continue
+            row = len(coordinates)
+            coordinates.append((float(fields[COL_LATITUDE]), float(fields[COL_LONGITUDE])))
+            populations.append(population)
+            qualifiers = [q for q in (fields[COL_ADMIN1], fields[COL_COUNTRY]) if q and not q.isdigit()]
+            labels.append(", ".join([fields[COL_NAME]] + qualifiers))
+
+            names = {fields[COL_NAME], fields[COL_ASCII_NAME]}
+            if alternate_names and fields[COL_ALTERNATE_NAMES]:
+                names.update(fields[COL_ALTERNATE_NAMES].split(","))
+            for key in {_name_key(name) for name in names if name}:
+                if key:
+                    keys.append(key)
+                    key_rows.append(row)
+
+    os.makedirs(out_dir, exist_ok=True)
+    order = np.argsort(np.array(keys, dtype=f"S{NAME_KEY_BYTES}"), kind="stable")
+    np.save(os.path.join(out_dir, "name_keys.npy"), np.array(keys, dtype=f"S{NAME_KEY_BYTES}")[order])
+    np.save(os.path.join(out_dir, "name_rows.npy"), np.array(key_rows, dtype=np.int32)[order])
+    np.save(os.path.join(out_dir, "coordinates.npy"), np.array(coordinates, dtype=np.float32).reshape(-1, 2))
+    np.save(os.path.join(out_dir, "population.npy"), np.array(populations, dtype=np.int64))
+
+    encoded = [label.encode("utf-8") for label in labels]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(label) for label in encoded])
+    np.save(os.path.join(out_dir, "label_offsets.npy"), offsets)
+    with open(os.path.join(out_dir, "labels.bin"), "wb") as f:
+        f.write(b"".join(encoded))
+
+    with open(os.path.join(out_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "source": os.path.abspath(tsv_path),
+            "places": len(coordinates),
+            "names": len(keys),
+            "min_population": min_population,
+            "alternate_names": alternate_names,
+            "built_at": time.time(),
+        }, f)
+    logger.info(f"Built gazetteer with {len(coordinates)} places and {len(keys)} names "
+                f"in {time.time() - started:.1f}s")
+    return len(coordinates)
+
+
+class Gazetteer:
+    """Memory-mapped place lookup; opening it reads no place data until a query touches it"""
+
+    def __init__(self, path: str = GAZETTEER_DIR) -> None:
+        self.path = path
+
+        def load(name):
+            return np.load(os.path.join(path, name), mmap_mode="r")
+
+        self._keys = load("name_keys.npy")
+        self._key_rows = load("name_rows.npy")
+        self._coordinates = load("coordinates.npy")
+        self._population = load("population.npy")
+        self._label_offsets = load("label_offsets.npy")
+        self._labels = np.memmap(os.path.join(path, "labels.bin"), dtype=np.uint8, mode="r") \
+            if self._label_offsets[-1] else np.zeros(0, dtype=np.uint8)
+
+    def __len__(self) -> int:
+        return len(self._coordinates)
+
+    def _label(self, row: int) -> str:
+        start, end = self._label_offsets[row], self._label_offsets[row + 1]
+        return self._labels[start:end].tobytes().decode("utf-8")
+
+    def _prefix_range(self, prefix: bytes) -> tuple:
+        low = int(np.searchsorted(self._keys, prefix, side="left"))
+        high = int(np.searchsorted(self._keys, prefix + b"\xff", side="left"))
+        return low, high
+
+    def _place(self, row: int, score: float = 1.0) -> dict:
+        latitude, longitude = self._coordinates[row]
+        return {
+            "address": self._label(row),
+            "latitude": round(float(latitude), 6),
+            "longitude": round(float(longitude), 6),
+            "population": int(self._population[row]),
+            "score": score,
+        }
+
+    def lookup(self, query: str, limit: int = 5) -> list:
+        """Places matching a name, best first. "Austin, TX" or "Austin, Texas" keeps only places in
+        that region or country, and returns nothing if none are there; exact names beat prefixes,
+        which beat fuzzy matches, and bigger places win ties."""
+        name, _, qualifier = query.partition(",")
+        key = _name_key(name)
+        qualifiers = qualifier_terms(qualifier)
+        if not key:
+            return []
+
+        low, high = self._prefix_range(key)
+        exact_end = int(np.searchsorted(self._keys, key, side="right"))
+        candidates = {int(self._key_rows[i]): 1.0 for i in range(low, exact_end)}
+        for i in range(low, min(high, low + FUZZY_MAX_CANDIDATES)):
+            candidates.setdefault(int(self._key_rows[i]), 0.9)
+
+        if not candidates:
+            # Fuzzy: widen the prefix a character at a time and keep close spellings
+            for cut in range(len(key) - 1, max(2, len(key) // 2) - 1, -1):
+                low, high = self._prefix_range(key[:cut])
+                if high == low:
+                    continue
+                for i in range(low, min(high, low + FUZZY_MAX_CANDIDATES)):
+                    candidate = self._keys[i]
+                    ratio = difflib.SequenceMatcher(None, key, candidate[:len(key) + 2]).ratio()
+                    if ratio >= FUZZY_MIN_RATIO:
+                        row = int(self._key_rows[i])
+                        candidates[row] = max(candidates.get(row, 0.0), 0.8 * ratio)
+                if candidates:
+                    break
+
+        places = [self._place(row, score) for row, score in candidates.items()]
+        if qualifiers:
+            # A qualifier nothing satisfies means a different place, e.g. "Paris, Texas" when
+            # only Paris, France is known; let the online geocoder answer instead
+            places = [p for p in places if all(q in fold_text(p["address"]).split() for q in qualifiers)]
+        places.sort(key=lambda p: (p["score"], p["population"]), reverse=True)
+        return places[:limit]
+
+
+def load_gazetteer(path: str = GAZETTEER_DIR):
+    """Open the compiled gazetteer if one has been built, otherwise None"""
+    if not path or not os.path.exists(os.path.join(path, "meta.json")):
+        return None
+    try:
+        gazetteer = Gazetteer(path)
+        logger.info(f"Loaded offline gazetteer with {len(gazetteer)} places from {path}")
+        return gazetteer
+    except (OSError, ValueError) as e:
+        logger.error(f"Could not load gazetteer from {path}: {str(e)}")
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the offline gazetteer")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="compile a GeoNames TSV (e.g. cities1000.txt)")
+    build.add_argument("tsv")
+    build.add_argument("--out", default=GAZETTEER_DIR or os.path.join("cache", "gazetteer"))
+    build.add_argument("--min-population", type=int, default=0)
+    build.add_argument("--alternate-names", action="store_true", help="also index alternate names")
+    lookup = commands.add_parser("lookup", help="look a place up in a compiled gazetteer")
+    lookup.add_argument("query")
+    lookup.add_argument("--dir", default=GAZETTEER_DIR or os.path.join("cache", "gazetteer"))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "build":
+        build_gazetteer(args.tsv, args.out, args.min_population, args.alternate_names)
+    else:
+        gazetteer = Gazetteer(args.dir)
+        started = time.perf_counter()
+        places = gazetteer.lookup(args.query)
+        elapsed = (time.perf_counter() - started) * 1000
+        for place in places:
+            print(f"{place['address']:<48}{place['latitude']:>11.5f}{place['longitude']:>12.5f}"
+                  f"{place['population']:>12}  score {place['score']:.2f}")
+        print(f"{len(places)} result(s) in {elapsed:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# Vectorized distance math for batches of resolved locations. Haversine on a sphere is
+# the fast default; Vincenty on the WGS-84 ellipsoid matches geopy's geodesic to well
+# under a meter and is still computed for every pair at once with NumPy.
+import logging
+
+import numpy as np
+
+logger = logging.getLogger("GeoMath")
+logger.setLevel(logging.INFO)
+
+EARTH_RADIUS_MILES = 3958.7613  # mean radius
+METERS_PER_MILE = 1609.344
+# WGS-84 ellipsoid
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+WGS84_B = WGS84_A * (1 - WGS84_F)
+VINCENTY_MAX_ITERATIONS = 200
+VINCENTY_TOLERANCE = 1e-12
+
+
+def coordinates_array(locations) -> np.ndarray:
+    """(N, 2) array of latitude/longitude in degrees from location dicts or (lat, lon) pairs"""
+    rows = []
+    for location in locations:
+        if isinstance(location, dict):
+            rows.append((location.get("latitude"), location.get("longitude")))
+        else:
+            rows.append(tuple(location))
+    array = np.array(rows, dtype=np.float64).reshape(-1, 2)
+    if np.isnan(array).any():
+        raise ValueError("Every location needs a latitude and longitude")
+    return array
+
+
+def haversine_matrix(origins, destinations) -> np.ndarray:
+    """Great-circle distance in miles between every origin and destination, shape (N, M)"""
+    lat1, lon1 = np.radians(coordinates_array(origins)).T
+    lat2, lon2 = np.radians(coordinates_array(destinations)).T
+    dlat = lat2[None, :] - lat1[:, None]
+    dlon = lon2[None, :] - lon1[:, None]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1)[:, None] * np.cos(lat2)[None, :] * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def vincenty_matrix(origins, destinations) -> np.ndarray:
+    """Ellipsoidal (WGS-84) distance in miles between every origin and destination, shape (N, M).
+    Nearly antipodal pairs where Vincenty doesn't converge fall back to haversine."""
+    first = np.radians(coordinates_array(origins))
+    second = np.radians(coordinates_array(destinations))
+    u1 = np.arctan((1 - WGS84_F) * np.tan(first[:, 0]))[:, None]
+    u2 = np.arctan((1 - WGS84_F) * np.tan(second[:, 0]))[None, :]
+    big_l = second[None, :, 1] - first[:, None, 1]
+    sin_u1, cos_u1 = np.sin(u1), np.cos(u1)
+    sin_u2, cos_u2 = np.sin(u2), np.cos(u2)
+
+    lam = big_l.copy()
+    converged = np.zeros(lam.shape, dtype=bool)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for _ in range(VINCENTY_MAX_ITERATIONS):
+            sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+            sin_sigma = np.sqrt((cos_u2 * sin_lam) ** 2 + (cos_u1 * sin_u2 - sin_u1 * cos_u2 * cos_lam) ** 2)
+            cos_sigma = sin_u1 * sin_u2 + cos_u1 * cos_u2 * cos_lam
+            sigma = np.arctan2(sin_sigma, cos_sigma)
+            sin_alpha = np.where(sin_sigma == 0, 0.0, cos_u1 * cos_u2 * sin_lam / sin_sigma)
+            cos_sq_alpha = 1 - sin_alpha ** 2
+            # Equatorial lines have cos_sq_alpha == 0
+            cos_2sigma_m = np.where(cos_sq_alpha == 0, 0.0, cos_sigma - 2 * sin_u1 * sin_u2 / cos_sq_alpha)
+            c = WGS84_F / 16 * cos_sq_alpha * (4 + WGS84_F * (4 - 3 * cos_sq_alpha))
+            previous = lam
+            lam = big_l + (1 - c) * WGS84_F * sin_alpha * (
+                sigma + c * sin_sigma * (cos_2sigma_m + c * cos_sigma * (-1 + 2 * cos_2sigma_m ** 2))
+            )
+            converged = np.abs(lam - previous) < VINCENTY_TOLERANCE
+            if converged.all():
+                break
+
+        u_sq = cos_sq_alpha * (WGS84_A ** 2 - WGS84_B ** 2) / WGS84_B ** 2
+        big_a = 1 + u_sq / 16384 * (4096 + u_sq * (-768 + u_sq * (320 - 175 * u_sq)))
+        big_b = u_sq / 1024 * (256 + u_sq * (-128 + u_sq * (74 - 47 * u_sq)))
+        delta_sigma = big_b * sin_sigma * (cos_2sigma_m + big_b / 4 * (
+            cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)
+            - big_b / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)
+        ))
+        miles = WGS84_B * big_a * (sigma - delta_sigma) / METERS_PER_MILE
+
+    miles = np.where(sin_sigma == 0, 0.0, miles)
+    failed = ~converged | np.isnan(miles)
+    if failed.any():
+        logger.info(f"Vincenty did not converge for {int(failed.sum())} pair(s), using haversine for them")
+        miles = np.where(failed, haversine_matrix(origins, destinations), miles)
+    return miles
+
+
+def distance_matrix(origins, destinations, exact: bool = False) -> np.ndarray:
+    """Distance in miles for every origin/destination pair; exact uses the WGS-84 ellipsoid"""
+    return vincenty_matrix(origins, destinations) if exact else haversine_matrix(origins, destinations)
+
+
+def nearest_k(origin, candidates, k: int = 1, exact: bool = False) -> list:
+    """The k candidates closest to origin as [(candidate index, miles)], nearest first"""
+    distances = distance_matrix([origin], candidates, exact=exact)[0]
+    k = min(k, len(distances))
+    if k <= 0:
+        return []
+    # argpartition keeps this linear for large candidate lists
+    indices = np.argpartition(distances, k - 1)[:k] if k < len(distances) else np.arange(len(distances))
+    indices = indices[np.argsort(distances[indices])]
+    return [(int(i), float(distances[i])) for i in indices]
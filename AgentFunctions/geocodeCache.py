@@ -0,0 +1,192 @@
+# Persistent geocoding for the location assistant. Results are cached in SQLite under a
+# canonical form of the query (including "not found" answers), and cache misses go through
+# a single async queue that keeps Nominatim calls off the event loop and under 1 req/s.
+import os
+import re
+import json
+import time
+import asyncio
+import logging
+import unicodedata
+
+from geopy.exc import GeocoderRateLimited
+
+from .sqliteCache import SQLiteCache, cache_path
+
+logger = logging.getLogger("GeocodeCache")
+logger.setLevel(logging.INFO)
+
+GEOCODE_CACHE_TTL = float(os.getenv("GEOCODE_CACHE_TTL", str(90 * 24 * 3600)))
+GEOCODE_NEGATIVE_TTL = float(os.getenv("GEOCODE_NEGATIVE_TTL", str(24 * 3600)))
+GEOCODE_CACHE_MAX_ENTRIES = int(os.getenv("GEOCODE_CACHE_MAX_ENTRIES", "20000"))
+# Nominatim's usage policy allows at most one request per second
+GEOCODE_MIN_INTERVAL = float(os.getenv("GEOCODE_MIN_INTERVAL", "1.0"))
+GEOCODE_TIMEOUT = float(os.getenv("GEOCODE_TIMEOUT", "10"))
+GEOCODE_RATE_LIMIT_BACKOFF = 30.0
+
+# Expanded only where they can't be part of a name: street types after the first word of
+# the street part ("Main St", not "St Louis"), directions in a street part that has a house
+# number or street type ("123 N Main St", "Main St NW") and name prefixes followed by a name
+# ("Mt Hood", not "Helena, MT"). "s" is left alone; too many names end in one once apostrophes go.
+STREET_TYPES = {
+    "st": "street", "str": "street", "ave": "avenue", "av": "avenue", "rd": "road",
+    "blvd": "boulevard", "dr": "drive", "ln": "lane", "ct": "court", "pl": "place",
+    "hwy": "highway", "pkwy": "parkway", "sq": "square",
+}
+DIRECTIONS = {
+    "n": "north", "e": "east", "w": "west",
+    "ne": "northeast", "nw": "northwest", "se": "southeast", "sw": "southwest",
+}
+NAME_PREFIXES = {"mt": "mount", "ft": "fort"}
+PUNCTUATION = re.compile(r"[^\w\s#,-]")
+APOSTROPHES = re.compile(r"['\u2019]")
+HOUSE_NUMBER = re.compile(r"^\d+[a-z]?$")
+
+
+def fold_text(text: str) -> str:
+    """Accents folded, apostrophes, punctuation and case dropped, whitespace collapsed"""
+    return " ".join(" ".join(_fold_segments(text)).split())
+
+
+def _fold_segments(text: str) -> list:
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    text = PUNCTUATION.sub(" ", APOSTROPHES.sub("", text))
+    return [" ".join(segment.split()) for segment in text.split(",")]
+
+
+def _expand_segment(words: list, street_part: bool) -> list:
+    addressed = street_part and len(words) > 1 and (
+        any(HOUSE_NUMBER.match(word) for word in words) or any(word in STREET_TYPES for word in words[1:]))
+    expanded = []
+    for index, word in enumerate(words):
+        if word in NAME_PREFIXES and index + 1 < len(words):
+            word = NAME_PREFIXES[word]
+        elif street_part and word in STREET_TYPES and index > 0:
+            word = STREET_TYPES[word]
+        elif addressed and word in DIRECTIONS:
+            word = DIRECTIONS[word]
+        expanded.append(word)
+    return expanded
+
+
+def canonical_place(query: str) -> str:
+    """Stable cache key for a place query: accents folded, punctuation and case dropped,
+    street abbreviations expanded in the street part ("123 N. Main St" == "123 north main street")"""
+    words = []
+    for position, segment in enumerate(_fold_segments(query)):
+        words.extend(_expand_segment(segment.split(), street_part=position == 0))
+    return " ".join(words)
+
+
+class GeocodeCache(SQLiteCache):
+    """Geocoder answers, including negative ones, that survive worker restarts"""
+
+    def __init__(self, path: str = None) -> None:
+        super().__init__(
+            path or cache_path("geocode.sqlite"),
+            max_entries=GEOCODE_CACHE_MAX_ENTRIES,
+            default_ttl=GEOCODE_CACHE_TTL,
+        )
+
+    def lookup(self, query: str):
+        """Return {'address', 'latitude', 'longitude'}, {'not_found': True}, or None on a miss"""
+        entry = self.get(canonical_place(query))
+        return entry["value"] if entry else None
+
+    def store(self, query: str, address: str, latitude: float, longitude: float):
+        self.set(canonical_place(query), {
+            "address": address,
+            "latitude": latitude,
+            "longitude": longitude,
+        })
+
+    def resolved_places(self):
+        """(canonical query, value) for every cached successful geocode, e.g. to seed a spatial index"""
+        with self._lock:
+            rows = self._conn.execute("SELECT key, value FROM entries").fetchall()
+        for key, value in rows:
+            value = json.loads(value)
+            if not value.get("not_found"):
+                yield key, value
+
+    def store_missing(self, query: str):
+        # Short TTL: a place that didn't resolve may be added to OpenStreetMap later
+        self.set(canonical_place(query), {"not_found": True}, ttl=GEOCODE_NEGATIVE_TTL)
+
+
+class GeocodeQueue:
+    """Serialize geocoder calls through one worker task that runs them in an executor,
+    spaced at least min_interval apart. Concurrent requests for the same place share a call."""
+
+    def __init__(self, geolocator, min_interval: float = GEOCODE_MIN_INTERVAL,
+                 timeout: float = GEOCODE_TIMEOUT) -> None:
+        self.geolocator = geolocator
+        self.min_interval = min_interval
+        self.timeout = timeout
+        self._queue = None
+        self._worker = None
+        self._pending = {}  # canonical query -> Future
+        self._next_request_at = 0.0
+
+    def _ensure_worker(self):
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+    async def geocode(self, query: str):
+        """Geocode a query, returning the geopy Location or None when nothing matches"""
+        key = canonical_place(query)
+        future = self._pending.get(key)
+        if future is None:
+            self._ensure_worker()
+            future = asyncio.get_event_loop().create_future()
+            self._pending[key] = future
+            if self._queue.qsize():
+                logger.info(f"Queued geocode for '{query}' behind {self._queue.qsize()} other(s)")
+            await self._queue.put((key, query, future))
+        # Shield so a cancelled caller doesn't fail the lookup for others waiting on it
+        return await asyncio.shield(future)
+
+    async def _run(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            key, query, future = await self._queue.get()
+            try:
+                delay = self._next_request_at - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                try:
+                    location = await loop.run_in_executor(
+                        None, lambda: self.geolocator.geocode(query, timeout=self.timeout)
+                    )
+                    self._next_request_at = time.monotonic() + self.min_interval
+                    if not future.done():
+                        future.set_result(location)
+                except GeocoderRateLimited as e:
+                    backoff = e.retry_after or GEOCODE_RATE_LIMIT_BACKOFF
+                    logger.warning(f"Geocoder rate limited, pausing for {backoff:g}s")
+                    self._next_request_at = time.monotonic() + backoff
+                    if not future.done():
+                        future.set_exception(e)
+                except Exception as e:
+                    # Timeouts, service errors and anything else fail this lookup, not the worker
+                    self._next_request_at = time.monotonic() + self.min_interval
+                    if not future.done():
+                        future.set_exception(e)
+            finally:
+                self._pending.pop(key, None)
+                self._queue.task_done()
+
+    async def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        for future in self._pending.values():
+            if not future.done():
+                future.cancel()
+        self._pending.clear()
@@ -0,0 +1,80 @@
+# Finds text-selection highlights in a screen capture with OpenCV color segmentation,
+# so only the selected text has to be sent to the vision model instead of the whole screen.
+import os
+import logging
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger("HighlightDetect")
+logger.setLevel(logging.INFO)
+
+# OpenCV HSV ranges (hue 0-179) for common selection and highlighter colors
+HIGHLIGHT_RANGES = {
+    "selection_blue": ((95, 60, 120), (125, 255, 255)),  # Windows, macOS and browser selections
+    "inactive_blue": ((95, 20, 200), (115, 70, 255)),  # pale selections in unfocused windows
+    "highlighter_yellow": ((20, 80, 180), (35, 255, 255)),
+    "highlighter_green": ((40, 80, 160), (80, 255, 255)),
+}
+DETECTION_WIDTH = 1920  # detect on a downscaled copy, crop from the original
+MIN_REGION_PIXELS = int(os.getenv("HIGHLIGHT_MIN_PIXELS", "300"))
+MAX_REGION_FRACTION = 0.25  # anything bigger is a window or panel, not a selection
+MAX_FILL = 0.97  # selections have text cut out of them; solid blocks are buttons and bars
+CROP_PADDING = 8
+CLOSE_KERNEL = (25, 9)  # width, height: bridges glyph gaps and the spacing between selected lines
+
+
+def highlight_mask(rgb: np.ndarray) -> np.ndarray:
+    """Binary mask of pixels in any highlight color range"""
+    hsv = cv2.cvtColor(rgb, cv2.COLOR_RGB2HSV)
+    mask = np.zeros(hsv.shape[:2], dtype=np.uint8)
+    for low, high in HIGHLIGHT_RANGES.values():
+        mask |= cv2.inRange(hsv, np.array(low, dtype=np.uint8), np.array(high, dtype=np.uint8))
+    return mask
+
+
+def find_highlight_regions(rgb: np.ndarray) -> list:
+    """Bounding boxes (left, top, right, bottom) of highlighted text in an RGB frame, largest first"""
+    height, width = rgb.shape[:2]
+    scale = min(1.0, DETECTION_WIDTH / width)
+    if scale < 1.0:
+        rgb = cv2.resize(rgb, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+
+    mask = highlight_mask(rgb)
+    # Close the gaps left by glyphs and between selected lines, then drop isolated specks.
+    # OpenCV erodes as if everything past the frame were set, so closing would grow blobs near
+    # an edge out to it; closing an empty-bordered copy keeps solid buttons there solid.
+    pad_x, pad_y = CLOSE_KERNEL
+    padded = cv2.copyMakeBorder(mask, pad_y, pad_y, pad_x, pad_x, cv2.BORDER_CONSTANT, value=0)
+    merged = cv2.morphologyEx(padded, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, CLOSE_KERNEL))
+    merged = merged[pad_y:pad_y + mask.shape[0], pad_x:pad_x + mask.shape[1]]
+    merged = cv2.morphologyEx(merged, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5)))
+
+    count, _, stats, _ = cv2.connectedComponentsWithStats(merged, connectivity=8)
+    frame_area = mask.shape[0] * mask.shape[1]
+    regions = []
+    for label in range(1, count):
+        x, y, w, h, area = stats[label]
+        if area * (1 / scale) ** 2 < MIN_REGION_PIXELS or w * h > MAX_REGION_FRACTION * frame_area or h < 6:
+            continue
+        fill = np.count_nonzero(mask[y:y + h, x:x + w]) / float(w * h)
+        if fill > MAX_FILL or fill < 0.2:
+            continue
+        regions.append((area, (
+            max(0, int(x / scale) - CROP_PADDING),
+            max(0, int(y / scale) - CROP_PADDING),
+            min(width, int((x + w) / scale) + CROP_PADDING),
+            min(height, int((y + h) / scale) + CROP_PADDING),
+        )))
+
+    regions.sort(key=lambda region: region[0], reverse=True)
+    return [box for _, box in regions]
+
+
+def highlight_crop_box(image):
+    """Crop box around the main highlighted selection in a PIL image, or None if nothing is selected"""
+    regions = find_highlight_regions(np.asarray(image.convert("RGB") if image.mode != "RGB" else image))
+    if not regions:
+        return None
+    logger.info(f"Found {len(regions)} highlighted region(s), using {regions[0]}")
+    return regions[0]
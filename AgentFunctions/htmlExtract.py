@@ -0,0 +1,305 @@
+# Single-pass HTML content extraction for traverse_web.
+# The page is tokenized once (lxml when installed, otherwise the stdlib streaming parser).
+# That one pass collects the title, headings, paragraphs, list items and optional topic
+# matches, and it scores the enclosing containers readability-style so navigation,
+# sidebars and other boilerplate can be dropped.
+import re
+import logging
+from html.parser import HTMLParser
+
+from .sectionRanker import rank_sections, content_sections
+
+try:
+    from lxml import etree as lxml_etree
+except ImportError:  # lxml is in requirements.txt; the stdlib tokenizer covers installs without it
+    lxml_etree = None
+
+logger = logging.getLogger("HtmlExtract")
+logger.setLevel(logging.INFO)
+
+# Subtrees that never contain readable content
+SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "nav", "footer"}
+HEADING_TAGS = {"h1", "h2", "h3"}
+BLOCK_TAGS = HEADING_TAGS | {"p", "li"}
+CONTAINER_TAGS = {"div", "section", "article", "main", "td", "body", "aside", "header", "ul", "ol"}
+# Tags that implicitly close an open <p>
+P_CLOSERS = {"p", "div", "ul", "ol", "li", "table", "section", "article", "main", "aside", "header",
+             "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre", "form", "hr"}
+BREAK_TAGS = {"br", "td", "th", "tr", "div", "hr"}
+
+POSITIVE_HINTS = re.compile(r'article|body|content|entry|main|page|post|story|text|blog', re.IGNORECASE)
+NEGATIVE_HINTS = re.compile(
+    r'ad-|ads|advert|banner|breadcrumb|combx|comment|cookie|footer|footnote|masthead|menu|meta|'
+    r'modal|nav|newsletter|outbrain|pager|popup|promo|related|share|shoutbox|sidebar|social|'
+    r'sponsor|subscribe|taboola|tags|tool|widget',
+    re.IGNORECASE
+)
+CLASS_WEIGHT = 25
+
+MIN_PARAGRAPH_CHARS = 25
+MAX_LINK_DENSITY = 0.5
+SIBLING_THRESHOLD = 0.25
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split())
+
+
+class _Container:
+    __slots__ = ("tag", "weight", "score", "parent")
+
+    def __init__(self, tag, weight, parent):
+        self.tag = tag
+        self.weight = weight
+        self.score = 0.0
+        self.parent = parent
+
+
+class _Block:
+    __slots__ = ("tag", "parts", "link_chars", "container")
+
+    def __init__(self, tag, container):
+        self.tag = tag
+        self.parts = []
+        self.link_chars = 0
+        self.container = container
+
+
+class ContentCollector:
+    """Parser target: receives start/end/data events from either backend in document order"""
+
+    def __init__(self) -> None:
+        self.title = None
+        self.blocks = []  # (tag, text, link_density, container) in document order
+
+        self._skip_depth = 0
+        self._in_title = False
+        self._title_parts = []
+        self._link_depth = 0
+        self.containers = []
+        self._open_blocks = []
+        self._container_stack = []
+
+    # lxml target interface
+    def start(self, tag, attrib):
+        if not isinstance(tag, str):  # comments and processing instructions
+            return
+        tag = tag.lower()
+        if self._skip_depth:
+            if tag in SKIP_TAGS:
+                self._skip_depth += 1
+            return
+        if tag in SKIP_TAGS:
+            self._skip_depth = 1
+            return
+
+        if tag == "title" and self.title is None:
+            self._in_title = True
+        elif tag == "a":
+            self._link_depth += 1
+
+        # HTML lets <p> and <li> close implicitly
+        if tag in P_CLOSERS:
+            self._close_open("p")
+        if tag == "li":
+            self._close_open("li")
+
+        if tag in BREAK_TAGS:
+            self.data(" ")
+
+        if tag in CONTAINER_TAGS:
+            hints = f"{attrib.get('class', '')} {attrib.get('id', '')}"
+            weight = 0
+            if NEGATIVE_HINTS.search(hints):
+                weight -= CLASS_WEIGHT
+            if POSITIVE_HINTS.search(hints):
+                weight += CLASS_WEIGHT
+            parent = self._container_stack[-1] if self._container_stack else None
+            container = _Container(tag, weight, parent)
+            self.containers.append(container)
+            self._container_stack.append(container)
+
+        if tag in BLOCK_TAGS:
+            container = self._container_stack[-1] if self._container_stack else None
+            self._open_blocks.append(_Block(tag, container))
+
+    def end(self, tag):
+        if not isinstance(tag, str):
+            return
+        tag = tag.lower()
+        if self._skip_depth:
+            if tag in SKIP_TAGS:
+                self._skip_depth -= 1
+            return
+
+        if tag == "title" and self._in_title:
+            self._in_title = False
+            self.title = _normalize("".join(self._title_parts))
+        elif tag == "a" and self._link_depth:
+            self._link_depth -= 1
+
+        if tag in BLOCK_TAGS:
+            self._close_open(tag)
+        elif tag in BREAK_TAGS:
+            self.data(" ")
+
+        if tag in CONTAINER_TAGS:
+            # Pop up to the matching container; tolerate unbalanced markup
+            for index in range(len(self._container_stack) - 1, -1, -1):
+                if self._container_stack[index].tag == tag:
+                    # Implied end tags: </ul> closes its open <li>, </div> its open <p>.
+                    # lxml already sends these; the stdlib parser doesn't.
+                    self._close_within(set(self._container_stack[index:]))
+                    del self._container_stack[index:]
+                    break
+
+    def data(self, data):
+        if self._skip_depth:
+            return
+        if self._in_title:
+            self._title_parts.append(data)
+            return
+        for block in self._open_blocks:
+            block.parts.append(data)
+            if self._link_depth:
+                block.link_chars += len(data.strip())
+
+    def comment(self, text):
+        pass
+
+    def close(self):
+        while self._open_blocks:
+            self._finish(self._open_blocks.pop())
+        return self
+
+    def _close_open(self, tag):
+        for index in range(len(self._open_blocks) - 1, -1, -1):
+            if self._open_blocks[index].tag == tag:
+                # Close everything nested inside the block as well
+                while len(self._open_blocks) > index:
+                    self._finish(self._open_blocks.pop())
+                return
+
+    def _close_within(self, containers: set):
+        for index, block in enumerate(self._open_blocks):
+            if block.container in containers:
+                while len(self._open_blocks) > index:
+                    self._finish(self._open_blocks.pop())
+                return
+
+    def _finish(self, block):
+        text = _normalize("".join(block.parts))
+        if not text:
+            return
+        link_density = min(1.0, block.link_chars / max(1, len(text)))
+        self.blocks.append((block.tag, text, link_density, block.container))
+
+        # Readability-style scoring: paragraph text feeds its container and, at half weight, the grandparent
+        if block.tag == "p" and len(text) >= MIN_PARAGRAPH_CHARS and block.container is not None:
+            score = (1 + text.count(",") + min(len(text) / 100, 3)) * (1 - link_density)
+            block.container.score += score
+            if block.container.parent is not None:
+                block.container.parent.score += score / 2
+
+
+class _StdlibParser(HTMLParser):
+    """Adapter from html.parser callbacks to the lxml-style collector interface"""
+
+    def __init__(self, collector: ContentCollector) -> None:
+        super().__init__(convert_charrefs=True)
+        self.collector = collector
+
+    def handle_starttag(self, tag, attrs):
+        self.collector.start(tag, {k: v or "" for k, v in attrs})
+
+    def handle_startendtag(self, tag, attrs):
+        self.collector.start(tag, {k: v or "" for k, v in attrs})
+        self.collector.end(tag)
+
+    def handle_endtag(self, tag):
+        self.collector.end(tag)
+
+    def handle_data(self, data):
+        self.collector.data(data)
+
+
+def _parse(html: str, collector: ContentCollector, backend: str = None) -> ContentCollector:
+    backend = backend or ("lxml" if lxml_etree is not None else "stdlib")
+    if backend == "lxml":
+        parser = lxml_etree.HTMLParser(target=collector, recover=True, encoding="utf-8")
+        lxml_etree.fromstring(html.encode("utf-8", errors="replace"), parser)
+    else:
+        parser = _StdlibParser(collector)
+        parser.feed(html)
+        parser.close()
+        collector.close()
+    return collector
+
+
+def _content_containers(collector: ContentCollector) -> set:
+    """The best-scoring container plus siblings that score close to it"""
+    scored = []
+    for container in collector.containers:
+        if container.score > 0:
+            scored.append((container.score + container.weight, container))
+    if not scored:
+        return set()
+    best_score, best = max(scored, key=lambda item: item[0])
+    if best_score <= 0:
+        return set()
+    threshold = best_score * SIBLING_THRESHOLD
+    return {best} | {c for score, c in scored if score >= threshold and c.parent is best.parent}
+
+
+def _within(container, targets: set) -> bool:
+    """True if the container sits inside a main container without passing through boilerplate"""
+    while container is not None:
+        if container in targets:
+            return True
+        if container.weight < 0:
+            return False
+        container = container.parent
+    return False
+
+
+def _has_negative_ancestor(container) -> bool:
+    while container is not None:
+        if container.weight < 0:
+            return True
+        container = container.parent
+    return False
+
+
+def extract_content(html: str, topic: str = None, backend: str = None) -> dict:
+    """Parse a page once and return its title, headings, paragraphs and list items.
+    With a topic, the best BM25-ranked sections are returned under 'topic_specific'."""
+    collector = _parse(html, ContentCollector(), backend)
+    main = _content_containers(collector)
+
+    content = {'title': collector.title or '', 'headings': [], 'paragraphs': [], 'lists': []}
+    kept_chars = total_chars = 0
+    for tag, text, link_density, container in collector.blocks:
+        if tag == "p":
+            total_chars += len(text)
+        if link_density > MAX_LINK_DENSITY:
+            continue
+        if tag in HEADING_TAGS:
+            if not _has_negative_ancestor(container):
+                content['headings'].append(text)
+        elif not main or _within(container, main):
+            if tag == "p":
+                content['paragraphs'].append(text)
+                kept_chars += len(text)
+            else:
+                content['lists'].append(text)
+
+    # Scoring can misfire on unusual layouts; fall back to everything that isn't link-heavy
+    if total_chars and kept_chars < total_chars * 0.2:
+        content['paragraphs'] = [t for tag, t, density, _ in collector.blocks
+                                 if tag == "p" and density <= MAX_LINK_DENSITY]
+        content['lists'] = [t for tag, t, density, _ in collector.blocks
+                            if tag == "li" and density <= MAX_LINK_DENSITY]
+
+    if topic:
+        content['topic_specific'] = rank_sections(content_sections(content), topic)
+    return content
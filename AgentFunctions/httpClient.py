@@ -0,0 +1,156 @@
+# Shared async HTTP layer used by every outbound call the assistants make.
+# One aiohttp session per event loop keeps connections alive per host, caches DNS
+# lookups and enforces per-host concurrency limits so tool calls never block the loop.
+import os
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+import aiohttp
+
+logger = logging.getLogger("HttpClient")
+logger.setLevel(logging.INFO)
+
+OPENAI_CHAT_URL = "https://api.openai.com/v1/chat/completions"
+
+# Pool defaults, overridable through the environment or configure_http_pool()
+DEFAULT_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", "64"))
+DEFAULT_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "8"))
+DEFAULT_DNS_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL", "300"))
+DEFAULT_KEEPALIVE = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "75"))
+DEFAULT_TIMEOUT = aiohttp.ClientTimeout(total=60, connect=10)
+
+# Concurrency limits for the hosts we talk to the most; other hosts use DEFAULT_LIMIT_PER_HOST
+DEFAULT_HOST_LIMITS = {
+    "api.openai.com": 8,
+    "www.googleapis.com": 4,
+    "www.mapquestapi.com": 4,
+}
+
+
+class HttpPool:
+    """Process-wide keep-alive connection pool with per-host limits"""
+
+    def __init__(self, limit: int = DEFAULT_LIMIT, limit_per_host: int = DEFAULT_LIMIT_PER_HOST,
+                 host_limits: dict = None, dns_ttl: int = DEFAULT_DNS_TTL,
+                 keepalive_timeout: float = DEFAULT_KEEPALIVE) -> None:
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.host_limits = dict(DEFAULT_HOST_LIMITS)
+        if host_limits:
+            self.host_limits.update(host_limits)
+        self.dns_ttl = dns_ttl
+        self.keepalive_timeout = keepalive_timeout
+
+        self._session = None
+        self._session_loop = None
+        self._host_semaphores = {}
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        # The connector's own per-host cap is the largest configured limit; the
+        # semaphores in _semaphore_for() enforce the tighter per-host values
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=max([self.limit_per_host, *self.host_limits.values()]),
+            use_dns_cache=True,
+            ttl_dns_cache=self.dns_ttl,
+            keepalive_timeout=self.keepalive_timeout,
+            enable_cleanup_closed=True,
+        )
+        return aiohttp.ClientSession(connector=connector, timeout=DEFAULT_TIMEOUT)
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Return the pooled session, creating it on first use or after a loop change"""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            if self._session is not None and not self._session.closed and self._session_loop is not loop:
+                logger.warning("Event loop changed, opening a new HTTP session")
+                self._discard_session(self._session, self._session_loop)
+            self._session = self._create_session()
+            self._session_loop = loop
+            self._host_semaphores = {}
+            logger.info(f"Opened pooled HTTP session (limit={self.limit}, dns_ttl={self.dns_ttl}s)")
+        return self._session
+
+    @staticmethod
+    def _discard_session(session: aiohttp.ClientSession, loop):
+        """Close a session left behind on another event loop, on that loop when it still runs"""
+        if loop is not None and loop.is_running() and not loop.is_closed():
+            asyncio.run_coroutine_threadsafe(session.close(), loop)
+            return
+        # Its loop is gone; close it from this one so the connector and sockets are released
+        def closed(task):
+            if not task.cancelled() and task.exception():
+                logger.warning(f"Error closing the previous HTTP session: {str(task.exception())}")
+
+        asyncio.ensure_future(session.close()).add_done_callback(closed)
+
+    def _semaphore_for(self, host: str) -> asyncio.Semaphore:
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.host_limits.get(host, self.limit_per_host))
+            self._host_semaphores[host] = semaphore
+        return semaphore
+
+    @asynccontextmanager
+    async def request(self, method: str, url: str, **kwargs):
+        """Issue a request through the pool; the host slot is held until the body is consumed"""
+        session = await self.get_session()
+        host = (urlsplit(url).hostname or "").lower()
+        async with self._semaphore_for(host):
+            async with session.request(method, url, **kwargs) as response:
+                yield response
+
+    async def post_json(self, url: str, payload: dict, headers: dict = None, timeout: float = None) -> dict:
+        """POST a JSON payload and return the decoded JSON response"""
+        kwargs = {"json": payload, "headers": headers}
+        if timeout is not None:
+            kwargs["timeout"] = aiohttp.ClientTimeout(total=timeout)
+        async with self.request("POST", url, **kwargs) as response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
+
+    async def get_json(self, url: str, params: dict = None, headers: dict = None, timeout: float = None) -> dict:
+        """GET a URL and return the decoded JSON response"""
+        kwargs = {"params": params, "headers": headers}
+        if timeout is not None:
+            kwargs["timeout"] = aiohttp.ClientTimeout(total=timeout)
+        async with self.request("GET", url, **kwargs) as response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
+
+    async def close(self):
+        """Close the pooled session and release all connections"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info("Closed pooled HTTP session")
+        self._session = None
+        self._session_loop = None
+        self._host_semaphores = {}
+
+
+_pool = None
+
+
+def get_http_pool() -> HttpPool:
+    """Return the process-wide HTTP pool"""
+    global _pool
+    if _pool is None:
+        _pool = HttpPool()
+    return _pool
+
+
+def configure_http_pool(**kwargs) -> HttpPool:
+    """Replace the process-wide pool configuration; call before the first request"""
+    global _pool
+    if _pool is not None and _pool._session is not None and not _pool._session.closed:
+        logger.warning("Reconfiguring HTTP pool while a session is open; call close_http_pool() first")
+    _pool = HttpPool(**kwargs)
+    return _pool
+
+
+async def close_http_pool():
+    """Close the process-wide pool if it was ever opened"""
+    if _pool is not None:
+        await _pool.close()
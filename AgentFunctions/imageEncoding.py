@@ -0,0 +1,115 @@
+# In-memory image encoding for vision requests: downscale to what the model actually
+# looks at, then search JPEG/WebP quality to land under a byte budget. Nothing touches disk.
+import io
+import os
+import base64
+import logging
+
+from PIL import Image
+
+logger = logging.getLogger("ImageEncoding")
+logger.setLevel(logging.INFO)
+
+# OpenAI vision fits images within 2048x2048, then scales the short side down to 768
+VISION_MAX_SIDE = 2048
+VISION_SHORT_SIDE = 768
+VISION_BYTE_BUDGET = int(os.getenv("VISION_IMAGE_BYTE_BUDGET", str(350 * 1024)))
+VISION_FORMATS = tuple(os.getenv("VISION_IMAGE_FORMATS", "WEBP,JPEG").split(","))
+MIN_QUALITY = 30
+MAX_QUALITY = 90
+
+MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp", "PNG": "image/png"}
+
+
+def vision_size(width: int, height: int, max_side: int = VISION_MAX_SIDE,
+                short_side: int = VISION_SHORT_SIDE) -> tuple:
+    """Size the vision model will downscale an image to; sending more pixels only costs upload time"""
+    scale = min(1.0, max_side / max(width, height))
+    if min(width, height) * scale > short_side:
+        scale *= short_side / (min(width, height) * scale)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def fit_to_vision(image: Image.Image) -> Image.Image:
+    """Downscale a PIL image to the vision model's effective resolution"""
+    size = vision_size(*image.size)
+    if size != image.size:
+        # reducing_gap lets Pillow shrink 4K captures with a cheap box reduce before resampling
+        image = image.resize(size, Image.LANCZOS, reducing_gap=3.0)
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    return image
+
+
+def _encode(image: Image.Image, image_format: str, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    if image_format == "WEBP":
+        image.save(buffer, format="WEBP", quality=quality, method=4)
+    else:
+        image.save(buffer, format=image_format, quality=quality, optimize=False)
+    return buffer.getvalue()
+
+
+def _best_under_budget(image: Image.Image, image_format: str, byte_budget: int) -> tuple:
+    """Highest quality encoding that fits the budget, or the smallest one if none does"""
+    # Most captures fit at full quality, which needs a single encode
+    data = _encode(image, image_format, MAX_QUALITY)
+    if len(data) <= byte_budget:
+        return data, image_format, MAX_QUALITY
+
+    smallest = _encode(image, image_format, MIN_QUALITY)
+    if len(smallest) > byte_budget:
+        return smallest, image_format, MIN_QUALITY
+
+    fitted = (smallest, image_format, MIN_QUALITY)
+    low, high = MIN_QUALITY + 1, MAX_QUALITY - 1
+    while low <= high:
+        quality = (low + high) // 2
+        data = _encode(image, image_format, quality)
+        if len(data) <= byte_budget:
+            fitted = (data, image_format, quality)
+            low = quality + 1
+        else:
+            high = quality - 1
+    return fitted
+
+
+def encode_to_budget(image: Image.Image, byte_budget: int = VISION_BYTE_BUDGET,
+                     formats: tuple = VISION_FORMATS) -> tuple:
+    """Binary-search the highest quality under the byte budget for each format and keep the best.
+    Returns (encoded bytes, format name, quality)."""
+    best = None
+    for image_format in formats:
+        image_format = image_format.strip().upper()
+        try:
+            candidate = _best_under_budget(image, image_format, byte_budget)
+        except (OSError, KeyError, ValueError) as e:
+            # e.g. Pillow built without WebP support
+            logger.warning(f"Skipping {image_format} encoding: {str(e)}")
+            continue
+
+        # Prefer anything that fits, then higher quality, then fewer bytes
+        rank = (len(candidate[0]) <= byte_budget, candidate[2], -len(candidate[0]))
+        if best is None or rank > (len(best[0]) <= byte_budget, best[2], -len(best[0])):
+            best = candidate
+
+    if best is None:
+        raise ValueError(f"None of the image formats {formats} could be encoded")
+    return best
+
+
+def encode_for_vision(image: Image.Image, byte_budget: int = VISION_BYTE_BUDGET,
+                      formats: tuple = VISION_FORMATS) -> tuple:
+    """Downscale and encode a PIL image for a vision request. Returns (base64 string, mime type)."""
+    image = fit_to_vision(image)
+    data, image_format, quality = encode_to_budget(image, byte_budget, formats)
+    logger.info(f"Encoded {image.size[0]}x{image.size[1]} image as {image_format} q{quality}: {len(data) / 1024:.0f} KB")
+    return base64.b64encode(data).decode('utf-8'), MIME_TYPES[image_format]
+
+
+def encode_png_for_vision(png_bytes: bytes, byte_budget: int = VISION_BYTE_BUDGET,
+                          formats: tuple = VISION_FORMATS) -> tuple:
+    """encode_for_vision() for raw PNG bytes, e.g. a browser screenshot"""
+    with Image.open(io.BytesIO(png_bytes)) as image:
+        image.load()
+        return encode_for_vision(image, byte_budget, formats)
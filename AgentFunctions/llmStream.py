@@ -0,0 +1,247 @@
+# Streaming helpers for chat/completions: parse the SSE stream from the shared HTTP
+# pool and regroup the token deltas into sentence-sized chunks that TTS can speak
+# as soon as they arrive. ToolAnswerLLM then plays a tool's sentence stream as the
+# agent's reply to that tool call, inside the same turn, and chain_before_llm lets
+# several before_llm_cb hooks share the agent.
+import re
+import json
+import uuid
+import asyncio
+import logging
+
+from livekit.agents import llm
+
+from .httpClient import get_http_pool, OPENAI_CHAT_URL
+
+logger = logging.getLogger("LLMStream")
+logger.setLevel(logging.INFO)
+
+# A sentence ends at terminal punctuation followed by whitespace, or at a line break
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])["\')\]]*\s+|\n+')
+# Abbreviations that end in a period but should not end a spoken chunk
+ABBREVIATIONS = {"mr.", "mrs.", "ms.", "dr.", "st.", "vs.", "etc.", "e.g.", "i.e.", "inc.", "jr.", "sr.", "no."}
+
+# Tool result standing in for a sentence stream until ToolAnswerLLM plays it
+STREAMED_ANSWER_PLACEHOLDER = re.compile(r'^\[streamed answer ([0-9a-f]{32})\]$')
+
+MIN_CHUNK_CHARS = 40
+MAX_CHUNK_CHARS = 300
+
+
+async def stream_chat_completion(payload: dict, headers: dict):
+    """Yield content deltas from a streaming chat/completions request"""
+    payload = dict(payload, stream=True)
+    async with get_http_pool().request("POST", OPENAI_CHAT_URL, json=payload, headers=headers) as response:
+        response.raise_for_status()
+        async for raw_line in response.content:
+            line = raw_line.decode("utf-8", errors="replace").strip()
+            if not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            try:
+                event = json.loads(data)
+            except json.JSONDecodeError:
+                logger.warning(f"Skipping malformed stream event: {data[:80]}")
+                continue
+            for choice in event.get("choices", []):
+                delta = choice.get("delta", {}).get("content")
+                if delta:
+                    yield delta
+
+
+def _split_point(buffer: str, min_chars: int, max_chars: int) -> int:
+    """Return the index to cut the buffer at, or -1 if no chunk is ready yet"""
+    for match in SENTENCE_BOUNDARY.finditer(buffer):
+        end = match.end()
+        if end < min_chars:
+            continue
+        last_word = buffer[:match.start()].rsplit(None, 1)[-1].lower() if buffer[:match.start()].strip() else ""
+        if last_word in ABBREVIATIONS:
+            continue
+        return end
+    if len(buffer) >= max_chars:
+        # No sentence boundary in a long run of text, cut at the last space instead
+        cut = buffer.rfind(" ", 0, max_chars)
+        return cut + 1 if cut > 0 else max_chars
+    return -1
+
+
+async def sentence_chunks(deltas, min_chars: int = MIN_CHUNK_CHARS, max_chars: int = MAX_CHUNK_CHARS):
+    """Regroup an async stream of text deltas into sentence-sized chunks"""
+    buffer = ""
+    async for delta in deltas:
+        buffer += delta
+        while True:
+            cut = _split_point(buffer, min_chars, max_chars)
+            if cut < 0:
+                break
+            chunk, buffer = buffer[:cut].strip(), buffer[cut:]
+            if chunk:
+                yield chunk
+    if buffer.strip():
+        yield buffer.strip()
+
+
+async def stream_sentences(payload: dict, headers: dict, error_message: str):
+    """Stream a completion as sentences; failures are logged and spoken as a short apology"""
+    produced = False
+    try:
+        async for chunk in sentence_chunks(stream_chat_completion(payload, headers)):
+            produced = True
+            yield chunk
+    except Exception as e:
+        logger.error(f"Streaming completion failed: {str(e)}", exc_info=True)
+        if not produced:
+            yield f"{error_message}: {str(e)}"
+        else:
+            yield "Sorry, I lost the connection before I could finish that."
+
+
+class StreamedAnswer:
+    """A tool's sentence stream, read in the background as soon as the tool returns and
+    buffered so the reply (and any joined duplicate call) can replay it from the start"""
+
+    def __init__(self, chunks) -> None:
+        self.token = uuid.uuid4().hex
+        self.placeholder = f"[streamed answer {self.token}]"
+        self._chunks = []
+        self._changed = asyncio.Event()
+        self._done = False
+        self._task = asyncio.ensure_future(self._read(chunks))
+
+    async def _read(self, chunks):
+        try:
+            async for chunk in chunks:
+                self._chunks.append(chunk)
+                self._changed.set()
+        except Exception as e:
+            logger.error(f"Streamed answer failed: {str(e)}", exc_info=True)
+        finally:
+            self._done = True
+            self._changed.set()
+
+    async def __aiter__(self):
+        position = 0
+        while True:
+            while position < len(self._chunks):
+                yield self._chunks[position]
+                position += 1
+            if self._done:
+                return
+            self._changed.clear()
+            await self._changed.wait()
+
+    async def text(self) -> str:
+        await asyncio.shield(self._task)
+        return " ".join(self._chunks)
+
+    def fill(self, message):
+        """Put the answer into its tool message: what has arrived so far right away, and the
+        full text once the stream finishes, so an interrupted reply still leaves the tool output"""
+        message.content = " ".join(self._chunks)
+        if not self._done:
+            self._task.add_done_callback(lambda _: setattr(message, "content", " ".join(self._chunks)))
+
+
+def streamed_answer_token(content) -> str:
+    """Token of a streamed-answer placeholder tool result, or None"""
+    match = STREAMED_ANSWER_PLACEHOLDER.match(content) if isinstance(content, str) else None
+    return match.group(1) if match else None
+
+
+class ToolAnswerStream(llm.LLMStream):
+    """Reply to a round of tool results. When every result is a streamed answer the sentences
+    are played directly, with no second completion; otherwise the finished answers are put
+    back into the tool messages and the wrapped LLM writes the reply as usual."""
+
+    def __init__(self, inner: llm.LLM, chat_ctx, fnc_ctx, answers: list, options: dict) -> None:
+        super().__init__(chat_ctx=chat_ctx, fnc_ctx=fnc_ctx)
+        self._inner = inner
+        self._answers = answers  # [(StreamedAnswer, [tool messages it answers])]
+        self._options = options
+        self._chunks = self._produce()
+
+    async def _produce(self):
+        tool_messages = trailing_tool_messages(self.chat_ctx.messages)
+        try:
+            if sum(len(messages) for _, messages in self._answers) == len(tool_messages):
+                for answer, _ in self._answers:
+                    async for sentence in answer:
+                        yield llm.ChatChunk(choices=[llm.Choice(delta=llm.ChoiceDelta(
+                            role="assistant", content=sentence + " "))])
+                return
+
+            for answer, messages in self._answers:
+                text = await answer.text()
+                for message in messages:
+                    message.content = text
+            stream = self._inner.chat(chat_ctx=self.chat_ctx, fnc_ctx=self.fnc_ctx, **self._options)
+            try:
+                async for chunk in stream:
+                    yield chunk
+            finally:
+                await stream.aclose()
+        finally:
+            # The same message objects go into the agent's chat context, so later turns see the
+            # answer even when the user cut the reply short
+            for answer, messages in self._answers:
+                for message in messages:
+                    answer.fill(message)
+
+    async def __anext__(self):
+        return await self._chunks.__anext__()
+
+    async def aclose(self) -> None:
+        await self._chunks.aclose()
+        await super().aclose()
+
+
+def trailing_tool_messages(messages: list) -> list:
+    """The tool results at the end of a chat context, i.e. the round the next reply answers"""
+    tools = []
+    for message in reversed(messages):
+        if message.role != "tool":
+            break
+        tools.append(message)
+    return tools[::-1]
+
+
+class ToolAnswerLLM(llm.LLM):
+    """Wrap the agent's LLM so the follow-up to a tool call that returned a StreamedAnswer plays
+    that answer as the reply. VoicePipelineAgent makes the follow-up call on agent.llm directly,
+    within the turn that called the tool, so the first sentence is heard as soon as it exists.
+    The function context must provide streamed_answer(token)."""
+
+    def __init__(self, inner: llm.LLM) -> None:
+        super().__init__()
+        self.inner = inner
+
+    def chat(self, *, chat_ctx, fnc_ctx=None, **options):
+        answers = {}  # token -> (StreamedAnswer, [tool messages])
+        lookup = getattr(fnc_ctx, "streamed_answer", None)
+        if lookup is not None:
+            for message in trailing_tool_messages(chat_ctx.messages):
+                token = streamed_answer_token(message.content)
+                answer = lookup(token) if token else None
+                if answer is not None:
+                    # Identical calls joined by single-flight share a token; speak the answer once
+                    answers.setdefault(token, (answer, []))[1].append(message)
+        if not answers:
+            return self.inner.chat(chat_ctx=chat_ctx, fnc_ctx=fnc_ctx, **options)
+        return ToolAnswerStream(self.inner, chat_ctx, fnc_ctx, list(answers.values()), options)
+
+
+def chain_before_llm(*callbacks):
+    """Combine before_llm_cb hooks: each one runs in order on the same chat context and the
+    first to return an LLM stream wins; otherwise the agent makes its default call"""
+    async def before_llm(agent, chat_ctx):
+        for callback in callbacks:
+            result = callback(agent, chat_ctx)
+            if asyncio.iscoroutine(result):
+                result = await result
+            if result is not None and result is not False:
+                return result
+        return None
+    return before_llm
@@ -1,69 +1,88 @@
 from geopy.geocoders import Nominatim
 from geopy.distance import geodesic
-import requests
-import logging
 from dotenv import load_dotenv
 import os
 import re
-from datetime import datetime
-import aiohttp
+import asyncio
+from .httpClient import get_http_pool
+from .geocodeCache import GeocodeCache, GeocodeQueue, canonical_place
+from .geoMath import distance_matrix, nearest_k
+from .routeCache import RouteCache, summarize_route
+from .spatialIndex import SpatialIndex, REVERSE_MAX_MILES
+from .gazetteer import load_gazetteer, is_street_address
+from logCreator import create_logger
 
 load_dotenv()
 MAPQUEST_API_KEY = os.getenv("MAPQUEST_API_KEY") 
+COORDINATES_PATTERN = re.compile(r'^\s*(-?\d{1,2}(?:\.\d+)?)\s*,\s*(-?\d{1,3}(?:\.\d+)?)\s*$')
 
 
 
-# Create logs directory if it doesn't exist
-if not os.path.exists('logs'):
-    os.makedirs('logs')
-
-# Configure logger with both file and console handlers
-logger = logging.getLogger("LocationHelp")
-logger.setLevel(logging.INFO)
-
-# Create formatters and handlers
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-
-# File handler - logs/web_search_YYYY-MM-DD.log
-file_handler = logging.FileHandler(
-    f'logs/LocationHelp_{datetime.now().strftime("%Y-%m-%d")}.log',
-    encoding='utf-8'
-)
-file_handler.setFormatter(formatter)
-file_handler.setLevel(logging.INFO)
-
-# Console handler
-console_handler = logging.StreamHandler()
-console_handler.setFormatter(formatter)
-console_handler.setLevel(logging.INFO)
-
-# Add both handlers to logger
-logger.addHandler(file_handler)
-logger.addHandler(console_handler)
+# Console output plus logs/LocationHelp_YYYY-MM-DD.log, opened on the first record
+logger = create_logger("LocationHelp", "LocationHelp")
 
 
 class AssistantLocationFnc:
     def __init__(self):
         self.geolocator = Nominatim(user_agent="HelpMeGPT")
-        self._cache = {}
+        self._cache = GeocodeCache()
+        # Nominatim allows one request per second; lookups queue instead of blocking the loop
+        self._geocoder = GeocodeQueue(self.geolocator)
+        self._routes = RouteCache()
+        # Every resolved place, for nearby and reverse lookups without the network
+        self._places = SpatialIndex(self._cache.path)
+        if not len(self._places):
+            self._places.add_many(
+                (key, key, value["address"], value["latitude"], value["longitude"])
+                for key, value in self._cache.resolved_places()
+            )
+        # Optional offline gazetteer (GAZETTEER_DIR) for cities and landmarks
+        self._gazetteer = load_gazetteer()
 
     async def get_location_info(self, place: str, address_data: dict = None):
         """Get location information optimized for MapQuest"""
         logger.info(f"Getting location info for: {place}")
         try:
-            cache_key = f"{place}_{hash(str(address_data))}"
-            if cache_key in self._cache:
-                return self._cache[cache_key]
-
             # Use structured address data if available
             if address_data and isinstance(address_data, dict):
                 search_query = address_data.get("formatted_address", place)
             else:
                 search_query = place
 
-            location = self.geolocator.geocode(search_query)
+            # Cache reads and writes hit SQLite, so they run off the event loop
+            loop = asyncio.get_event_loop()
+            location = await loop.run_in_executor(None, self._cache.lookup, search_query)
+            if location is not None:
+                logger.info(f"Geocode cache hit for: {search_query}")
+            coordinates = COORDINATES_PATTERN.match(search_query)
+            if location is None and coordinates:
+                # "30.2672, -97.7431": answer from places we already know when one is right there
+                known = self._places.reverse(float(coordinates.group(1)), float(coordinates.group(2)))
+                if known:
+                    logger.info(f"Reverse lookup from known places: {known['address']}")
+                    location = {"address": known["address"], "latitude": known["latitude"], "longitude": known["longitude"]}
+            if location is None and self._gazetteer is not None and not coordinates \
+                    and not is_street_address(search_query):
+                matches = self._gazetteer.lookup(search_query, limit=1)
+                if matches:
+                    logger.info(f"Offline gazetteer match: {matches[0]['address']}")
+                    location = matches[0]
+                    await loop.run_in_executor(None, self._places.add, canonical_place(search_query), place,
+                                               location["address"], location["latitude"], location["longitude"])
+            if location is None:
+                # Street-level addresses and anything the gazetteer doesn't know go online
+                result = await self._geocoder.geocode(search_query)
+                if result:
+                    await loop.run_in_executor(None, self._cache.store, search_query, result.address,
+                                               result.latitude, result.longitude)
+                    await loop.run_in_executor(None, self._places.add, canonical_place(search_query), place,
+                                               result.address, result.latitude, result.longitude)
+                    location = {"address": result.address, "latitude": result.latitude, "longitude": result.longitude}
+                else:
+                    await loop.run_in_executor(None, self._cache.store_missing, search_query)
+                    location = {"not_found": True}
 
-            if not location:
+            if location.get("not_found"):
                 return {
                     "error": "Location not found",
                     "query": place
@@ -72,23 +91,51 @@ class AssistantLocationFnc:
             # Format for MapQuest compatibility
             location_info = {
                 "name": place,
-                "address": location.address,
-                "latitude": location.latitude,
-                "longitude": location.longitude,
+                "address": location["address"],
+                "latitude": location["latitude"],
+                "longitude": location["longitude"],
                 "street": address_data.get("street_address", "") if address_data else "",
                 "city": address_data.get("city", "") if address_data else "",
                 "state": address_data.get("state", "") if address_data else "",
                 "postal_code": address_data.get("postal_code", "") if address_data else "",
                 "mapquest_formatted": self._format_mapquest_address(location)
             }
-
-            self._cache[cache_key] = location_info
             return location_info
 
         except Exception as e:
             logger.error(f"Error getting location info: {str(e)}", exc_info=True)
             return {"error": str(e), "query": place}
 
+    async def cleanup(self):
+        await self._geocoder.close()
+        self._cache.close()
+        self._routes.close()
+        self._places.close()
+
+    async def reverse_lookup(self, latitude: float, longitude: float, max_miles: float = REVERSE_MAX_MILES):
+        """Address of a known place at a coordinate, without a network call"""
+        known = self._places.reverse(latitude, longitude, max_miles)
+        if not known:
+            return {"error": "No known place at those coordinates", "query": f"{latitude}, {longitude}"}
+        return {
+            "name": known["name"],
+            "address": known["address"],
+            "latitude": known["latitude"],
+            "longitude": known["longitude"],
+            "miles_away": known["miles"],
+        }
+
+    async def get_known_places_near(self, place_info: dict, miles: float = 5.0, k: int = 10):
+        """Previously resolved places within a radius of a location, nearest first"""
+        if "error" in place_info:
+            return "Couldn't look up nearby places due to location lookup errors."
+        nearby = self._places.within(place_info["latitude"], place_info["longitude"], miles)
+        nearby = [p for p in nearby if p["address"] != place_info.get("address")][:k]
+        if not nearby:
+            return f"I don't know of any other places within {miles:g} miles of {place_info.get('name')}."
+        lines = [f"{p['name']} ({p['miles']:.1f} miles): {p['address']}" for p in nearby]
+        return f"Places I know near {place_info.get('name')}:\n" + "\n".join(lines)
+
     def _format_mapquest_address(self, location_info: dict) -> str:
         """Format address for MapQuest API - simplified"""
         return location_info.get("address", "")
@@ -101,57 +148,64 @@ class AssistantLocationFnc:
             if "error" in origin_info or "error" in dest_info:
                 return "Couldn't get directions due to location lookup errors."
 
-            url = f"http://www.mapquestapi.com/directions/v1/route?key={MAPQUEST_API_KEY}"
-            
-            # Simplified payload
-            payload = {
-                "locations": [
-                    origin_info.get("address", ""),
-                    dest_info.get("address", "")
-                ],
-                "options": {
-                    "routeType": mode.upper(),
-                    "narrativeType": "text",
-                    "unit": "m",
-                    "enhancedNarrative": True,
-                    "avoidTimedConditions": True
+            route_type = mode.upper()
+            # Route cache reads and writes hit SQLite, so they run off the event loop
+            loop = asyncio.get_event_loop()
+            summary = await loop.run_in_executor(None, self._routes.lookup, origin_info, dest_info, route_type)
+            if summary is not None:
+                logger.info("Route cache hit")
+            else:
+                url = f"http://www.mapquestapi.com/directions/v1/route?key={MAPQUEST_API_KEY}"
+
+                # Simplified payload
+                payload = {
+                    "locations": [
+                        origin_info.get("address", ""),
+                        dest_info.get("address", "")
+                    ],
+                    "options": {
+                        "routeType": route_type,
+                        "narrativeType": "text",
+                        "unit": "m",
+                        "enhancedNarrative": True,
+                        "avoidTimedConditions": True
+                    }
                 }
+
+                async with get_http_pool().request("POST", url, json=payload) as response:
+                    data = await response.json(content_type=None)
+
+                if data["info"]["statuscode"] != 0:
+                    return "Couldn't calculate directions. Please check the addresses."
+                summary = summarize_route(data["route"])
+                await loop.run_in_executor(None, self._routes.store, origin_info, dest_info, route_type, summary)
+
+            return {
+                "distance": summary["distance"],
+                "time": summary["time"],
+                "steps": summary["maneuvers"],
+                "formatted_response": self._format_directions_response(
+                    origin_info["name"],
+                    dest_info["name"],
+                    summary
+                )
             }
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=payload) as response:
-                    data = await response.json()
-                    
-                    if data["info"]["statuscode"] == 0:
-                        route = data["route"]
-                        return {
-                            "distance": route["distance"],
-                            "time": route["formattedTime"],
-                            "steps": [m["narrative"] for m in route["legs"][0]["maneuvers"]],
-                            "formatted_response": self._format_directions_response(
-                                origin_info["name"],
-                                dest_info["name"],
-                                route
-                            )
-                        }
-                    else:
-                        return "Couldn't calculate directions. Please check the addresses."
 
         except Exception as e:
             logger.error(f"Error getting directions: {str(e)}", exc_info=True)
             return f"Sorry, I encountered an error getting directions: {str(e)}"
 
-    def _format_directions_response(self, origin_name: str, dest_name: str, route: dict) -> str:
-        """Format the directions response nicely"""
+    def _format_directions_response(self, origin_name: str, dest_name: str, summary: dict) -> str:
+        """Format a route summary (fresh or cached) nicely"""
         response = [
             f"Directions from {origin_name} to {dest_name}:",
-            f"Total Distance: {route['distance']:.1f} miles",
-            f"Estimated Time: {route['formattedTime']}",
+            f"Total Distance: {summary['distance']:.1f} miles",
+            f"Estimated Time: {summary['time']}",
             "\nStep by Step Directions:"
         ]
         
-        for i, step in enumerate(route["legs"][0]["maneuvers"], 1):
-            response.append(f"{i}. {step['narrative']}")
+        for i, step in enumerate(summary["maneuvers"], 1):
+            response.append(f"{i}. {step}")
             
         return "\n".join(response)
 
@@ -173,3 +227,44 @@ class AssistantLocationFnc:
         except Exception as e:
             logger.error(f"Error calculating distance: {str(e)}", exc_info=True)
             return f"Sorry, I encountered an error calculating the distance: {str(e)}"
+
+    async def get_distance_matrix(self, origins: list, destinations: list, exact: bool = False):
+        """Distances in miles between every origin and every destination, computed in one pass.
+        exact=True uses the WGS-84 ellipsoid instead of a sphere."""
+        try:
+            origins = [o for o in origins if "error" not in o]
+            destinations = [d for d in destinations if "error" not in d]
+            if not origins or not destinations:
+                return "Couldn't calculate distances due to location lookup errors."
+
+            miles = distance_matrix(origins, destinations, exact=exact)
+            return {
+                "origins": [o.get("name") for o in origins],
+                "destinations": [d.get("name") for d in destinations],
+                "miles": miles.round(2).tolist(),
+            }
+
+        except Exception as e:
+            logger.error(f"Error calculating distance matrix: {str(e)}", exc_info=True)
+            return f"Sorry, I encountered an error calculating the distances: {str(e)}"
+
+    async def find_nearest(self, origin_info: dict, candidates: list, k: int = 1, exact: bool = False):
+        """Name the k candidates closest to the origin, e.g. which of several stores is nearest"""
+        try:
+            if "error" in origin_info:
+                return "Couldn't find the nearest place due to location lookup errors."
+            candidates = [c for c in candidates if "error" not in c]
+            if not candidates:
+                return "None of those places could be found."
+
+            nearest = nearest_k(origin_info, candidates, k=k, exact=exact)
+            closest, miles = nearest[0]
+            response = f"The closest to {origin_info.get('name')} is {candidates[closest].get('name')} at {miles:.1f} miles."
+            if len(nearest) > 1:
+                others = ", ".join(f"{candidates[i].get('name')} ({d:.1f} miles)" for i, d in nearest[1:])
+                response += f" After that: {others}."
+            return response
+
+        except Exception as e:
+            logger.error(f"Error finding nearest location: {str(e)}", exc_info=True)
+            return f"Sorry, I encountered an error finding the nearest place: {str(e)}"
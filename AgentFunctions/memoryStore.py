@@ -0,0 +1,243 @@
+# Long-term conversation memory in SQLite. Turns and tool results are queued to a writer
+# thread that commits them in batches, indexed with FTS5, and the most relevant ones are
+# added to the chat context before each LLM turn within a token budget.
+import os
+import time
+import uuid
+import queue
+import sqlite3
+import asyncio
+import logging
+import threading
+from datetime import datetime
+
+from livekit.agents import llm
+
+from .sqliteCache import cache_path
+from .llmStream import streamed_answer_token
+from .textUtils import tokenize
+from .promptBudget import PromptBuilder
+
+logger = logging.getLogger("MemoryStore")
+logger.setLevel(logging.INFO)
+
+MEMORY_ENABLED = os.getenv("MEMORY_ENABLED", "1") == "1"
+MEMORY_TOP_K = int(os.getenv("MEMORY_TOP_K", "5"))
+MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", "400"))
+MEMORY_ITEM_TOKENS = 120
+MEMORY_BATCH_SIZE = 256
+MEMORY_FLUSH_INTERVAL = 0.5
+MAX_QUERY_TERMS = 8
+# Loose (any-word) matches are ranked among only this many of the most recent hits, which
+# keeps common words from making every query score a large share of the history
+MEMORY_SEARCH_WINDOW = int(os.getenv("MEMORY_SEARCH_WINDOW", "2000"))
+MAX_STORED_CHARS = 4000  # tool results can be whole page summaries
+MEMORY_HEADER = "Relevant memories from earlier conversations (use them only if they help):"
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS memories (
+        id INTEGER PRIMARY KEY,
+        session TEXT NOT NULL,
+        role TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        content TEXT NOT NULL,
+        created_at REAL NOT NULL
+    );
+    CREATE VIRTUAL TABLE IF NOT EXISTS memories_fts USING fts5(
+        content, content='memories', content_rowid='id', tokenize='porter unicode61'
+    );
+    CREATE TRIGGER IF NOT EXISTS memories_ai AFTER INSERT ON memories BEGIN
+        INSERT INTO memories_fts(rowid, content) VALUES (new.id, new.content);
+    END;
+    CREATE TRIGGER IF NOT EXISTS memories_ad AFTER DELETE ON memories BEGIN
+        INSERT INTO memories_fts(memories_fts, rowid, content) VALUES ('delete', old.id, old.content);
+    END;
+"""
+
+
+def fts_query(text: str, operator: str = "OR") -> str:
+    """FTS5 query over the distinctive words of a message; quoting keeps FTS5 syntax out of user text"""
+    terms = []
+    for term in tokenize(text):
+        if term not in terms and len(term) > 1:
+            terms.append(term)
+    # Longer words tend to be rarer, and rare words are the ones worth matching on
+    terms = sorted(terms, key=len, reverse=True)[:MAX_QUERY_TERMS]
+    return f" {operator} ".join(f'"{term}"' for term in terms)
+
+
+def message_text(message) -> str:
+    """Plain text of a livekit ChatMessage, ignoring images"""
+    content = message.content
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return " ".join(part for part in content if isinstance(part, str))
+    return ""
+
+
+class MemoryStore:
+    """Batched background writes and FTS5 retrieval of past turns"""
+
+    def __init__(self, path: str = None, session: str = None, top_k: int = MEMORY_TOP_K,
+                 token_budget: int = MEMORY_TOKEN_BUDGET, batch_size: int = MEMORY_BATCH_SIZE,
+                 flush_interval: float = MEMORY_FLUSH_INTERVAL) -> None:
+        self.path = path or cache_path("memory.sqlite")
+        self.session = session or uuid.uuid4().hex
+        self.top_k = top_k
+        self.token_budget = token_budget
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._read_lock = threading.Lock()
+        self._reader = sqlite3.connect(self.path, check_same_thread=False)
+        self._reader.execute("PRAGMA journal_mode=WAL")
+        try:
+            self._reader.executescript(_SCHEMA)
+            self._reader.commit()
+            self.searchable = True
+        except sqlite3.OperationalError as e:
+            # SQLite built without FTS5: still record turns, just don't retrieve them
+            logger.warning(f"FTS5 unavailable, memory retrieval disabled: {str(e)}")
+            self._reader.execute(_SCHEMA.split(";")[0])
+            self._reader.commit()
+            self.searchable = False
+
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="MemoryWriter", daemon=True)
+        self._writer.start()
+
+    def record(self, role: str, content: str, kind: str = "turn"):
+        """Queue a memory for the writer thread; never blocks on SQLite"""
+        content = (content or "").strip()
+        if content:
+            self._queue.put((self.session, role, kind, content[:MAX_STORED_CHARS], time.time()))
+
+    def _write_loop(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        closing = False
+        while not closing:
+            item = self._queue.get()
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is None:
+                    closing = True
+                elif isinstance(item, threading.Event):
+                    # flush() marker: commit what we have, then release the waiter
+                    self._commit(conn, batch)
+                    batch = []
+                    item.set()
+                else:
+                    batch.append(item)
+                if closing or len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            self._commit(conn, batch)
+        conn.close()
+
+    def _commit(self, conn, batch: list):
+        if not batch:
+            return
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO memories(session, role, kind, content, created_at) VALUES (?, ?, ?, ?, ?)",
+                    batch
+                )
+        except sqlite3.Error as e:
+            logger.error(f"Failed to write {len(batch)} memories: {str(e)}")
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Block until everything queued so far is committed"""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def search(self, text: str, limit: int = None, exclude: set = None) -> list:
+        """Most relevant stored memories for a message, best first. Memories containing every
+        distinctive word come first from the whole history, then recent ones sharing any of them."""
+        if not self.searchable:
+            return []
+        loose = fts_query(text)
+        if not loose:
+            return []
+        limit = limit or self.top_k
+        exclude = exclude or set()
+        wanted = limit * 3 if exclude else limit
+        columns = "m.id, m.role, m.kind, m.content, m.created_at"
+        with self._read_lock:
+            rows = self._reader.execute(
+                f"SELECT {columns} FROM memories_fts JOIN memories m ON m.id = memories_fts.rowid "
+                "WHERE memories_fts MATCH ? ORDER BY rank LIMIT ?",
+                (fts_query(text, "AND"), wanted)
+            ).fetchall()
+            if len(rows) < wanted:
+                rows += self._reader.execute(
+                    f"SELECT {columns} FROM (SELECT rowid, rank FROM memories_fts WHERE memories_fts MATCH ? "
+                    "ORDER BY rowid DESC LIMIT ?) hits JOIN memories m ON m.id = hits.rowid "
+                    "ORDER BY hits.rank LIMIT ?",
+                    (loose, MEMORY_SEARCH_WINDOW, wanted * 2)
+                ).fetchall()
+        results, seen = [], set()
+        for memory_id, role, kind, content, created_at in rows:
+            if memory_id in seen or content in exclude:
+                continue
+            seen.add(memory_id)
+            results.append({"role": role, "kind": kind, "content": content, "created_at": created_at})
+        return results[:limit]
+
+    def recall(self, text: str, exclude: set = None) -> str:
+        """Retrieved memories formatted as one prompt section within the token budget, or ''"""
+        memories = self.search(text, exclude=exclude)
+        if not memories:
+            return ""
+        items = [
+            f"- [{datetime.fromtimestamp(m['created_at']).strftime('%Y-%m-%d')} {m['role']}] {m['content']}"
+            for m in memories
+        ]
+        return PromptBuilder(self.token_budget, name="memory recall") \
+            .add(MEMORY_HEADER, items, priority=0, max_item_tokens=MEMORY_ITEM_TOKENS) \
+            .build()
+
+    async def before_llm(self, agent, chat_ctx):
+        """VoicePipelineAgent before_llm_cb: add relevant memories just before the user's message.
+        Returns None so the agent goes on to create its default LLM stream."""
+        if not chat_ctx.messages or chat_ctx.messages[-1].role != "user":
+            return None
+        question = message_text(chat_ctx.messages[-1])
+        in_context = {message_text(m) for m in chat_ctx.messages}
+        try:
+            recalled = await asyncio.get_event_loop().run_in_executor(None, self.recall, question, in_context)
+        except sqlite3.Error as e:
+            logger.error(f"Memory recall failed: {str(e)}")
+            return None
+        if recalled:
+            chat_ctx.messages.insert(len(chat_ctx.messages) - 1, llm.ChatMessage.create(text=recalled, role="system"))
+        return None
+
+    def attach(self, agent):
+        """Record committed user and agent speech and tool results from a VoicePipelineAgent"""
+        agent.on("user_speech_committed", lambda msg: self.record("user", message_text(msg)))
+        agent.on("agent_speech_committed", lambda msg: self.record("assistant", message_text(msg)))
+        agent.on("agent_speech_interrupted", lambda msg: self.record("assistant", message_text(msg)))
+
+        def on_tools(called_functions):
+            for called in called_functions:
+                if called.result is None:
+                    continue
+                result = str(called.result)
+                if streamed_answer_token(result):
+                    continue  # the answer itself is recorded as the agent's speech
+                self.record("tool", f"{called.call_info.function_info.name}: {result}", kind="tool")
+        agent.on("function_calls_finished", on_tools)
+
+    def close(self):
+        self._queue.put(None)
+        self._writer.join(10)
+        with self._read_lock:
+            self._reader.close()
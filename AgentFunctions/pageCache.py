@@ -0,0 +1,93 @@
+# On-disk cache of extracted page content for traverse_web, keyed by normalized URL.
+# Entries keep the ETag / Last-Modified validators so stale pages can be revalidated
+# with a conditional GET instead of being downloaded and parsed again.
+import os
+import re
+import logging
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from .sqliteCache import SQLiteCache, cache_path
+
+logger = logging.getLogger("PageCache")
+logger.setLevel(logging.INFO)
+
+PAGE_CACHE_TTL = float(os.getenv("PAGE_CACHE_TTL", str(6 * 3600)))
+PAGE_CACHE_MAX_STALE = float(os.getenv("PAGE_CACHE_MAX_STALE", str(7 * 24 * 3600)))
+PAGE_CACHE_MAX_ENTRIES = int(os.getenv("PAGE_CACHE_MAX_ENTRIES", "500"))
+PAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Query parameters that only track the visitor and never change the page content.
+# "ref" is not one of them: on many sites it selects content, e.g. GitHub's ?ref=branch
+TRACKING_PARAMS = re.compile(r'^(utm_\w+|fbclid|gclid|mc_cid|mc_eid|ref_src)$', re.IGNORECASE)
+
+
+def normalize_url(url: str) -> str:
+    """Canonical cache key for a URL: lowercase scheme/host, no default port, fragment or tracking params"""
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or "http").lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and not ((scheme == "http" and parts.port == 80) or (scheme == "https" and parts.port == 443)):
+        host = f"{host}:{parts.port}"
+    path = parts.path or "/"
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not TRACKING_PARAMS.match(k)
+    ))
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+def max_age_from_headers(headers) -> float:
+    """Return the Cache-Control max-age in seconds, 0 for no-store/no-cache, or None if absent"""
+    cache_control = headers.get("Cache-Control", "") if headers else ""
+    if re.search(r'\bno-(store|cache)\b', cache_control, re.IGNORECASE):
+        return 0
+    match = re.search(r'\bmax-age=(\d+)', cache_control, re.IGNORECASE)
+    return float(match.group(1)) if match else None
+
+
+class PageCache(SQLiteCache):
+    """Persistent extract_content() cache with HTTP validators for conditional revalidation"""
+
+    def __init__(self, path: str = None, ttl: float = PAGE_CACHE_TTL) -> None:
+        super().__init__(
+            path or cache_path("pages.sqlite"),
+            max_entries=PAGE_CACHE_MAX_ENTRIES,
+            max_bytes=PAGE_CACHE_MAX_BYTES,
+            default_ttl=ttl,
+            max_stale=PAGE_CACHE_MAX_STALE,
+        )
+
+    def lookup(self, url: str):
+        """Return the cached entry for a URL, including stale ones that can be revalidated"""
+        return self.get(normalize_url(url), allow_stale=True)
+
+    def store(self, url: str, content: dict, headers=None):
+        """Cache extracted content along with the response's validators"""
+        max_age = max_age_from_headers(headers)
+        if max_age == 0 and not (headers and (headers.get("ETag") or headers.get("Last-Modified"))):
+            # Nothing to revalidate against and the server asked us not to reuse it
+            return
+        ttl = self.default_ttl if max_age is None else min(max_age, self.default_ttl)
+        self.set(normalize_url(url), {
+            "content": content,
+            "etag": headers.get("ETag") if headers else None,
+            "last_modified": headers.get("Last-Modified") if headers else None,
+        }, ttl=ttl)
+
+    def revalidated(self, url: str, headers=None):
+        """Mark a stale entry fresh again after a 304 Not Modified"""
+        max_age = max_age_from_headers(headers)
+        ttl = self.default_ttl if max_age is None else min(max_age, self.default_ttl)
+        self.refresh(normalize_url(url), ttl=ttl)
+
+
+def conditional_headers(entry) -> dict:
+    """If-None-Match / If-Modified-Since headers for revalidating a cached entry"""
+    headers = {}
+    if entry:
+        value = entry["value"]
+        if value.get("etag"):
+            headers["If-None-Match"] = value["etag"]
+        if value.get("last_modified"):
+            headers["If-Modified-Since"] = value["last_modified"]
+    return headers
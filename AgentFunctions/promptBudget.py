@@ -0,0 +1,182 @@
+# Token-aware prompt building. Sections are filled by priority into a fixed token budget
+# so a single long paragraph can't blow up a request and short content isn't wasted.
+import os
+import asyncio
+import logging
+import threading
+
+from .textUtils import estimate_tokens
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken is in requirements.txt; fall back to the character-based estimate
+    tiktoken = None
+
+logger = logging.getLogger("PromptBudget")
+logger.setLevel(logging.INFO)
+
+DEFAULT_MODEL = "gpt-4o-mini"
+WEBPAGE_PROMPT_TOKENS = int(os.getenv("WEBPAGE_PROMPT_TOKENS", "3000"))
+SEARCH_PROMPT_TOKENS = int(os.getenv("SEARCH_PROMPT_TOKENS", "1500"))
+SECTION_SEPARATOR_TOKENS = 2  # newline after the header and the blank line before the next section
+
+
+_encodings = {}  # model -> tiktoken encoding, or None when it couldn't be loaded
+_loading = set()
+_encoding_lock = threading.Lock()
+
+
+def load_encoding(model: str = DEFAULT_MODEL):
+    """Load the tiktoken encoding for a model, once. The first load may download it, so run
+    this off the event loop (main.py does at startup). Any failure means estimates from then on."""
+    if model in _encodings:
+        return _encodings[model]
+    with _encoding_lock:
+        if model not in _encodings:
+            encoding = None
+            if tiktoken is not None:
+                try:
+                    try:
+                        encoding = tiktoken.encoding_for_model(model)
+                    except KeyError:
+                        encoding = tiktoken.get_encoding("o200k_base")
+                except Exception as e:
+                    logger.warning(f"tiktoken encoding for {model} unavailable, estimating tokens instead: {str(e)}")
+            _encodings[model] = encoding
+    return _encodings[model]
+
+
+def _encoding(model: str):
+    if model in _encodings:
+        return _encodings[model]
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return load_encoding(model)
+    # Never load on the event loop; estimate until the background load has finished
+    if model not in _loading:
+        _loading.add(model)
+        loop.run_in_executor(None, load_encoding, model)
+    return None
+
+
+def count_tokens(text: str, model: str = DEFAULT_MODEL) -> int:
+    """Count tokens locally with tiktoken, or estimate them when it isn't installed"""
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str = DEFAULT_MODEL) -> str:
+    """Cut text down to at most max_tokens as count_tokens measures it, ending on a word
+    boundary where possible"""
+    if max_tokens <= 0 or not text:
+        return ""
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    encoding = _encoding(model)
+    tokens = encoding.encode(text, disallowed_special=()) if encoding is not None else None
+    limit = max_tokens
+    while limit > 0:
+        cut = text[:limit * 4] if encoding is None else encoding.decode(tokens[:limit])
+        space = cut.rfind(" ")
+        truncated = (cut[:space] if space > len(cut) // 2 else cut).rstrip() + "…"
+        # The ellipsis and re-tokenizing the cut can cost a token or two more than the limit
+        over = count_tokens(truncated, model) - max_tokens
+        if over <= 0:
+            return truncated
+        limit -= over
+    return ""
+
+
+def count_message_tokens(messages: list, model: str = DEFAULT_MODEL) -> int:
+    """Approximate prompt tokens for a chat/completions message list (text parts only)"""
+    total = 0
+    for message in messages:
+        total += 4  # role and message framing
+        content = message.get("content")
+        if isinstance(content, str):
+            total += count_tokens(content, model)
+        elif isinstance(content, list):
+            total += sum(count_tokens(part.get("text", ""), model) for part in content if part.get("type") == "text")
+    return total + 2
+
+
+class PromptBuilder:
+    """Fill labelled sections into a token budget by priority (lower number = filled first)"""
+
+    def __init__(self, token_budget: int, name: str = "prompt", model: str = DEFAULT_MODEL) -> None:
+        self.token_budget = token_budget
+        self.name = name
+        self.model = model
+        self._sections = []
+
+    def add(self, header: str, items: list, priority: int, max_item_tokens: int = None):
+        """Queue a section; items are added in order until the budget runs out"""
+        self._sections.append({
+            "header": header,
+            "items": [item for item in items if item and item.strip()],
+            "priority": priority,
+            "max_item_tokens": max_item_tokens,
+            "kept": [],
+        })
+        return self
+
+    def build(self) -> str:
+        remaining = self.token_budget
+        for section in sorted(self._sections, key=lambda s: s["priority"]):
+            if not section["items"]:
+                continue
+            header_tokens = SECTION_SEPARATOR_TOKENS + \
+                (count_tokens(section["header"], self.model) if section["header"] else 0)
+            if header_tokens >= remaining:
+                continue
+            remaining -= header_tokens
+            for item in section["items"]:
+                if section["max_item_tokens"]:
+                    item = truncate_to_tokens(item, section["max_item_tokens"], self.model)
+                tokens = count_tokens(item, self.model) + 1  # newline
+                if tokens > remaining:
+                    if not section["kept"] and remaining > 20:
+                        # Never drop a whole section just because its first item is long
+                        item = truncate_to_tokens(item, remaining - 1, self.model)
+                        section["kept"].append(item)
+                        remaining -= count_tokens(item, self.model) + 1
+                    break
+                section["kept"].append(item)
+                remaining -= tokens
+            if not section["kept"]:
+                remaining += header_tokens
+
+        prompt = self._assemble()
+        # Tokens don't always add up across the joins; trim the least important items until
+        # the assembled prompt itself fits
+        while count_tokens(prompt, self.model) > self.token_budget:
+            section = max((s for s in self._sections if s["kept"]), key=lambda s: s["priority"])
+            over = count_tokens(prompt, self.model) - self.token_budget
+            last = section["kept"].pop()
+            shortened = truncate_to_tokens(last, count_tokens(last, self.model) - over, self.model)
+            if shortened:
+                section["kept"].append(shortened)
+            prompt = self._assemble()
+
+        used = count_tokens(prompt, self.model)
+        report = ", ".join(
+            f"{s['header'].strip(': ') or 'untitled'} {len(s['kept'])}/{len(s['items'])}"
+            for s in self._sections if s["items"]
+        )
+        logger.info(f"Built {self.name} with {used}/{self.token_budget} tokens ({report})")
+
+        return prompt
+
+    def _assemble(self) -> str:
+        # Sections keep the order they were added in, whatever their priority
+        parts = []
+        for section in self._sections:
+            if section["kept"]:
+                body = "\n".join(section["kept"])
+                parts.append(f"{section['header']}\n{body}" if section["header"] else body)
+        return "\n\n".join(parts)
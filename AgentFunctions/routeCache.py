@@ -0,0 +1,54 @@
+# Persistent cache of MapQuest routes keyed on rounded origin/destination coordinates and
+# route type, so repeated commute questions are answered without another API call.
+import os
+import logging
+
+from .sqliteCache import SQLiteCache, cache_path
+from .geocodeCache import canonical_place
+
+logger = logging.getLogger("RouteCache")
+logger.setLevel(logging.INFO)
+
+ROUTE_CACHE_TTL = float(os.getenv("ROUTE_CACHE_TTL", str(7 * 24 * 3600)))
+ROUTE_CACHE_MAX_ENTRIES = int(os.getenv("ROUTE_CACHE_MAX_ENTRIES", "2000"))
+# 4 decimal places is about 11 m, well inside one geocoded address
+COORDINATE_PRECISION = int(os.getenv("ROUTE_CACHE_PRECISION", "4"))
+
+
+def location_key(location_info: dict) -> str:
+    """Rounded coordinates when the location has them, otherwise its canonical address"""
+    latitude, longitude = location_info.get("latitude"), location_info.get("longitude")
+    if latitude is not None and longitude is not None:
+        return f"{round(latitude, COORDINATE_PRECISION)},{round(longitude, COORDINATE_PRECISION)}"
+    return canonical_place(location_info.get("address") or location_info.get("name", ""))
+
+
+def route_key(origin_info: dict, dest_info: dict, route_type: str) -> str:
+    return f"{route_type.upper()}|{location_key(origin_info)}|{location_key(dest_info)}"
+
+
+def summarize_route(route: dict) -> dict:
+    """The parts of a MapQuest route we answer from: distance, time and maneuver narratives"""
+    return {
+        "distance": route["distance"],
+        "time": route["formattedTime"],
+        "maneuvers": [m["narrative"] for m in route["legs"][0]["maneuvers"]],
+    }
+
+
+class RouteCache(SQLiteCache):
+    """Route summaries that survive worker restarts"""
+
+    def __init__(self, path: str = None) -> None:
+        super().__init__(
+            path or cache_path("routes.sqlite"),
+            max_entries=ROUTE_CACHE_MAX_ENTRIES,
+            default_ttl=ROUTE_CACHE_TTL,
+        )
+
+    def lookup(self, origin_info: dict, dest_info: dict, route_type: str):
+        entry = self.get(route_key(origin_info, dest_info, route_type))
+        return entry["value"] if entry else None
+
+    def store(self, origin_info: dict, dest_info: dict, route_type: str, summary: dict):
+        self.set(route_key(origin_info, dest_info, route_type), summary)
@@ -0,0 +1,149 @@
+# Screen change detection. Each capture is reduced to a perceptual hash plus a small
+# grayscale grid; an unchanged screen reuses its cached explanation and a partly
+# changed one only needs the changed region sent to the vision model.
+import os
+import time
+import logging
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+
+from .answerCache import ERROR_PREFIXES
+
+logger = logging.getLogger("ScreenDiff")
+logger.setLevel(logging.INFO)
+
+GRID_SIZE = (64, 36)  # one cell per ~60px on a 4K screen
+HASH_SIZE = 8
+CELL_THRESHOLD = int(os.getenv("SCREEN_DIFF_CELL_THRESHOLD", "12"))  # mean gray level change per cell
+# Below this fraction of changed cells (a ticking clock, a blinking caret) the screen counts as unchanged
+MIN_CHANGED_FRACTION = float(os.getenv("SCREEN_DIFF_MIN_CHANGED", "0.002"))
+# Above this fraction of the screen a "what changed" crop is no cheaper than a full explanation
+MAX_REGION_FRACTION = float(os.getenv("SCREEN_DIFF_MAX_REGION", "0.4"))
+REGION_PADDING = 0.02
+HASH_DISTANCE = 4
+SCREEN_CACHE_TTL = float(os.getenv("SCREEN_CACHE_TTL", "600"))
+SCREEN_CACHE_MAX_ENTRIES = int(os.getenv("SCREEN_CACHE_MAX_ENTRIES", "32"))
+
+
+def fingerprint(image: Image.Image) -> dict:
+    """Perceptual difference hash and downsampled grayscale grid of a capture"""
+    gray = image.convert("L")
+    small = gray.resize((HASH_SIZE + 1, HASH_SIZE), Image.BILINEAR, reducing_gap=2.0)
+    pixels = np.asarray(small, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    grid = np.asarray(gray.resize(GRID_SIZE, Image.BILINEAR, reducing_gap=2.0), dtype=np.int16)
+    return {
+        "hash": int("".join("1" if bit else "0" for bit in bits), 2),
+        "grid": grid,
+        "size": image.size,
+    }
+
+
+def hamming(first: int, second: int) -> int:
+    return bin(first ^ second).count("1")
+
+
+def changed_cells(previous: dict, current: dict) -> np.ndarray:
+    """Boolean grid of cells whose brightness moved by more than CELL_THRESHOLD"""
+    return np.abs(current["grid"] - previous["grid"]) > CELL_THRESHOLD
+
+
+def is_unchanged(previous: dict, current: dict) -> bool:
+    if previous["size"] != current["size"] or hamming(previous["hash"], current["hash"]) > HASH_DISTANCE:
+        return False
+    return changed_cells(previous, current).mean() < MIN_CHANGED_FRACTION
+
+
+def changed_region(previous: dict, current: dict):
+    """Bounding box (left, top, right, bottom) in pixels of what changed between two captures,
+    or None when nothing meaningful changed or too much changed to be worth cropping"""
+    if previous["size"] != current["size"]:
+        return None
+    cells = changed_cells(previous, current)
+    if cells.mean() < MIN_CHANGED_FRACTION:
+        return None
+    rows = np.flatnonzero(cells.any(axis=1))
+    columns = np.flatnonzero(cells.any(axis=0))
+
+    width, height = current["size"]
+    cell_width = width / GRID_SIZE[0]
+    cell_height = height / GRID_SIZE[1]
+    pad_x, pad_y = width * REGION_PADDING, height * REGION_PADDING
+    left = max(0, int(columns[0] * cell_width - pad_x))
+    top = max(0, int(rows[0] * cell_height - pad_y))
+    right = min(width, int((columns[-1] + 1) * cell_width + pad_x))
+    bottom = min(height, int((rows[-1] + 1) * cell_height + pad_y))
+
+    if (right - left) * (bottom - top) > MAX_REGION_FRACTION * width * height:
+        return None
+    return left, top, right, bottom
+
+
+class ScreenAnswerCache:
+    """Explanations keyed by capture fingerprint, plus the last capture for diffing"""
+
+    def __init__(self, ttl: float = SCREEN_CACHE_TTL, max_entries: int = SCREEN_CACHE_MAX_ENTRIES) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._next_id = 0
+        self.last = None  # {"fingerprint", "answer"} of the most recent explanation
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, current: dict):
+        """Return the cached explanation for an unchanged screen, or None"""
+        now = time.time()
+        for entry_id, entry in list(self._entries.items()):
+            if entry["expires_at"] <= now:
+                del self._entries[entry_id]
+                continue
+            if is_unchanged(entry["fingerprint"], current):
+                self.hits += 1
+                self._entries.move_to_end(entry_id)
+                self.last = entry
+                return entry["answer"]
+        self.misses += 1
+        return None
+
+    def latest(self):
+        """The most recent full explanation while it is still fresh, as a base for describing changes"""
+        if self.last is not None and self.last["expires_at"] <= time.time():
+            self.last = None
+        return self.last
+
+    def store(self, current: dict, answer: str):
+        """Cache a full explanation of the screen; answers about what changed don't belong here"""
+        if not answer or answer.startswith(ERROR_PREFIXES):
+            return
+        entry = {"fingerprint": current, "answer": answer, "expires_at": time.time() + self.ttl}
+        self._entries[self._next_id] = entry
+        self._next_id += 1
+        self.last = entry
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def record_stream(self, chunks, current: dict):
+        """Pass a streamed explanation through and cache its full text once it completes"""
+        parts = []
+        async for chunk in chunks:
+            parts.append(chunk)
+            yield chunk
+        # A stream that failed part way ends with an apology rather than starting with one
+        if not any(part.startswith(ERROR_PREFIXES) for part in parts):
+            self.store(current, " ".join(parts))
+
+    def clear(self):
+        self._entries.clear()
+        self.last = None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "entries": len(self._entries),
+        }
@@ -1,67 +1,179 @@
 import os
-import pyautogui
-import cv2
-import numpy as np
-import aiohttp  # Change to aiohttp for async requests
-import base64
-from openai import OpenAI
+from .httpClient import get_http_pool, OPENAI_CHAT_URL
+from .llmStream import stream_sentences
+from .imageEncoding import encode_for_vision
+from .screenDiff import ScreenAnswerCache, fingerprint, changed_region
+from .screenWatcher import ScreenWatcher, SCREEN_WATCHER_ENABLED
 from dotenv import load_dotenv
 import logging
 import asyncio
+import time
 
 logger = logging.getLogger("ScreenHelp")
 logger.setLevel(logging.INFO)
 load_dotenv()
 openai_api_key = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=openai_api_key)
+
+EXPLAIN_PROMPT = "As a teacher, Explain the following image to me. Keep it short and concise. Don't include an overall conclusion. Just explain the image."
+CHANGE_PROMPT = ("Earlier, the screen was explained like this: {previous}\n\n"
+                 "This image is only the part of the screen that has changed since then. "
+                 "Briefly explain what changed. Keep it short and concise.")
+HIGHLIGHT_PROMPT = ("This image is text I've highlighted on my screen. {question} "
+                    "Keep it short and concise.")
+RECENT_ACTIVITY_PROMPT = ("These are snapshots of my screen from the last {seconds:g} seconds, oldest first. "
+                          "The first is the whole screen; later ones may only show the part that changed. "
+                          "Briefly explain what just happened. Keep it short and concise.")
 
 class AssistantScreenFnc:
-    def __init__(self) -> None:
+    def __init__(self, watch: bool = None) -> None:
         self._lock = asyncio.Lock()
+        self._answers = ScreenAnswerCache()
+        # Optional background capture so explanations can start uploading straight away
+        if watch is None:
+            watch = SCREEN_WATCHER_ENABLED
+        self.watcher = ScreenWatcher() if watch else None
+        if self.watcher:
+            self.watcher.start()
 
-    async def explain_concept(self):
+    async def explain_concept(self, stream: bool = False):
         logger.info("Explaining screen concept")
         try:
             async with self._lock:
-                # Take screenshot in executor to prevent blocking
-                image = await asyncio.get_event_loop().run_in_executor(
-                    None, pyautogui.screenshot
-                )
-                
-                # Convert image in executor
-                image_array = np.array(image)
-                image = await asyncio.get_event_loop().run_in_executor(
-                    None, cv2.cvtColor, image_array, cv2.COLOR_RGB2BGR
-                )
-                
-                in_memory_path = "in_memory.png"
-                await asyncio.get_event_loop().run_in_executor(
-                    None, cv2.imwrite, in_memory_path, image
-                )
-                
-                message = await explain_with_ai(in_memory_path)
+                loop = asyncio.get_event_loop()
+                frame = self.watcher.latest() if self.watcher else None
+                if frame:
+                    # The watcher owns this frame, so it is not closed here
+                    image, current = frame["image"], frame["fingerprint"]
+                else:
+                    # Capture and fingerprint in executor to prevent blocking
+                    image, current = await loop.run_in_executor(None, capture_screen)
+                try:
+                    cached = self._answers.lookup(current)
+                    if cached:
+                        logger.info("Screen unchanged since the last explanation, reusing it")
+                        return cached
+
+                    previous = self._answers.latest()
+                    region = changed_region(previous["fingerprint"], current) if previous else None
+                    if region:
+                        logger.info(f"Only {region} changed, sending that region")
+                        base64_image, mime_type = await loop.run_in_executor(
+                            None, encode_for_vision, image.crop(region)
+                        )
+                        prompt = CHANGE_PROMPT.format(previous=previous["answer"])
+                    elif frame:
+                        base64_image, mime_type = frame["base64"], frame["mime_type"]
+                        prompt = EXPLAIN_PROMPT
+                    else:
+                        base64_image, mime_type = await loop.run_in_executor(
+                            None, encode_for_vision, image
+                        )
+                        prompt = EXPLAIN_PROMPT
+                finally:
+                    if not frame:
+                        image.close()
+
+                message = await explain_with_ai(base64_image, mime_type, prompt=prompt, stream=stream)
+                if region:
+                    # Only says what changed since the previous answer, so it can't stand in
+                    # for a full explanation of this screen later
+                    return message
+                if stream:
+                    return self._answers.record_stream(message, current)
+                self._answers.store(current, message)
                 return message
         except Exception as e:
             logger.error(f"Error in explain_concept: {e}")
             return f"Sorry, I encountered an error: {str(e)}"
 
-    async def get_highlighted_text(self):
+    async def explain_recent_activity(self, seconds: float = 30, stream: bool = False):
+        logger.info(f"Explaining screen activity from the last {seconds}s")
+        if not self.watcher:
+            return "I'm not watching the screen in the background, so I can only explain what's on it right now."
+        frames = self.watcher.recent(seconds)
+        if not frames:
+            return "I haven't seen anything change on your screen recently."
+
+        now = time.time()
+        content = [{"type": "text", "text": RECENT_ACTIVITY_PROMPT.format(seconds=seconds)}]
+        for frame in frames:
+            label = "Whole screen" if frame["kind"] == "key" else "Changed region"
+            content.append({"type": "text", "text": f"{label}, {now - frame['time']:.0f} seconds ago:"})
+            content.append({
+                "type": "image_url",
+                "image_url": {"url": f"data:{frame['mime_type']};base64,{frame['base64']}"}
+            })
+        return await explain_content_with_ai(content, stream=stream)
+
+    async def cleanup(self):
+        if self.watcher:
+            await asyncio.get_event_loop().run_in_executor(None, self.watcher.stop)
+        self._answers.clear()
+
+    async def get_highlighted_text(self, question: str = None, stream: bool = False):
         logger.info("Getting highlighted text")
-        return "Highlighted text functionality not implemented yet."
+        try:
+            async with self._lock:
+                loop = asyncio.get_event_loop()
+                frame = self.watcher.latest() if self.watcher else None
+                if frame:
+                    image = frame["image"]
+                else:
+                    image = await loop.run_in_executor(None, screenshot)
+                try:
+                    box = await loop.run_in_executor(None, find_highlight, image)
+                    if box is None:
+                        return "I couldn't find any highlighted text on your screen. Select the text and ask me again."
+                    # Only the selection is sent, usually a small fraction of the screen
+                    base64_image, mime_type = await loop.run_in_executor(
+                        None, encode_for_vision, image.crop(box)
+                    )
+                finally:
+                    if not frame:
+                        image.close()
+
+            prompt = HIGHLIGHT_PROMPT.format(question=question or "As a teacher, explain it to me.")
+            return await explain_with_ai(base64_image, mime_type, prompt=prompt, stream=stream)
+        except Exception as e:
+            logger.error(f"Error in get_highlighted_text: {e}")
+            return f"Sorry, I encountered an error: {str(e)}"
 
-# Function to encode the image
-def encode_image(image_path):
-    with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode('utf-8')
+def screenshot():
+    """The screen as an RGB PIL image. pyautogui is imported on the first capture, which
+    runs in an executor, so neither startup nor the event loop pays for loading it."""
+    import pyautogui
+    return pyautogui.screenshot()
 
-async def explain_with_ai(image_path):
-    logger.info(f"Explaining image: {image_path}")
-    try:
-        # Encode image in executor to prevent blocking
-        base64_image = await asyncio.get_event_loop().run_in_executor(
-            None, encode_image, image_path
-        )
+def find_highlight(image):
+    """Crop box of the highlighted text in a screenshot; OpenCV is loaded on first use"""
+    from .highlightDetect import highlight_crop_box
+    return highlight_crop_box(image)
 
+def capture_screen():
+    """Grab the screen as an RGB PIL image along with its change-detection fingerprint.
+    pyautogui already returns RGB, so no array or color conversion copies are needed."""
+    image = screenshot()
+    return image, fingerprint(image)
+
+async def explain_with_ai(base64_image, mime_type="image/png", prompt=EXPLAIN_PROMPT, stream=False):
+    logger.info(f"Explaining {mime_type} image ({len(base64_image) * 3 // 4 // 1024} KB)")
+    content = [
+        {
+            "type": "text",
+            "text": prompt
+        },
+        {
+            "type": "image_url",
+            "image_url": {
+                "url": f"data:{mime_type};base64,{base64_image}"
+            }
+        }
+    ]
+    return await explain_content_with_ai(content, stream=stream)
+
+async def explain_content_with_ai(content, stream=False):
+    """Send a vision message made of text and image parts"""
+    try:
         headers = {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {openai_api_key}"
@@ -72,44 +184,22 @@ async def explain_with_ai(image_path):
             "messages": [
                 {
                     "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": "As a teacher, Explain the following image to me. Keep it short and concise. Don't include an overall conclusion. Just explain the image."
-                        },
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/png;base64,{base64_image}"
-                            }
-                        }
-                    ]
+                    "content": content
                 }
             ],
             "max_tokens": 700
         }
 
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.post(
-                    "https://api.openai.com/v1/chat/completions",
-                    headers=headers,
-                    json=payload,
-                    timeout=aiohttp.ClientTimeout(total=30)
-                ) as response:
-                    response.raise_for_status()
-                    result = await response.json()
-                    return result["choices"][0]["message"]["content"]
-            except asyncio.TimeoutError:
-                logger.warning("Request timed out, retrying without timeout")
-                async with session.post(
-                    "https://api.openai.com/v1/chat/completions",
-                    headers=headers,
-                    json=payload
-                ) as response:
-                    response.raise_for_status()
-                    result = await response.json()
-                    return result["choices"][0]["message"]["content"]
+        if stream:
+            return stream_sentences(payload, headers, "An error occurred while processing the image")
+
+        pool = get_http_pool()
+        try:
+            result = await pool.post_json(OPENAI_CHAT_URL, payload, headers=headers, timeout=30)
+        except asyncio.TimeoutError:
+            logger.warning("Request timed out, retrying with the pool's default timeout")
+            result = await pool.post_json(OPENAI_CHAT_URL, payload, headers=headers)
+        return result["choices"][0]["message"]["content"]
     except Exception as e:
         logger.error(f"Error in API request: {str(e)}")
         return f"An error occurred while processing the image: {str(e)}"
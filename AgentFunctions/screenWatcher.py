@@ -0,0 +1,177 @@
+# Background screen watcher. A worker thread captures the screen at a low, adaptive frame
+# rate, keeps the latest frame already encoded for the vision model, and records a short
+# ring buffer of keyframes and changed regions so recent activity can be explained.
+import os
+import time
+import logging
+import threading
+from collections import deque
+
+from .imageEncoding import encode_for_vision
+from .screenDiff import fingerprint, is_unchanged, changed_region
+
+logger = logging.getLogger("ScreenWatcher")
+logger.setLevel(logging.INFO)
+
+SCREEN_WATCHER_ENABLED = os.getenv("SCREEN_WATCHER", "0") == "1"
+WATCHER_MIN_FPS = float(os.getenv("SCREEN_WATCHER_MIN_FPS", "0.5"))  # when nothing is changing
+WATCHER_MAX_FPS = float(os.getenv("SCREEN_WATCHER_MAX_FPS", "2"))  # while the screen is busy
+WATCHER_HISTORY_SECONDS = float(os.getenv("SCREEN_WATCHER_SECONDS", "60"))
+WATCHER_MAX_FRAMES = int(os.getenv("SCREEN_WATCHER_MAX_FRAMES", "40"))
+WATCHER_BUFFER_BYTES = int(os.getenv("SCREEN_WATCHER_BUFFER_BYTES", str(4 * 1024 * 1024)))
+WATCHER_FRAME_BYTES = int(os.getenv("SCREEN_WATCHER_FRAME_BYTES", str(120 * 1024)))  # per changed region
+KEYFRAME_EVERY = int(os.getenv("SCREEN_WATCHER_KEYFRAME_EVERY", "6"))  # diffs between keyframes
+SLOWDOWN = 1.5
+
+
+class ScreenWatcher:
+    """Capture the screen in a worker thread and keep recent frames ready to send"""
+
+    def __init__(self, min_fps: float = WATCHER_MIN_FPS, max_fps: float = WATCHER_MAX_FPS,
+                 history_seconds: float = WATCHER_HISTORY_SECONDS, max_frames: int = WATCHER_MAX_FRAMES,
+                 buffer_bytes: int = WATCHER_BUFFER_BYTES, frame_bytes: int = WATCHER_FRAME_BYTES,
+                 capture=None) -> None:
+        self.min_interval = 1.0 / max_fps
+        self.max_interval = 1.0 / min_fps
+        self.history_seconds = history_seconds
+        self.max_frames = max_frames
+        self.buffer_bytes = buffer_bytes
+        self.frame_bytes = frame_bytes
+        if capture is None:
+            import pyautogui  # only loaded once a watcher is actually created
+            capture = pyautogui.screenshot
+        self._capture = capture
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._latest = None
+        self._frames = deque()
+        self._buffered_bytes = 0
+        self._since_keyframe = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ScreenWatcher", daemon=True)
+        self._thread.start()
+        logger.info(f"Screen watcher started ({1 / self.max_interval:g}-{1 / self.min_interval:g} fps)")
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        with self._lock:
+            self._latest = None
+            self._frames.clear()
+            self._buffered_bytes = 0
+
+    def latest(self, max_age: float = None):
+        """The most recent frame if the screen was checked within max_age seconds, else None.
+        Frames hold the PIL image, its fingerprint and a ready base64 encoding."""
+        max_age = self.max_interval + self.min_interval if max_age is None else max_age
+        with self._lock:
+            frame = self._latest
+        if frame is None or time.time() - frame["checked_at"] > max_age:
+            return None
+        return frame
+
+    def recent(self, seconds: float = None, limit: int = 6) -> list:
+        """Up to `limit` buffered frames from the last `seconds`, oldest first, starting
+        from a keyframe so every changed region has something to be compared against"""
+        seconds = self.history_seconds if seconds is None else seconds
+        cutoff = time.time() - seconds
+        with self._lock:
+            frames = list(self._frames)
+        if not frames:
+            return []
+
+        start = 0
+        for index, frame in enumerate(frames):
+            if frame["time"] >= cutoff:
+                break
+            if frame["kind"] == "key":
+                start = index
+        frames = frames[start:]
+        if len(frames) <= limit:
+            return frames
+
+        # Keep the first keyframe and the newest frame, spread the rest evenly in between
+        step = (len(frames) - 1) / (limit - 1)
+        return [frames[round(i * step)] for i in range(limit)]
+
+    def _run(self):
+        interval = self.min_interval
+        while not self._stop.is_set():
+            started = time.time()
+            try:
+                changed = self._tick()
+            except Exception as e:
+                logger.warning(f"Screen capture failed: {str(e)}")
+                changed = False
+            # Back off while the screen is idle, snap back to the fastest rate on change
+            interval = self.min_interval if changed else min(self.max_interval, interval * SLOWDOWN)
+            self._stop.wait(max(0.0, interval - (time.time() - started)))
+
+    def _tick(self) -> bool:
+        image = self._capture()
+        current = fingerprint(image)
+        now = time.time()
+
+        with self._lock:
+            latest = self._latest
+        if latest is not None and is_unchanged(latest["fingerprint"], current):
+            image.close()
+            with self._lock:
+                latest["checked_at"] = now
+            return False
+
+        base64_image, mime_type = encode_for_vision(image)
+        frame = {
+            "image": image,
+            "fingerprint": current,
+            "base64": base64_image,
+            "mime_type": mime_type,
+            "time": now,
+            "checked_at": now,
+        }
+        self._record(latest, frame)
+        with self._lock:
+            self._latest = frame
+        return True
+
+    def _record(self, previous: dict, frame: dict):
+        region = None
+        if previous is not None and self._since_keyframe < KEYFRAME_EVERY:
+            region = changed_region(previous["fingerprint"], frame["fingerprint"])
+
+        if region is None:
+            # The whole frame was already encoded for explain_concept; keep that same string
+            base64_image, mime_type = frame["base64"], frame["mime_type"]
+            entry = {"kind": "key", "region": None}
+            self._since_keyframe = 0
+        else:
+            base64_image, mime_type = encode_for_vision(frame["image"].crop(region), byte_budget=self.frame_bytes)
+            entry = {"kind": "diff", "region": region}
+            self._since_keyframe += 1
+        entry.update({"time": frame["time"], "base64": base64_image, "mime_type": mime_type,
+                      "bytes": len(base64_image)})
+
+        with self._lock:
+            self._frames.append(entry)
+            self._buffered_bytes += entry["bytes"]
+            cutoff = frame["time"] - self.history_seconds
+            while self._frames and (len(self._frames) > self.max_frames
+                                    or self._buffered_bytes > self.buffer_bytes
+                                    or self._frames[0]["time"] < cutoff):
+                self._buffered_bytes -= self._frames.popleft()["bytes"]
+                # A diff without its keyframe can't be interpreted, drop it too
+                while self._frames and self._frames[0]["kind"] == "diff":
+                    self._buffered_bytes -= self._frames.popleft()["bytes"]
+            if not self._frames:
+                self._since_keyframe = KEYFRAME_EVERY  # next change starts a fresh keyframe
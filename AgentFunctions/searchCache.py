@@ -0,0 +1,54 @@
+# Persistent cache of Google Custom Search results keyed by canonicalized query.
+# Time-sensitive queries get a short TTL, evergreen ones a long one, which saves
+# both CSE quota and a network round trip on repeated searches.
+import os
+import re
+import logging
+
+from .sqliteCache import SQLiteCache, cache_path
+from .textUtils import canonical_query
+
+logger = logging.getLogger("SearchCache")
+logger.setLevel(logging.INFO)
+
+TEMPORAL_TTL = float(os.getenv("SEARCH_CACHE_TEMPORAL_TTL", str(15 * 60)))
+EVERGREEN_TTL = float(os.getenv("SEARCH_CACHE_EVERGREEN_TTL", str(7 * 24 * 3600)))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "2000"))
+
+# Words that mean the answer changes over hours rather than weeks
+TEMPORAL_KEYWORDS = re.compile(
+    r'\b(today|tonight|tomorrow|yesterday|now|current(ly)?|latest|recent(ly)?|breaking|news|live|'
+    r'this (week|month|year)|last (week|month)|next week|score(s)?|weather|forecast|price(s)?|stock(s)?|'
+    r'traffic|update(s)?)\b',
+    re.IGNORECASE
+)
+ISO_OR_LONG_DATE = re.compile(
+    r'\b\d{4}-\d{2}-\d{2}\b|\b(january|february|march|april|may|june|july|august|september|'
+    r'october|november|december)\s+\d{1,2},?\s+\d{4}\b',
+    re.IGNORECASE
+)
+
+
+def is_temporal_query(*queries: str) -> bool:
+    """True if any form of the query asks about something time-sensitive"""
+    return any(q and (TEMPORAL_KEYWORDS.search(q) or ISO_OR_LONG_DATE.search(q)) for q in queries)
+
+
+class SearchCache(SQLiteCache):
+    """Search results cache with date-aware TTLs that survives worker restarts"""
+
+    def __init__(self, path: str = None) -> None:
+        super().__init__(
+            path or cache_path("search.sqlite"),
+            max_entries=SEARCH_CACHE_MAX_ENTRIES,
+            default_ttl=EVERGREEN_TTL,
+        )
+
+    def lookup(self, processed_query: str):
+        """Return cached results for a processed query, or None on a miss"""
+        entry = self.get(canonical_query(processed_query))
+        return entry["value"] if entry else None
+
+    def store(self, processed_query: str, results: list, original_query: str = None):
+        ttl = TEMPORAL_TTL if is_temporal_query(original_query, processed_query) else EVERGREEN_TTL
+        self.set(canonical_query(processed_query), results, ttl=ttl)
@@ -0,0 +1,95 @@
+# BM25 ranking of page sections against a topic. A small inverted index is built per
+# page so only the passages that actually match the topic make it into the prompt.
+import math
+import logging
+from collections import Counter, defaultdict
+
+from .textUtils import tokenize, light_stem
+from .promptBudget import count_tokens
+
+logger = logging.getLogger("SectionRanker")
+logger.setLevel(logging.INFO)
+
+DEFAULT_TOP_K = 8
+DEFAULT_TOKEN_BUDGET = 1200
+
+
+def terms(text: str) -> list:
+    """Index terms for a passage: lowercase tokens without stop words, plurals folded"""
+    return [light_stem(token) for token in tokenize(text)]
+
+
+class BM25Index:
+    """In-memory inverted index with Okapi BM25 scoring"""
+
+    def __init__(self, documents: list, k1: float = 1.5, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        self.doc_lengths = []
+        self.postings = defaultdict(list)  # term -> [(doc_id, term frequency)]
+
+        for doc_id, text in enumerate(documents):
+            counts = Counter(terms(text))
+            self.doc_lengths.append(sum(counts.values()))
+            for term, frequency in counts.items():
+                self.postings[term].append((doc_id, frequency))
+
+        self.doc_count = len(documents)
+        self.avg_length = (sum(self.doc_lengths) / self.doc_count) if self.doc_count else 0.0
+
+    def idf(self, term: str) -> float:
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (self.doc_count - df + 0.5) / (df + 0.5))
+
+    def score(self, query: str) -> dict:
+        """Return {doc_id: score} for every document matching at least one query term"""
+        scores = defaultdict(float)
+        for term in set(terms(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf(term)
+            for doc_id, frequency in postings:
+                length_norm = 1 - self.b + self.b * self.doc_lengths[doc_id] / (self.avg_length or 1)
+                scores[doc_id] += idf * frequency * (self.k1 + 1) / (frequency + self.k1 * length_norm)
+        return scores
+
+    def top_k(self, query: str, k: int = DEFAULT_TOP_K) -> list:
+        """Best (doc_id, score) pairs, highest score first"""
+        scores = self.score(query)
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+
+
+def content_sections(content: dict) -> list:
+    """Flatten extract_content() output into {'type', 'content'} sections"""
+    return (
+        [{'type': 'heading', 'content': text} for text in content.get('headings', [])] +
+        [{'type': 'paragraph', 'content': text} for text in content.get('paragraphs', [])] +
+        [{'type': 'list', 'content': text} for text in content.get('lists', [])]
+    )
+
+
+def rank_sections(sections: list, topic: str, top_k: int = DEFAULT_TOP_K,
+                  token_budget: int = DEFAULT_TOKEN_BUDGET, count_tokens=count_tokens) -> list:
+    """Pick the sections most relevant to the topic that fit the token budget.
+    `sections` are {'type', 'content'} dicts; the result keeps document order."""
+    if not sections or not terms(topic):
+        return []
+
+    index = BM25Index([section['content'] for section in sections])
+    scores = index.score(topic)
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+    chosen = []
+    used_tokens = 0
+    for doc_id, _ in ranked:
+        if len(chosen) >= top_k:
+            break
+        tokens = count_tokens(sections[doc_id]['content'])
+        if used_tokens + tokens > token_budget:
+            continue  # a shorter, lower-ranked passage may still fit
+        chosen.append(doc_id)
+        used_tokens += tokens
+
+    logger.info(f"Selected {len(chosen)} of {len(sections)} sections for '{topic}' ({used_tokens} tokens)")
+    return [dict(sections[doc_id], score=round(scores[doc_id], 3)) for doc_id in sorted(chosen)]
@@ -0,0 +1,68 @@
+# Single-flight coalescing for tool calls: concurrent calls with the same tool name and
+# normalized arguments share one in-flight task instead of running duplicate pipelines.
+import re
+import asyncio
+import logging
+
+from .pageCache import normalize_url
+
+logger = logging.getLogger("SingleFlight")
+logger.setLevel(logging.INFO)
+
+URL_PATTERN = re.compile(r'^(https?://|www\.)', re.IGNORECASE)
+
+
+def normalize_argument(value):
+    """Fold trivially different spellings of an argument onto one key"""
+    if isinstance(value, str):
+        text = value.strip()
+        if URL_PATTERN.match(text):
+            return normalize_url(text if "://" in text else f"http://{text}")
+        return " ".join(text.lower().split()).rstrip("?.!")
+    if isinstance(value, (list, tuple)):
+        return tuple(normalize_argument(item) for item in value)
+    return value
+
+
+def call_key(name: str, *args, **kwargs) -> tuple:
+    """Key for a tool call: its name plus normalized positional and keyword arguments"""
+    return (
+        name,
+        tuple(normalize_argument(arg) for arg in args),
+        tuple(sorted((key, normalize_argument(value)) for key, value in kwargs.items())),
+    )
+
+
+class SingleFlight:
+    """Run at most one task per key; later callers await the same result"""
+
+    def __init__(self) -> None:
+        self._calls = {}  # key -> {"task": Task, "waiters": int}
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key, func, *args, **kwargs):
+        call = self._calls.get(key)
+        if call is None:
+            call = {"task": asyncio.create_task(func(*args, **kwargs)), "waiters": 0}
+            self._calls[key] = call
+            call["task"].add_done_callback(lambda task, key=key, call=call: self._forget(key, call))
+        else:
+            logger.info(f"Coalescing duplicate call {key[0]} with the one already in flight")
+
+        call["waiters"] += 1
+        try:
+            # Shield so one caller being cancelled doesn't cancel the work for everyone else
+            return await asyncio.shield(call["task"])
+        except asyncio.CancelledError:
+            if not call["task"].done() and call["waiters"] == 1:
+                # Last interested caller is gone, stop the shared work too
+                call["task"].cancel()
+            raise
+        finally:
+            call["waiters"] -= 1
+
+    def _forget(self, key, call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
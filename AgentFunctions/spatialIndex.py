@@ -0,0 +1,249 @@
+# In-memory spatial index over every place the location assistant has resolved.
+# Points live in NumPy arrays bucketed on a lat/lon grid, so nearest-place, radius and
+# reverse lookups never touch the network. The places are persisted in the geocode
+# SQLite file and loaded back at startup; new places are appended as they are resolved,
+# and the oldest ones are dropped past a size or age limit like the other caches.
+import os
+import math
+import time
+import sqlite3
+import logging
+import threading
+
+import numpy as np
+
+from .geoMath import haversine_matrix, EARTH_RADIUS_MILES
+
+logger = logging.getLogger("SpatialIndex")
+logger.setLevel(logging.INFO)
+
+CELL_DEGREES = float(os.getenv("SPATIAL_INDEX_CELL_DEGREES", "0.05"))  # ~3.5 miles of latitude
+BRUTE_FORCE_LIMIT = 2048  # below this many places one vectorized pass beats walking cells
+REVERSE_MAX_MILES = float(os.getenv("SPATIAL_INDEX_REVERSE_MILES", "0.05"))  # ~80 m
+MILES_PER_DEGREE = EARTH_RADIUS_MILES * math.pi / 180
+SPATIAL_INDEX_MAX_PLACES = int(os.getenv("SPATIAL_INDEX_MAX_PLACES", "20000"))
+SPATIAL_INDEX_TTL = float(os.getenv("SPATIAL_INDEX_TTL", str(90 * 24 * 3600)))
+
+
+class SpatialIndex:
+    """Grid-bucketed point index with nearest, radius and reverse lookups"""
+
+    def __init__(self, path: str = None, cell_degrees: float = CELL_DEGREES,
+                 max_places: int = SPATIAL_INDEX_MAX_PLACES, ttl: float = SPATIAL_INDEX_TTL) -> None:
+        self.cell_degrees = cell_degrees
+        self.max_places = max_places
+        self.ttl = ttl
+        # Longitude cells wrap at the antimeridian, so 179.99 and -179.99 are neighbours
+        self._lon_cells = max(1, math.ceil(360 / cell_degrees))
+        self._lock = threading.Lock()
+        self._coordinates = np.empty((64, 2), dtype=np.float64)
+        self._places = []  # {"key", "name", "address"} per row of _coordinates
+        self._rows = {}  # place key -> row
+        self._cells = {}  # (lat cell, lon cell) -> [rows]
+        self._added = {}  # place key -> time added, oldest first
+
+        self._conn = None
+        if path:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS places (
+                    key TEXT PRIMARY KEY,
+                    name TEXT,
+                    address TEXT,
+                    latitude REAL NOT NULL,
+                    longitude REAL NOT NULL,
+                    added_at REAL NOT NULL DEFAULT 0
+                )
+            """)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(places)")}
+            if "added_at" not in columns:
+                # Tables from before eviction: treat existing places as added now
+                self._conn.execute("ALTER TABLE places ADD COLUMN added_at REAL NOT NULL DEFAULT 0")
+                self._conn.execute("UPDATE places SET added_at = ?", (time.time(),))
+            self._conn.execute("DELETE FROM places WHERE added_at <= ?", (time.time() - self.ttl,))
+            self._conn.commit()
+            rows = self._conn.execute(
+                "SELECT key, name, address, latitude, longitude, added_at FROM places ORDER BY added_at"
+            ).fetchall()
+            for key, name, address, latitude, longitude, added_at in rows:
+                self._insert(key, name, address, latitude, longitude, added_at)
+            with self._lock:
+                self._evict()
+                self._conn.commit()
+            logger.info(f"Loaded {len(self._places)} known places")
+
+    def __len__(self) -> int:
+        return len(self._places)
+
+    def _cell(self, latitude: float, longitude: float) -> tuple:
+        return (math.floor(latitude / self.cell_degrees),
+                math.floor((longitude + 180) / self.cell_degrees) % self._lon_cells)
+
+    def _insert(self, key, name, address, latitude, longitude, added_at: float = None):
+        self._added.pop(key, None)
+        self._added[key] = time.time() if added_at is None else added_at
+        row = self._rows.get(key)
+        if row is not None:
+            old_cell = self._cell(*self._coordinates[row])
+            self._cells[old_cell].remove(row)
+        else:
+            row = len(self._places)
+            if row == len(self._coordinates):
+                self._coordinates = np.concatenate([self._coordinates, np.empty_like(self._coordinates)])
+            self._places.append(None)
+            self._rows[key] = row
+        self._coordinates[row] = (latitude, longitude)
+        self._places[row] = {"key": key, "name": name, "address": address}
+        self._cells.setdefault(self._cell(latitude, longitude), []).append(row)
+
+    def _remove(self, key):
+        """Drop a place, moving the last row into its slot so the arrays stay dense"""
+        self._added.pop(key, None)
+        row = self._rows.pop(key)
+        self._cells[self._cell(*self._coordinates[row])].remove(row)
+        last = len(self._places) - 1
+        if row != last:
+            last_cell = self._cells[self._cell(*self._coordinates[last])]
+            last_cell[last_cell.index(last)] = row
+            self._coordinates[row] = self._coordinates[last]
+            self._places[row] = self._places[last]
+            self._rows[self._places[row]["key"]] = row
+        self._places.pop()
+
+    def _evict(self):
+        """Drop places past the age limit, then the oldest ones past the size limit"""
+        expired_before = time.time() - self.ttl
+        evicted = []
+        for key, added_at in self._added.items():
+            if added_at > expired_before and len(self._added) - len(evicted) <= self.max_places:
+                break
+            evicted.append(key)
+        for key in evicted:
+            self._remove(key)
+        if evicted and self._conn is not None:
+            self._conn.executemany("DELETE FROM places WHERE key = ?", [(key,) for key in evicted])
+        return len(evicted)
+
+    def add(self, key: str, name: str, address: str, latitude: float, longitude: float):
+        """Add or move a place; it is persisted straight away when the index has a file"""
+        self.add_many([(key, name, address, latitude, longitude)])
+
+    def add_many(self, places):
+        """Bulk add (key, name, address, latitude, longitude) tuples with a single commit"""
+        places = list(places)
+        if not places:
+            return
+        now = time.time()
+        with self._lock:
+            for place in places:
+                self._insert(*place, added_at=now)
+            if self._conn is not None:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO places(key, name, address, latitude, longitude, added_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [tuple(place) + (now,) for place in places]
+                )
+            evicted = self._evict()
+            if self._conn is not None:
+                self._conn.commit()
+        if evicted:
+            logger.info(f"Evicted {evicted} known place(s)")
+
+    def _rows_in_ring(self, center: tuple, ring: int) -> list:
+        """Rows in the square ring of cells `ring` steps out from the center cell"""
+        lat_cell, lon_cell = center
+        if ring == 0:
+            return list(self._cells.get(center, ()))
+        cells = []
+        for j in range(lon_cell - ring, lon_cell + ring + 1):
+            cells.append((lat_cell - ring, j))
+            cells.append((lat_cell + ring, j))
+        for i in range(lat_cell - ring + 1, lat_cell + ring):
+            cells.append((i, lon_cell - ring))
+            cells.append((i, lon_cell + ring))
+        # Wide rings meet themselves across the antimeridian; visit each cell once
+        cells = {(i, j % self._lon_cells) for i, j in cells}
+        rows = []
+        for cell in cells:
+            rows.extend(self._cells.get(cell, ()))
+        return rows
+
+    def _results(self, latitude: float, longitude: float, rows, limit: int = None,
+                 max_miles: float = None) -> list:
+        """Places for the given rows, nearest first; only the returned ones are materialized"""
+        rows = np.asarray(rows, dtype=np.int64)
+        if not len(rows):
+            return []
+        miles = haversine_matrix([(latitude, longitude)], self._coordinates[rows])[0]
+        if max_miles is not None:
+            keep = miles <= max_miles
+            rows, miles = rows[keep], miles[keep]
+        order = np.argsort(miles)[:limit]
+        return [
+            dict(self._places[rows[i]], latitude=float(self._coordinates[rows[i], 0]),
+                 longitude=float(self._coordinates[rows[i], 1]), miles=float(miles[i]))
+            for i in order
+        ]
+
+    def nearest(self, latitude: float, longitude: float, k: int = 1, max_miles: float = None) -> list:
+        """The k known places closest to a point, nearest first, each with its distance in miles"""
+        with self._lock:
+            count = len(self._places)
+            if count == 0:
+                return []
+            if count <= BRUTE_FORCE_LIMIT:
+                results = self._results(latitude, longitude, range(count), k, max_miles)
+            else:
+                # Walk outward ring by ring until nothing unvisited can beat the k-th candidate.
+                # A ring of cells is narrowest east-west, so bound it by the longitude spacing.
+                center = self._cell(latitude, longitude)
+                ring_miles = self.cell_degrees * MILES_PER_DEGREE * max(0.01, math.cos(math.radians(min(89.0, abs(latitude) + self.cell_degrees))))
+                rows, ring = [], 0
+                while True:
+                    if (2 * ring + 1) ** 2 > len(self._cells):
+                        # Mostly empty space this far out; checking every place is cheaper
+                        rows = range(count)
+                        break
+                    rows.extend(self._rows_in_ring(center, ring))
+                    covered = ring * ring_miles
+                    if max_miles is not None and covered >= max_miles:
+                        break
+                    if len(rows) >= k and self._results(latitude, longitude, rows, k)[-1]["miles"] <= covered:
+                        break
+                    ring += 1
+                results = self._results(latitude, longitude, rows, k, max_miles)
+        return results
+
+    def within(self, latitude: float, longitude: float, miles: float) -> list:
+        """Every known place within a radius, nearest first"""
+        with self._lock:
+            if len(self._places) <= BRUTE_FORCE_LIMIT:
+                rows = range(len(self._places))
+            else:
+                lat_span = miles / MILES_PER_DEGREE
+                lon_span = lat_span / max(0.01, math.cos(math.radians(min(89.0, abs(latitude) + lat_span))))
+                low_lat = math.floor((latitude - lat_span) / self.cell_degrees)
+                high_lat = math.floor((latitude + lat_span) / self.cell_degrees)
+                # Unwrapped longitude cells, folded back across the antimeridian below
+                low_lon = math.floor((longitude + 180 - lon_span) / self.cell_degrees)
+                high_lon = min(math.floor((longitude + 180 + lon_span) / self.cell_degrees),
+                               low_lon + self._lon_cells - 1)
+                rows = []
+                for i in range(low_lat, high_lat + 1):
+                    for j in range(low_lon, high_lon + 1):
+                        rows.extend(self._cells.get((i, j % self._lon_cells), ()))
+            return self._results(latitude, longitude, rows, max_miles=miles)
+
+    def reverse(self, latitude: float, longitude: float, max_miles: float = REVERSE_MAX_MILES):
+        """The cached place at (or within max_miles of) a coordinate, or None"""
+        nearest = self.nearest(latitude, longitude, k=1, max_miles=max_miles)
+        return nearest[0] if nearest else None
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                try:
+                    self._conn.close()
+                except sqlite3.Error as e:
+                    logger.error(f"Error closing spatial index: {str(e)}")
+                self._conn = None
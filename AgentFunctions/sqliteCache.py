@@ -0,0 +1,181 @@
+# Small persistent key/value cache on top of SQLite, shared by the assistants' caches.
+# Values are stored as JSON with TTL and last-access bookkeeping, and the store evicts
+# least recently used entries once it goes over its entry count or byte budget.
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger("SQLiteCache")
+logger.setLevel(logging.INFO)
+
+CACHE_DIR = os.getenv("HELPER_CACHE_DIR", "cache")
+
+
+def cache_path(filename: str) -> str:
+    """Return the path of a cache file inside CACHE_DIR, creating the directory if needed"""
+    if not os.path.exists(CACHE_DIR):
+        os.makedirs(CACHE_DIR, exist_ok=True)
+    return os.path.join(CACHE_DIR, filename)
+
+
+class SQLiteCache:
+    """Thread-safe persistent cache with TTL, LRU eviction and hit/miss stats"""
+
+    def __init__(self, path: str, max_entries: int = 1000, max_bytes: int = None,
+                 default_ttl: float = 3600, max_stale: float = 0) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        # How long expired entries are kept around so callers can revalidate them
+        self.max_stale = max_stale
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS entries_last_access ON entries(last_access);
+            CREATE TABLE IF NOT EXISTS stats (
+                name TEXT PRIMARY KEY,
+                count INTEGER NOT NULL
+            );
+        """)
+        self._conn.commit()
+
+    def _bump(self, name: str):
+        self._bump_by(name, 1)
+
+    def _bump_by(self, name: str, amount: int):
+        self._conn.execute(
+            "INSERT INTO stats(name, count) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET count = count + ?",
+            (name, amount, amount)
+        )
+
+    def get(self, key: str, allow_stale: bool = False):
+        """Return {'value', 'stored_at', 'expires_at', 'fresh'} for a key, or None on a miss"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, stored_at, expires_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            fresh = row is not None and row[2] > now
+            if row is None or (not fresh and not allow_stale):
+                self._bump("misses")
+                self._conn.commit()
+                return None
+
+            self._bump("hits" if fresh else "stale_hits")
+            self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+
+        return {
+            "value": json.loads(row[0]),
+            "stored_at": row[1],
+            "expires_at": row[2],
+            "fresh": fresh,
+        }
+
+    def set(self, key: str, value, ttl: float = None):
+        """Store a JSON-serialisable value and evict old entries if over budget"""
+        now = time.time()
+        encoded = json.dumps(value)
+        expires_at = now + (self.default_ttl if ttl is None else ttl)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries(key, value, size, stored_at, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, encoded, len(encoded), now, expires_at, now)
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def refresh(self, key: str, ttl: float = None, value=None):
+        """Extend an entry's lifetime, e.g. after a successful revalidation"""
+        now = time.time()
+        expires_at = now + (self.default_ttl if ttl is None else ttl)
+        with self._lock:
+            if value is None:
+                self._conn.execute(
+                    "UPDATE entries SET expires_at = ?, last_access = ? WHERE key = ?",
+                    (expires_at, now, key)
+                )
+            else:
+                encoded = json.dumps(value)
+                self._conn.execute(
+                    "UPDATE entries SET value = ?, size = ?, expires_at = ?, last_access = ? WHERE key = ?",
+                    (encoded, len(encoded), expires_at, now, key)
+                )
+            self._conn.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        """Drop long-expired entries, then least recently used ones until within budget"""
+        removed = self._conn.execute(
+            "DELETE FROM entries WHERE expires_at + ? < ?", (self.max_stale, now)
+        ).rowcount
+
+        count, total_bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()
+        while count > self.max_entries or (self.max_bytes and total_bytes > self.max_bytes):
+            # Evict in small batches so one oversized write doesn't scan the table repeatedly
+            batch = max(1, count - self.max_entries) if count > self.max_entries else max(1, count // 20)
+            rows = self._conn.execute(
+                "SELECT key, size FROM entries ORDER BY last_access LIMIT ?", (batch,)
+            ).fetchall()
+            if not rows:
+                break
+            self._conn.executemany("DELETE FROM entries WHERE key = ?", [(k,) for k, _ in rows])
+            count -= len(rows)
+            total_bytes -= sum(size for _, size in rows)
+            removed += len(rows)
+
+        if removed:
+            self._bump_by("evictions", removed)
+
+    def stats(self) -> dict:
+        """Return persisted hit/miss counters along with the current size of the cache"""
+        with self._lock:
+            counters = dict(self._conn.execute("SELECT name, count FROM stats").fetchall())
+            count, total_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        lookups = counters.get("hits", 0) + counters.get("stale_hits", 0) + counters.get("misses", 0)
+        return {
+            "hits": counters.get("hits", 0),
+            "stale_hits": counters.get("stale_hits", 0),
+            "misses": counters.get("misses", 0),
+            "evictions": counters.get("evictions", 0),
+            "hit_rate": (counters.get("hits", 0) / lookups) if lookups else 0.0,
+            "entries": count,
+            "bytes": total_bytes,
+        }
+
+    def close(self):
+        with self._lock:
+            try:
+                self._conn.close()
+            except sqlite3.Error as e:
+                logger.error(f"Error closing cache {self.path}: {str(e)}")
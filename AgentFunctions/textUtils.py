@@ -0,0 +1,80 @@
+# Shared text normalisation helpers for cache keys and relevance scoring
+import re
+from datetime import datetime
+
+STOP_WORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before
+being below between both but by can could did do does doing down during each few for
+from further had has have having he her here hers herself him himself his how i if in
+into is it its itself just me more most my myself no nor not now of off on once only or
+other our ours ourselves out over own same she should so some such than that the their
+theirs them themselves then there these they this those through to too under until up
+very was we were what when where which while who whom why will with would you your
+yours yourself yourselves tell show find search look please give me what's whats
+""".split())
+
+# Stop words that still change what a query means: "python not working", "from boston to denver"
+NEGATION_WORDS = frozenset("no nor not never without".split())
+DIRECTION_WORDS = frozenset("""
+to from into onto out off up down above below over under before after between against
+""".split())
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:['.][a-z0-9]+)*")
+CANONICAL_TOKEN_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}|" + TOKEN_PATTERN.pattern)
+
+# Dates written by AssistantWebFnc.process_date_keywords, e.g. "october 18, 2026"
+LONG_DATE_PATTERN = re.compile(
+    r'\b(january|february|march|april|may|june|july|august|september|october|november|december)'
+    r'\s+(\d{1,2}),?\s+(\d{4})\b',
+    re.IGNORECASE
+)
+NUMERIC_DATE_PATTERN = re.compile(r'\b(\d{1,2})/(\d{1,2})/(\d{4})\b')
+
+
+def normalize_dates(text: str) -> str:
+    """Rewrite long-form and US numeric dates as ISO dates so equal days compare equal"""
+    def long_date(match):
+        try:
+            parsed = datetime.strptime(f"{match.group(1)} {match.group(2)} {match.group(3)}", "%B %d %Y")
+            return parsed.strftime("%Y-%m-%d")
+        except ValueError:
+            return match.group(0)
+
+    def numeric_date(match):
+        try:
+            return datetime(int(match.group(3)), int(match.group(1)), int(match.group(2))).strftime("%Y-%m-%d")
+        except ValueError:
+            return match.group(0)
+
+    text = LONG_DATE_PATTERN.sub(long_date, text)
+    return NUMERIC_DATE_PATTERN.sub(numeric_date, text)
+
+
+def tokenize(text: str, drop_stop_words: bool = True, keep: frozenset = frozenset(),
+             pattern: re.Pattern = TOKEN_PATTERN) -> list:
+    """Lowercase word tokens, optionally without stop words (other than those in keep)"""
+    tokens = pattern.findall(text.lower().replace("’", "'"))
+    if drop_stop_words:
+        tokens = [token for token in tokens if token not in STOP_WORDS or token in keep]
+    return tokens
+
+
+def canonical_query(text: str) -> str:
+    """Exact-match key for a query: ISO dates, no case, punctuation or stop words, in the
+    original word order. Negations and directions are kept, since they change the question."""
+    normalized = normalize_dates(text.lower().replace("’", "'"))
+    return " ".join(tokenize(normalized, keep=NEGATION_WORDS | DIRECTION_WORDS, pattern=CANONICAL_TOKEN_PATTERN))
+
+
+def light_stem(token: str) -> str:
+    """Cheap plural folding so 'prices' matches 'price' without a stemming library"""
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        return token[:-1]
+    return token
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English text)"""
+    return len(text) // 4 + 1
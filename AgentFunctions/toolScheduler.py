@@ -0,0 +1,72 @@
+# Per-resource scheduler for agent tool calls. Each resource (web, screen, location,
+# browser) has its own concurrency limit, so independent tools run in parallel. Calls
+# queue instead of being rejected, and every call has a deadline that covers its queue
+# time, which is what bounds the queue. A call that misses its deadline is cancelled and
+# is not run again.
+import os
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger("ToolScheduler")
+logger.setLevel(logging.INFO)
+
+DEFAULT_RESOURCE_LIMITS = {
+    "web": int(os.getenv("TOOL_LIMIT_WEB", "2")),
+    "screen": int(os.getenv("TOOL_LIMIT_SCREEN", "1")),
+    "location": int(os.getenv("TOOL_LIMIT_LOCATION", "2")),
+    "browser": int(os.getenv("TOOL_LIMIT_BROWSER", "1")),
+}
+DEFAULT_TIMEOUT = float(os.getenv("TOOL_TIMEOUT", "60"))
+
+
+class ToolScheduler:
+    """Concurrency limits and deadlines per resource"""
+
+    def __init__(self, limits: dict = None, timeout: float = DEFAULT_TIMEOUT) -> None:
+        self.limits = dict(DEFAULT_RESOURCE_LIMITS)
+        if limits:
+            self.limits.update(limits)
+        self.timeout = timeout
+        self._semaphores = {}
+        self._waiting = {}
+
+    def _semaphore(self, resource: str) -> asyncio.Semaphore:
+        if resource not in self._semaphores:
+            self._semaphores[resource] = asyncio.Semaphore(self.limits.get(resource, 1))
+            self._waiting[resource] = 0
+        return self._semaphores[resource]
+
+    @asynccontextmanager
+    async def slot(self, resource: str):
+        """Hold one unit of a resource, waiting in line if it is busy"""
+        semaphore = self._semaphore(resource)
+        if semaphore.locked():
+            logger.info(f"Queued for '{resource}' ({self._waiting[resource] + 1} waiting)")
+        self._waiting[resource] += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self._waiting[resource] -= 1
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+    async def run(self, resource: str, func, *args, timeout: float = None, **kwargs):
+        """Run func on a resource within a deadline that includes time spent queued"""
+        timeout = self.timeout if timeout is None else timeout
+
+        async def guarded():
+            async with self.slot(resource):
+                return await func(*args, **kwargs)
+
+        try:
+            return await asyncio.wait_for(guarded(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"{func.__name__} on '{resource}' missed its {timeout:g}s deadline and was cancelled")
+            return f"Sorry, that took longer than {timeout:g} seconds, so I stopped it. Please try again."
+
+    def busy(self) -> dict:
+        """Queued call count per resource, for logging and diagnostics"""
+        return dict(self._waiting)
@@ -1,80 +1,67 @@
 #this will be funcitons for handling web requests and responses our agent will make
 import os
-import requests
-from openai import OpenAI
+import aiohttp
 from dotenv import load_dotenv
-import logging
-from googleapiclient.discovery import build
 from datetime import datetime, timedelta
-from .screenHelp import encode_image
+from .httpClient import get_http_pool, OPENAI_CHAT_URL
+from .llmStream import stream_sentences
+from .pageCache import PageCache, conditional_headers, normalize_url
+from .searchCache import SearchCache
+from .answerCache import AnswerCache
+from .driverPool import ChromeDriverPool, CHROME_PREWARM
+from .toolScheduler import ToolScheduler
+from .imageEncoding import encode_png_for_vision, vision_size
+from .htmlExtract import extract_content
+from .sectionRanker import rank_sections, content_sections, DEFAULT_TOP_K, DEFAULT_TOKEN_BUDGET
+from .promptBudget import PromptBuilder, count_message_tokens, WEBPAGE_PROMPT_TOKENS, SEARCH_PROMPT_TOKENS
+from logCreator import create_logger
 # Traversing Imports
 import time 
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-import tempfile
 import pytz
 import re
+import asyncio
+import base64
+import functools
 
 
 
-# Create logs directory if it doesn't exist
-if not os.path.exists('logs'):
-    os.makedirs('logs')
-
-# Configure logger with both file and console handlers
-logger = logging.getLogger("WebHelp")
-logger.setLevel(logging.INFO)
-
-# Create formatters and handlers
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-
-# File handler - logs/web_search_YYYY-MM-DD.log
-file_handler = logging.FileHandler(
-    f'logs/web_search_{datetime.now().strftime("%Y-%m-%d")}.log',
-    encoding='utf-8'
-)
-file_handler.setFormatter(formatter)
-file_handler.setLevel(logging.INFO)
-
-# Console handler
-console_handler = logging.StreamHandler()
-console_handler.setFormatter(formatter)
-console_handler.setLevel(logging.INFO)
-
-# Add both handlers to logger
-logger.addHandler(file_handler)
-logger.addHandler(console_handler)
+# Console output plus logs/web_search_YYYY-MM-DD.log, opened on the first record
+logger = create_logger("WebHelp", "web_search")
 
 load_dotenv()
 openai_api_key = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=openai_api_key)
 searchKey = os.getenv("WEB_SEARCH_API_KEY")
 searchEngine = os.getenv("SEARCH_ENGINE_ID")
+CUSTOM_SEARCH_URL = "https://www.googleapis.com/customsearch/v1"
+
+# Screenshot fallback capture size
+SCREENSHOT_WIDTH = 1920
+SCREENSHOT_MAX_HEIGHT = int(os.getenv("SCREENSHOT_MAX_HEIGHT", "4320"))
+
+# Opt-in background prefetch of the top search results into the page cache
+PREFETCH_ENABLED = os.getenv("PREFETCH_SEARCH_RESULTS", "0") == "1"
+PREFETCH_TOP_N = int(os.getenv("PREFETCH_TOP_N", "3"))
+PREFETCH_CONCURRENCY = int(os.getenv("PREFETCH_CONCURRENCY", "2"))
+PREFETCH_DELAY = float(os.getenv("PREFETCH_DELAY", "0.5"))  # Let the foreground summary start first
 
 
 class AssistantWebFnc:
-    def __init__(self) -> None:
+    def __init__(self, scheduler: ToolScheduler = None) -> None:
         self.last_search_results = []
-        self._cache = {}
-        self.client = OpenAI()
-        self.setup_selenium()
+        self._cache = PageCache()
+        self._search_cache = SearchCache()
+        self._answer_cache = AnswerCache()
+        self.prefetch_enabled = PREFETCH_ENABLED
+        self._prefetch_task = None
+        self._prefetch_pages = set()  # Page tasks started by prefetch that no caller has claimed yet
+        self._inflight_pages = {}  # normalized URL -> task loading that page
+        # Chrome is only needed for the screenshot fallback, so start it on first use
+        self.driver_pool = ChromeDriverPool()
+        self.scheduler = scheduler or ToolScheduler()
+        if CHROME_PREWARM:
+            self.driver_pool.prewarm()
         self.timezone = pytz.timezone('America/Chicago')  # Set your timezone
         
-    def setup_selenium(self):
-        """Setup headless Chrome browser"""
-        chrome_options = Options()
-        chrome_options.add_argument("--headless")  # Run in headless mode
-        chrome_options.add_argument("--window-size=1920,1080")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        self.driver = webdriver.Chrome(options=chrome_options)
-        
     def process_date_keywords(self, topic: str) -> str:
         """Convert relative date keywords to actual dates"""
         current_date = datetime.now(self.timezone)
@@ -99,131 +86,280 @@ class AssistantWebFnc:
                 
         return modified_topic
 
-    async def search(self, topic: str):
+    async def search(self, topic: str, stream: bool = False):
         logger.info(f"Starting web search for topic: {topic}")
         try:
             # Process any date keywords in the topic
             processed_topic = self.process_date_keywords(topic)
             logger.info(f"Processed topic with dates: {processed_topic}")
             
-            self.last_search_results = searchFunction(processed_topic)
+            # A near-duplicate of a recent question gets the previous summary straight away
+            cached = self._answer_cache.lookup(processed_topic)
+            if cached:
+                self.last_search_results = list(cached["results"])
+                return cached["answer"]
+            
+            self.last_search_results = await self.cached_search(processed_topic, original_query=topic)
             logger.info(f"Found {len(self.last_search_results)} search results")
+            if self.prefetch_enabled:
+                self.start_prefetch(self.last_search_results)
             
             # Pass both original and processed topics for context
-            message = explain_with_ai(processed_topic, self.last_search_results, original_query=topic)
+            message = await explain_with_ai(processed_topic, self.last_search_results, original_query=topic, stream=stream)
+            if isinstance(message, str):
+                self._answer_cache.store(processed_topic, message, self.last_search_results, original_query=topic)
+            else:
+                message = self._answer_cache.record_stream(
+                    message, processed_topic, list(self.last_search_results), original_query=topic
+                )
             logger.info("Successfully generated AI explanation")
             return message
         except Exception as e:
             logger.error(f"Error in search function: {str(e)}", exc_info=True)
             return f"Sorry, I encountered an error while searching: {str(e)}"
         
-    async def traverse_web(self, url: str, topic: str = None, search_context: str = None):
+    async def cached_search(self, processed_topic: str, original_query: str = None):
+        """Run searchFunction through the persistent search cache"""
+        loop = asyncio.get_event_loop()
+        results = await loop.run_in_executor(None, self._search_cache.lookup, processed_topic)
+        stats = await loop.run_in_executor(None, self._search_cache.stats)
+        if results is not None:
+            logger.info(f"Search cache hit for '{processed_topic}' (hit rate {stats['hit_rate']:.0%})")
+            return results
+
+        logger.info(f"Search cache miss for '{processed_topic}' (hit rate {stats['hit_rate']:.0%})")
+        results = await searchFunction(processed_topic)
+        if results:
+            await loop.run_in_executor(
+                None, self._search_cache.store, processed_topic, results, original_query
+            )
+        return results
+
+    def search_cache_stats(self) -> dict:
+        """Hit/miss counters for the search cache, persisted across restarts"""
+        return self._search_cache.stats()
+
+    async def traverse_web(self, url: str, topic: str = None, search_context: str = None, stream: bool = False):
         logger.info(f"Traversing webpage: {url}")
         try:
-            # First try normal request
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            
-            response = requests.get(url, headers=headers, timeout=10)
+            content = await self.fetch_page_content(url)
             
-            if response.status_code == 403:
+            if content is None:
                 logger.info("403 error encountered, attempting screenshot method")
-                return await self.screenshot_and_analyze(url, topic)
+                return await self.screenshot_and_analyze(url, topic, stream=stream)
                 
-            # If successful, continue with normal parsing
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
-            content = extract_content(soup)
-            
             if topic:
-                relevant_sections = find_relevant_sections(soup, topic)
+                relevant_sections = find_relevant_sections(content, topic)
                 content['topic_specific'] = relevant_sections
             
-            explanation = explain_webpage_content(
+            explanation = await explain_webpage_content(
                 content, 
                 topic=topic,
-                search_context=search_context
+                search_context=search_context,
+                stream=stream
             )
             
             return explanation
             
         except Exception as e:
             logger.error(f"Error in normal traversal, attempting screenshot method: {str(e)}")
-            return await self.screenshot_and_analyze(url, topic)
+            return await self.screenshot_and_analyze(url, topic, stream=stream)
+
+    def start_prefetch(self, results: list):
+        """Fetch and extract the top results in the background, replacing any earlier prefetch"""
+        self.cancel_prefetch()
+        urls = [result['link'] for result in results[:PREFETCH_TOP_N] if result.get('link')]
+        if urls:
+            self._prefetch_task = asyncio.create_task(self._prefetch(urls))
+
+    def cancel_prefetch(self):
+        """Cancel the running prefetch and any page loads nobody is waiting on"""
+        if self._prefetch_task and not self._prefetch_task.done():
+            self._prefetch_task.cancel()
+        self._prefetch_task = None
+        for task in self._prefetch_pages:
+            task.cancel()
+        self._prefetch_pages.clear()
+
+    async def _prefetch(self, urls: list):
+        await asyncio.sleep(PREFETCH_DELAY)
+        semaphore = asyncio.Semaphore(PREFETCH_CONCURRENCY)
+
+        async def prefetch_one(url):
+            async with semaphore:
+                task = self._page_task(url, prefetch=True)
+                try:
+                    await asyncio.shield(task)
+                    logger.info(f"Prefetched {url}")
+                except Exception as e:
+                    logger.info(f"Prefetch of {url} failed: {str(e)}")
+
+        logger.info(f"Prefetching {len(urls)} search results")
+        await asyncio.gather(*(prefetch_one(url) for url in urls), return_exceptions=True)
+
+    def _page_task(self, url: str, prefetch: bool = False) -> asyncio.Task:
+        """Return the task loading a page, starting one unless the same page is already in flight"""
+        key = normalize_url(url)
+        task = self._inflight_pages.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load_page_content(url))
+            self._inflight_pages[key] = task
+            task.add_done_callback(functools.partial(self._forget_page, key))
+            if prefetch:
+                self._prefetch_pages.add(task)
+                task.add_done_callback(self._prefetch_pages.discard)
+        elif not prefetch:
+            # A caller wants this page now, so a new search must not cancel it
+            self._prefetch_pages.discard(task)
+        return task
+
+    def _forget_page(self, key: str, task: asyncio.Task):
+        if self._inflight_pages.get(key) is task:
+            del self._inflight_pages[key]
+
+    async def fetch_page_content(self, url: str):
+        """Return extract_content() for a URL from the page cache, revalidating or fetching as needed.
+        Returns None when the site refuses plain requests (403)."""
+        task = self._page_task(url)
+        try:
+            content = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            current = asyncio.current_task()
+            if not task.cancelled() or (hasattr(current, "cancelling") and current.cancelling()):
+                raise  # this call itself is being cancelled
+            # The shared load was cancelled under us (a newer search or shutdown); load it directly
+            logger.info(f"Shared load of {url} was cancelled, loading it directly")
+            content = await self._load_page_content(url)
+        return dict(content) if content is not None else None
+
+    async def _load_page_content(self, url: str):
+        loop = asyncio.get_event_loop()
+        entry = await loop.run_in_executor(None, self._cache.lookup, url)
+        if entry and entry["fresh"]:
+            logger.info(f"Page cache hit: {url}")
+            return entry["value"]["content"]
+
+        # First try normal request, conditional if we hold a stale copy
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+        }
+        headers.update(conditional_headers(entry))
+        
+        async with get_http_pool().request(
+            "GET", url, headers=headers, timeout=aiohttp.ClientTimeout(total=10)
+        ) as response:
+            if response.status == 304 and entry:
+                logger.info(f"Page not modified, reusing cached content: {url}")
+                await loop.run_in_executor(None, self._cache.revalidated, url, response.headers)
+                return entry["value"]["content"]
+            if response.status == 403:
+                return None
+            response.raise_for_status()
+            html = await response.text(errors="replace")
+            response_headers = response.headers.copy()
+
+        # Parse off the event loop so prefetching never stalls audio
+        content = await loop.run_in_executor(None, extract_content, html)
+        await loop.run_in_executor(None, self._cache.store, url, content, response_headers)
+        return content
 
-    async def screenshot_and_analyze(self, url: str, topic: str = None):
+    async def screenshot_and_analyze(self, url: str, topic: str = None, stream: bool = False):
         """Take screenshot of webpage and analyze it"""
         try:
             logger.info(f"Taking screenshot of {url}")
-            self.driver.get(url)
+            loop = asyncio.get_event_loop()
+            async with self.scheduler.slot("browser"), self.driver_pool.driver() as driver:
+                png_bytes = await loop.run_in_executor(None, capture_full_page, driver, url)
             
-            # Wait for page to load
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.TAG_NAME, "body"))
+            # Downscale and encode in memory to fit the vision byte budget
+            base64_image, mime_type = await loop.run_in_executor(
+                None, encode_png_for_vision, png_bytes
             )
             
-            # Scroll to capture full page
-            height = self.driver.execute_script("return document.body.scrollHeight")
-            self.driver.set_window_size(1920, height)
-            
-            # Save screenshot to temporary file
-            with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp:
-                self.driver.save_screenshot(tmp.name)
-                screenshot_path = tmp.name
-            
             # Use existing image analysis function
-            message = explain_with_ai_screenshot(
-                screenshot_path, 
+            return await explain_with_ai_screenshot(
+                base64_image, 
                 topic=topic,
-                url=url
+                url=url,
+                mime_type=mime_type,
+                stream=stream
             )
             
-            # Clean up
-            os.unlink(screenshot_path)
-            
-            return message
-            
         except Exception as e:
             logger.error(f"Error in screenshot method: {str(e)}", exc_info=True)
             return f"Sorry, I couldn't access this webpage: {str(e)}"
         
-    def __del__(self):
-        """Clean up Selenium driver"""
-        if hasattr(self, 'driver'):
-            self.driver.quit()
-
-    async def get_site_from_results(self, result_number: int):
+    async def get_site_from_results(self, result_number: int, stream: bool = False):
         if 0 <= result_number < len(self.last_search_results):
             url = self.last_search_results[result_number]['link']
-            return await self.traverse_web(url)
+            return await self.traverse_web(url, stream=stream)
         return "Sorry, that result number is not available."
 
     async def cleanup(self):
         """Cleanup resources"""
         try:
-            self._cache.clear()
+            self.cancel_prefetch()
+            await self.driver_pool.shutdown()
+            self._cache.close()
+            self._search_cache.close()
+            self._answer_cache.clear()
             self.last_search_results.clear()
             # Add any other cleanup needed
             logger.info("Web assistant cleanup completed")
         except Exception as e:
             logger.error(f"Error during web assistant cleanup: {str(e)}")
 
-def searchFunction(inquiry):
-    logger.info(f"Executing Google search for: {inquiry}")
+def capture_full_page(driver, url):
+    """Load a page in Chrome and return a full-height PNG screenshot as bytes"""
+    # Selenium is only needed for this fallback, so it isn't imported with the module
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
+    # Reset the window so a previous tall page doesn't skew the height measurement
+    driver.set_window_size(SCREENSHOT_WIDTH, 1080)
+    driver.get(url)
+    
+    # Wait for page to load
+    WebDriverWait(driver, 10).until(
+        EC.presence_of_element_located((By.TAG_NAME, "body"))
+    )
+    
+    # Past a few screens the model can't read the text anyway, so cap the capture height
+    height = min(driver.execute_script("return document.body.scrollHeight"), SCREENSHOT_MAX_HEIGHT)
+    target_width, _ = vision_size(SCREENSHOT_WIDTH, height)
+    
     try:
-        service = build(
-            "customsearch", "v1", developerKey=searchKey
-        )
+        # Let Chrome render beyond the viewport and downscale while capturing
+        result = driver.execute_cdp_cmd("Page.captureScreenshot", {
+            "format": "png",
+            "captureBeyondViewport": True,
+            "clip": {
+                "x": 0,
+                "y": 0,
+                "width": SCREENSHOT_WIDTH,
+                "height": height,
+                "scale": target_width / SCREENSHOT_WIDTH
+            }
+        })
+        return base64.b64decode(result["data"])
+    except Exception as e:
+        logger.info(f"CDP capture unavailable, resizing the window instead: {str(e)}")
+        driver.set_window_size(SCREENSHOT_WIDTH, height)
+        return driver.get_screenshot_as_png()
 
-        res = (
-            service.cse()
-            .list(
-                q=inquiry,
-                cx=searchEngine,
-                num=10
-            )
-            .execute()
+async def searchFunction(inquiry):
+    logger.info(f"Executing Google search for: {inquiry}")
+    try:
+        res = await get_http_pool().get_json(
+            CUSTOM_SEARCH_URL,
+            params={
+                "key": searchKey,
+                "cx": searchEngine,
+                "q": inquiry,
+                "num": 10
+            },
+            timeout=15
         )
         
         formatted_results = []
@@ -247,13 +383,16 @@ def VideoExplainFunction(searchResults):
     return webInformation
 
 
-def explain_with_ai(inquiry, searchResults, original_query=None):
+async def explain_with_ai(inquiry, searchResults, original_query=None, stream=False):
     logger.info(f"Starting AI explanation for search: {inquiry}")
     
-    # Convert searchResults to a more readable format
-    formatted_text = ""
-    for result in searchResults:
-        formatted_text += f"\nTitle: {result['title']}\nSummary: {result['snippet']}\nLink: {result['link']}\n"
+    # Convert searchResults to a more readable format, best-ranked results first into the budget
+    formatted_text = PromptBuilder(SEARCH_PROMPT_TOKENS, name="search prompt").add(
+        "",
+        [f"\nTitle: {result['title']}\nSummary: {result['snippet']}\nLink: {result['link']}" for result in searchResults],
+        priority=0,
+        max_item_tokens=200
+    ).build()
 
     # Add date context to the system message
     current_date = datetime.now().strftime("%B %d, %Y")
@@ -277,32 +416,22 @@ def explain_with_ai(inquiry, searchResults, original_query=None):
         ],
         "max_tokens": 2500
     }
+    logger.info(f"Search explanation prompt: {count_message_tokens(payload['messages'])} tokens")
+
+    if stream:
+        logger.info("Streaming AI explanation from OpenAI API")
+        return stream_sentences(payload, headers, "An error occurred while processing the search results")
 
     try:
         logger.info("Sending request to OpenAI API")
-        response = requests.post("https://api.openai.com/v1/chat/completions", headers=headers, json=payload)
-        response.raise_for_status()
+        result = await get_http_pool().post_json(OPENAI_CHAT_URL, payload, headers=headers)
         logger.info("Successfully received AI explanation")
-        return response.json()["choices"][0]["message"]["content"]
-    except requests.exceptions.RequestException as e:
+        return result["choices"][0]["message"]["content"]
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
         logger.error(f"OpenAI API error: {str(e)}", exc_info=True)
         return f"An error occurred while processing the search results: {str(e)}"
 
-def extract_content(soup):
-    # Remove unwanted elements
-    for element in soup(['script', 'style', 'nav', 'footer']):
-        element.decompose()
-        
-    content = {
-        'title': soup.title.string if soup.title else '',
-        'headings': [h.get_text().strip() for h in soup.find_all(['h1', 'h2', 'h3'])],
-        'paragraphs': [p.get_text().strip() for p in soup.find_all('p') if p.get_text().strip()],
-        'lists': [li.get_text().strip() for li in soup.find_all('li') if li.get_text().strip()]
-    }
-    
-    return content
-
-def gen_explain_openai(prompt, formatted_content, content_type="webpage", search_context=None):
+async def gen_explain_openai(prompt, formatted_content, content_type="webpage", search_context=None, stream=False):
     logger.info(f"Starting AI explanation for {content_type}: {prompt}")
     
     # Customize system prompt based on content type
@@ -349,68 +478,58 @@ def gen_explain_openai(prompt, formatted_content, content_type="webpage", search
         "max_tokens": 2500,
         "temperature": 0.7  # Add some variety to responses
     }
+    headers = {"Authorization": f"Bearer {openai_api_key}",
+               "Content-Type": "application/json"}
+    logger.info(f"{content_type.capitalize()} explanation prompt: {count_message_tokens(payload['messages'])} tokens")
+
+    if stream:
+        logger.info("Streaming explanation from OpenAI API")
+        return stream_sentences(payload, headers, "An error occurred while processing the content")
 
     try:
         logger.info("Sending request to OpenAI API")
-        response = requests.post(
-            "https://api.openai.com/v1/chat/completions",
-            headers={"Authorization": f"Bearer {openai_api_key}",
-                    "Content-Type": "application/json"},
-            json=payload
-        )
-        response.raise_for_status()
-        return response.json()["choices"][0]["message"]["content"]
+        result = await get_http_pool().post_json(OPENAI_CHAT_URL, payload, headers=headers)
+        return result["choices"][0]["message"]["content"]
     except Exception as e:
         logger.error(f"OpenAI API error: {str(e)}", exc_info=True)
         return f"An error occurred while processing the content: {str(e)}"
 
-def find_relevant_sections(soup, topic):
-    """Find sections of the webpage most relevant to the topic"""
-    relevant_sections = []
-    
-    # Convert topic to keywords
-    keywords = set(topic.lower().split())
-    
-    # Search through different HTML elements
-    for element in soup.find_all(['p', 'h1', 'h2', 'h3', 'li']):
-        text = element.get_text().strip().lower()
-        # Check if any keyword appears in the text
-        if any(keyword in text for keyword in keywords):
-            relevant_sections.append({
-                'type': element.name,
-                'content': element.get_text().strip()
-            })
-    
-    return relevant_sections
+def find_relevant_sections(content, topic, top_k=DEFAULT_TOP_K, token_budget=DEFAULT_TOKEN_BUDGET):
+    """Find sections of the extracted page content most relevant to the topic, ranked with BM25"""
+    return rank_sections(content_sections(content), topic, top_k=top_k, token_budget=token_budget)
+
+async def explain_webpage_content(content, topic=None, search_context=None, stream=False):
+    # Fill the token budget by priority: title, topic matches, headings, then body text
+    builder = PromptBuilder(WEBPAGE_PROMPT_TOKENS, name="webpage prompt")
+    builder.add("Title:", [content['title']], priority=0, max_item_tokens=60)
+    builder.add("Main Headings:", content['headings'], priority=2, max_item_tokens=40)
+    builder.add("Key Content:", content['paragraphs'], priority=3, max_item_tokens=400)
+    builder.add("Lists:", content.get('lists', []), priority=4, max_item_tokens=80)
+    if topic:
+        builder.add(
+            f"Topic-Specific Content ({topic}):",
+            [section['content'] for section in content.get('topic_specific', [])],
+            priority=1,
+            max_item_tokens=400
+        )
 
-def explain_webpage_content(content, topic=None, search_context=None):
     formatted_content = {
         'title': content['title'],
-        'content': f"""
-        Main Headings:
-        {chr(10).join(content['headings'][:5])}
-        
-        Key Content:
-        {chr(10).join(content['paragraphs'][:10])}
-        
-        {f"Topic-Specific Content ({topic}):" if topic else ""}
-        {chr(10).join([section['content'] for section in content.get('topic_specific', [])])}
-        """
+        'content': builder.build()
     }
     
-    return gen_explain_openai(
+    return await gen_explain_openai(
         prompt=topic if topic else "general overview",
         formatted_content=formatted_content,
         content_type="webpage",
-        search_context=search_context
+        search_context=search_context,
+        stream=stream
     )
 
-def explain_with_ai_screenshot(image_path, topic=None, url=None):
+async def explain_with_ai_screenshot(base64_image, topic=None, url=None, mime_type="image/png", stream=False):
     """Analyze webpage screenshot with GPT-4 Vision"""
     logger.info(f"Analyzing screenshot of webpage: {url}")
     
-    base64_image = encode_image(image_path)
-    
     context = f"This is a screenshot of {url}. "
     if topic:
         context += f"Please focus on information about {topic}. "
@@ -437,7 +556,7 @@ def explain_with_ai_screenshot(image_path, topic=None, url=None):
                     {
                         "type": "image_url",
                         "image_url": {
-                            "url": f"data:image/png;base64,{base64_image}"
+                            "url": f"data:{mime_type};base64,{base64_image}"
                         }
                     }
                 ]
@@ -446,14 +565,12 @@ def explain_with_ai_screenshot(image_path, topic=None, url=None):
         "max_tokens": 2500
     }
 
+    if stream:
+        return stream_sentences(payload, headers, "An error occurred while analyzing the webpage")
+
     try:
-        response = requests.post(
-            "https://api.openai.com/v1/chat/completions",
-            headers=headers,
-            json=payload
-        )
-        response.raise_for_status()
-        return response.json()["choices"][0]["message"]["content"]
+        result = await get_http_pool().post_json(OPENAI_CHAT_URL, payload, headers=headers)
+        return result["choices"][0]["message"]["content"]
     except Exception as e:
         logger.error(f"Error analyzing screenshot: {str(e)}", exc_info=True)
         return f"An error occurred while analyzing the webpage: {str(e)}"
\ No newline at end of file
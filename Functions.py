@@ -1,43 +1,123 @@
-from AgentFunctions.screenHelp import AssistantScreenFnc
-from AgentFunctions.webHelp import AssistantWebFnc
-from AgentFunctions.locationHelp import AssistantLocationFnc
+from AgentFunctions.httpClient import close_http_pool
+from AgentFunctions.llmStream import StreamedAnswer, ToolAnswerLLM
+from AgentFunctions.toolScheduler import ToolScheduler
+from AgentFunctions.singleFlight import SingleFlight, call_key
 from livekit.agents import llm
 import asyncio
+import importlib
 import logging
+import time
+import os
 
 logger = logging.getLogger(__name__)
 
+# Assistant modules and the heavy libraries each one loads on its first real use.
+# They are imported when a tool first needs them, or ahead of time by warm_up().
+ASSISTANT_MODULES = {
+    "web": ["AgentFunctions.webHelp", "selenium.webdriver"],
+    "screen": ["AgentFunctions.screenHelp", "AgentFunctions.highlightDetect", "pyautogui"],
+    "location": ["AgentFunctions.locationHelp"],
+}
+MAX_STREAMED_ANSWERS = 8
+# Assistants to warm up in the background once the greeting has been sent; empty disables it
+WARM_UP_ASSISTANTS = [name for name in os.getenv("WARM_UP_ASSISTANTS", "web,screen").split(",") if name.strip()]
 
 
 class AgentFunctions(llm.FunctionContext):
-    def __init__(self) -> None:
+    def __init__(self, stream_responses: bool = None) -> None:
         super().__init__()
-        self._lock = asyncio.Lock()
-        self.web_assistant = AssistantWebFnc()
-        self.screen_assistant = AssistantScreenFnc()
-        self.location_assistant = AssistantLocationFnc()
-
-        self._processing = False
         self.function_timeout = 60  # 60 seconds timeout
+        # One concurrency limit per resource so a screen call and a search don't block each other
+        self.scheduler = ToolScheduler(timeout=self.function_timeout)
+        # Retried or repeated calls with the same arguments share one pipeline
+        self._single_flight = SingleFlight()
+        # Assistants are created on first use so startup doesn't wait on their imports
+        self._assistants = {}
 
-    async def _execute_with_lock(self, func, *args, **kwargs):
-        """Execute function with lock to prevent concurrent operations"""
-        if self._processing:
-            return "I'm still processing your previous request. Please wait a moment."
-            
-        try:
-            self._processing = True
-            async with self._lock:
-                try:
-                    return await asyncio.wait_for(
-                        func(*args, **kwargs),
-                        timeout=self.function_timeout
-                    )
-                except asyncio.TimeoutError:
-                    logger.warning(f"Function {func.__name__} is taking longer than {self.function_timeout} seconds")
-                    return await func(*args, **kwargs)
-        finally:
-            self._processing = False
+        # Stream long explanations straight into TTS once a voice agent is attached
+        if stream_responses is None:
+            stream_responses = os.getenv("STREAM_TOOL_RESPONSES", "1") == "1"
+        self.stream_responses = stream_responses
+        self._agent = None
+        self._streamed_answers = {}  # token -> StreamedAnswer, oldest first
+
+    def _assistant(self, name: str):
+        """The web, screen or location assistant, created (and its module imported) on first use.
+        Not a property: FunctionContext.__init__ inspects every attribute, which would start them all."""
+        assistant = self._assistants.get(name)
+        if assistant is None:
+            started = time.perf_counter()
+            if name == "web":
+                from AgentFunctions.webHelp import AssistantWebFnc
+                assistant = AssistantWebFnc(scheduler=self.scheduler)
+            elif name == "screen":
+                from AgentFunctions.screenHelp import AssistantScreenFnc
+                assistant = AssistantScreenFnc()
+            else:
+                from AgentFunctions.locationHelp import AssistantLocationFnc
+                assistant = AssistantLocationFnc()
+            self._assistants[name] = assistant
+            logger.info(f"Started {name} assistant in {(time.perf_counter() - started) * 1000:.0f} ms")
+        return assistant
+
+    def _search_results(self) -> list:
+        """Results of the last search; without a web assistant there hasn't been one"""
+        web = self._assistants.get("web")
+        return web.last_search_results if web else []
+
+    async def warm_up(self, names: list = None):
+        """Import assistant modules in a worker thread and create the assistants, so the first
+        tool call doesn't pay for it. Meant to run in the background after the greeting."""
+        loop = asyncio.get_event_loop()
+        for name in names if names is not None else WARM_UP_ASSISTANTS:
+            name = name.strip()
+            if name not in ASSISTANT_MODULES or name in self._assistants:
+                continue
+            started = time.perf_counter()
+            try:
+                for module in ASSISTANT_MODULES[name]:
+                    await loop.run_in_executor(None, importlib.import_module, module)
+                self._assistant(name)
+                logger.info(f"Warmed up {name} assistant in {(time.perf_counter() - started) * 1000:.0f} ms")
+            except Exception as e:
+                # Whatever failed here will fail (and be reported) again on first use
+                logger.warning(f"Could not warm up {name} assistant: {str(e)}")
+
+    def attach_agent(self, agent):
+        """Attach the voice pipeline. Tools stream their answers only when the agent's LLM is a
+        ToolAnswerLLM, which plays them as the reply to the tool call."""
+        self._agent = agent
+        if self.stream_responses and not isinstance(agent.llm, ToolAnswerLLM):
+            logger.warning("Agent LLM is not wrapped in ToolAnswerLLM, tool answers won't be streamed")
+
+    @property
+    def _streaming(self) -> bool:
+        return self.stream_responses and self._agent is not None and isinstance(self._agent.llm, ToolAnswerLLM)
+
+    def streamed_answer(self, token: str):
+        """The StreamedAnswer a tool returned a placeholder for, if it is still held"""
+        return self._streamed_answers.get(token)
+
+    def _deliver(self, result):
+        """Start reading a streamed answer and return its placeholder as the tool result. The
+        agent's ToolAnswerLLM swaps the placeholder for the sentences when it writes the reply."""
+        if result is None or isinstance(result, str):
+            return result
+        answer = StreamedAnswer(result)
+        self._streamed_answers[answer.token] = answer
+        while len(self._streamed_answers) > MAX_STREAMED_ANSWERS:
+            self._streamed_answers.pop(next(iter(self._streamed_answers)))
+        return answer.placeholder
+
+    async def _run(self, resource, func, *args, **kwargs):
+        """Run a tool on its resource queue; a streamed answer is handed over as soon as it starts.
+        Identical calls already in flight are joined rather than started again."""
+        async def job():
+            return self._deliver(await func(*args, **kwargs))
+        job.__name__ = func.__name__
+
+        key = call_key(func.__name__, *args, **kwargs)
+        return await self._single_flight.do(key, self.scheduler.run, resource, job)
 
     @llm.ai_callable(
         description="""Search the web for information about a topic.
@@ -49,9 +129,11 @@ class AgentFunctions(llm.FunctionContext):
         - Look up {topic}"""
     )
     async def web_search(self, topic: str):
-        return await self._execute_with_lock(
-            self.web_assistant.search, 
-            topic
+        return await self._run(
+            "web",
+            self._assistant("web").search, 
+            topic,
+            stream=self._streaming
         )
 
     @llm.ai_callable(
@@ -65,13 +147,15 @@ class AgentFunctions(llm.FunctionContext):
     )
     async def web_read(self, url: str, topic: str = None):
         search_context = None
-        if self.web_assistant.last_search_results:
+        if self._search_results():
             search_context = "Following up on search about: " + \
-                           self.web_assistant.last_search_results[0].get('title', '')
+                           self._search_results()[0].get('title', '')
         
-        return await self._execute_with_lock(
-            self.web_assistant.traverse_web,
-            url, topic, search_context
+        return await self._run(
+            "web",
+            self._assistant("web").traverse_web,
+            url, topic, search_context,
+            stream=self._streaming
         )
 
     @llm.ai_callable(
@@ -84,15 +168,17 @@ class AgentFunctions(llm.FunctionContext):
         Note: Results are numbered starting from 1"""
     )
     async def read_search_result(self, result_number: int):
-        if not self.web_assistant.last_search_results:
+        if not self._search_results():
             return "I don't have any recent search results to reference. Please perform a search first."
         
-        if result_number < 1 or result_number > len(self.web_assistant.last_search_results):
-            return f"Please specify a result number between 1 and {len(self.web_assistant.last_search_results)}"
+        if result_number < 1 or result_number > len(self._search_results()):
+            return f"Please specify a result number between 1 and {len(self._search_results())}"
         
-        return await self._execute_with_lock(
-            self.web_assistant.get_site_from_results,
-            result_number - 1
+        return await self._run(
+            "web",
+            self._assistant("web").get_site_from_results,
+            result_number - 1,
+            stream=self._streaming
         )
 
     @llm.ai_callable(
@@ -106,8 +192,10 @@ class AgentFunctions(llm.FunctionContext):
     )
     async def explain_screen(self):
         try:
-            result = await self._execute_with_lock(
-                self.screen_assistant.explain_concept
+            result = await self._run(
+                "screen",
+                self._assistant("screen").explain_concept,
+                stream=self._streaming
             )
             if result:
                 return result
@@ -116,6 +204,49 @@ class AgentFunctions(llm.FunctionContext):
             logger.error(f"Error in explain_screen: {str(e)}")
             return "I encountered an error while trying to explain the screen. Please try again."
 
+    @llm.ai_callable(
+        description="""Explain or answer a question about the text the user has highlighted (selected) on the screen.
+        This function can be triggered by phrases like:
+        - Explain this highlighted sentence
+        - What does the selected text mean
+        - Explain what I highlighted
+        - Translate the text I selected
+        Optional: Include the user's question about the highlighted text."""
+    )
+    async def explain_highlighted_text(self, question: str = None):
+        try:
+            return await self._run(
+                "screen",
+                self._assistant("screen").get_highlighted_text,
+                question,
+                stream=self._streaming
+            )
+        except Exception as e:
+            logger.error(f"Error in explain_highlighted_text: {str(e)}")
+            return "I encountered an error while reading the highlighted text. Please try again."
+
+    @llm.ai_callable(
+        description="""Explain what just happened on the screen over the last few seconds.
+        Only works when background screen watching is turned on.
+        This function can be triggered by phrases like:
+        - What just happened on my screen
+        - What changed on my screen
+        - What did I just do
+        - What was that popup
+        Optional: how many seconds back to look (default 30)."""
+    )
+    async def explain_recent_activity(self, seconds: int = 30):
+        try:
+            return await self._run(
+                "screen",
+                self._assistant("screen").explain_recent_activity,
+                seconds,
+                stream=self._streaming
+            )
+        except Exception as e:
+            logger.error(f"Error in explain_recent_activity: {str(e)}")
+            return "I encountered an error while looking at recent screen activity. Please try again."
+
     @llm.ai_callable(
         description="""List the most recent search results.
         This function can be triggered by phrases like:
@@ -125,11 +256,11 @@ class AgentFunctions(llm.FunctionContext):
         - Show me what you found"""
     )
     async def list_search_results(self):
-        if not self.web_assistant.last_search_results:
+        if not self._search_results():
             return "I don't have any recent search results to show. Please perform a search first."
         
         results = []
-        for i, result in enumerate(self.web_assistant.last_search_results, 1):
+        for i, result in enumerate(self._search_results(), 1):
             results.append(f"{i}. {result.get('title', 'Untitled')}")
         
         return "Here are the recent search results:\n" + "\n".join(results)
@@ -137,10 +268,11 @@ class AgentFunctions(llm.FunctionContext):
     async def cleanup(self):
         """Cleanup all resources"""
         try:
-            if hasattr(self.web_assistant, 'cleanup'):
-                await self.web_assistant.cleanup()
-            if hasattr(self.location_assistant, 'cleanup'):
-                await self.location_assistant.cleanup()
+            # Only assistants that were actually started have anything to clean up
+            for assistant in list(self._assistants.values()):
+                if hasattr(assistant, 'cleanup'):
+                    await assistant.cleanup()
+            await close_http_pool()
             logger.info("Agent functions cleanup completed")
         except Exception as e:
             logger.error(f"Error during cleanup: {str(e)}")
\ No newline at end of file
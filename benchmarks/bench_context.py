@@ -0,0 +1,75 @@
+# Simulate a long voice session and compare the prompt each reply would send with and
+# without rolling context compaction. The summarizer is a local stand-in, so this measures
+# only the work done on the reply path and the size of what gets sent.
+# Usage: python benchmarks/bench_context.py [--turns N] [--tool-every N]
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from livekit.agents import llm  # noqa: E402
+
+from AgentFunctions.contextCompactor import ContextCompactor, message_tokens  # noqa: E402
+
+TOOL_RESULT = ("The search found several relevant sources describing the topic in detail. " * 160).strip()
+
+
+class FakeAgent:
+    def __init__(self, chat_ctx):
+        self.chat_ctx = chat_ctx
+
+
+async def local_summarizer(previous, lines):
+    await asyncio.sleep(0.001)  # stands in for the summary request
+    return (previous + " " + " ".join(line[:60] for line in lines))[-1200:]
+
+
+async def simulate(turns: int, tool_every: int, compactor):
+    agent = FakeAgent(llm.ChatContext().append(role="system", text="You are a helpful voice assistant."))
+    prompt_tokens, reply_ms = [], []
+    for turn in range(turns):
+        question = f"Question {turn}: what can you tell me about topic number {turn} and how it relates to the last one?"
+        chat_ctx = agent.chat_ctx.copy()
+        chat_ctx.messages.append(llm.ChatMessage.create(text=question, role="user"))
+
+        start = time.perf_counter()
+        if compactor:
+            await compactor.before_llm(agent, chat_ctx)
+        reply_ms.append((time.perf_counter() - start) * 1000)
+        prompt_tokens.append(sum(message_tokens(m) for m in chat_ctx.messages))
+
+        agent.chat_ctx.messages.append(llm.ChatMessage.create(text=question, role="user"))
+        if tool_every and turn % tool_every == 0:
+            agent.chat_ctx.messages.append(llm.ChatMessage(role="tool", content=TOOL_RESULT, name="web_search",
+                                                           tool_call_id=f"call_{turn}"))
+        agent.chat_ctx.messages.append(llm.ChatMessage.create(
+            text=f"Here is a short spoken answer about topic {turn}, with a couple of details.", role="assistant"))
+        await asyncio.sleep(0.002)  # the user is talking while the summary runs
+    return prompt_tokens, reply_ms
+
+
+def report(label, prompt_tokens, reply_ms):
+    checkpoints = [n for n in (10, 50, 100, 200, 400) if n <= len(prompt_tokens)]
+    sizes = "  ".join(f"turn {n}: {prompt_tokens[n - 1]:>6}" for n in checkpoints)
+    print(f"{label:<12} prompt tokens  {sizes}   max {max(prompt_tokens)}")
+    print(f"{'':<12} reply-path work p50 {statistics.median(reply_ms):.2f} ms   max {max(reply_ms):.2f} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=400, help="about an hour of conversation")
+    parser.add_argument("--tool-every", type=int, default=4, help="a 2500-token tool result every N turns")
+    args = parser.parse_args()
+
+    report("unbounded", *await simulate(args.turns, args.tool_every, None))
+    compactor = ContextCompactor(summarizer=local_summarizer)
+    report("compacted", *await simulate(args.turns, args.tool_every, compactor))
+    await compactor.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,76 @@
+# Benchmark the vectorized distance matrix against one geopy geodesic call per pair.
+# Usage: python benchmarks/bench_distance.py [--origins N] [--destinations M] [--repeat N]
+import os
+import sys
+import time
+import argparse
+import statistics
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from AgentFunctions import geoMath  # noqa: E402
+
+try:
+    from geopy.distance import geodesic
+except ImportError:
+    geodesic = None
+
+
+def looped_geodesic(origins, destinations):
+    """The previous get_distance approach, applied to every pair"""
+    return [[geodesic(tuple(o), tuple(d)).miles for d in destinations] for o in origins]
+
+
+def random_locations(count, seed):
+    """Points scattered around the continental US"""
+    rng = np.random.default_rng(seed)
+    return np.column_stack([rng.uniform(25, 49, count), rng.uniform(-124, -67, count)])
+
+
+def time_it(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--origins", type=int, default=50)
+    parser.add_argument("--destinations", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    origins = random_locations(args.origins, 1)
+    destinations = random_locations(args.destinations, 2)
+    pairs = args.origins * args.destinations
+    print(f"{args.origins} x {args.destinations} = {pairs} pairs")
+
+    haversine_ms = time_it(lambda: geoMath.haversine_matrix(origins, destinations), args.repeat)
+    vincenty_ms = time_it(lambda: geoMath.vincenty_matrix(origins, destinations), args.repeat)
+    nearest_ms = time_it(lambda: geoMath.nearest_k(origins[0], destinations, k=5), args.repeat)
+    print(f"{'haversine matrix':<24}{haversine_ms:>10.2f} ms")
+    print(f"{'vincenty matrix':<24}{vincenty_ms:>10.2f} ms")
+    print(f"{'nearest 5 of ' + str(args.destinations):<24}{nearest_ms:>10.2f} ms")
+
+    if geodesic is None:
+        print("geopy not installed, skipping the looped geodesic baseline")
+        return
+
+    looped_ms = time_it(lambda: looped_geodesic(origins, destinations), max(1, args.repeat // 2))
+    print(f"{'looped geodesic':<24}{looped_ms:>10.2f} ms")
+    print(f"speedup: haversine {looped_ms / haversine_ms:.0f}x, vincenty {looped_ms / vincenty_ms:.0f}x")
+
+    reference = np.array(looped_geodesic(origins, destinations))
+    vincenty_error = np.abs(geoMath.vincenty_matrix(origins, destinations) - reference).max()
+    haversine_error = np.abs(geoMath.haversine_matrix(origins, destinations) - reference) / reference
+    print(f"max error vs geodesic: vincenty {vincenty_error * geoMath.METERS_PER_MILE:.4f} m, "
+          f"haversine {haversine_error.max() * 100:.2f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# Benchmark the single-pass extractor against the old BeautifulSoup double walk.
+# Usage: python benchmarks/bench_extract.py [corpus_dir] [--topic "some topic"] [--repeat N]
+# The corpus is a directory of saved .html pages; without one a ~1 MB synthetic news page is used.
+import os
+import sys
+import glob
+import time
+import random
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from AgentFunctions import htmlExtract  # noqa: E402
+
+try:
+    from bs4 import BeautifulSoup
+except ImportError:
+    BeautifulSoup = None
+
+
+def legacy_extract(html, topic):
+    """The previous traverse_web path: html.parser soup, extract_content, then find_relevant_sections"""
+    soup = BeautifulSoup(html, 'html.parser')
+    for element in soup(['script', 'style', 'nav', 'footer']):
+        element.decompose()
+    content = {
+        'title': soup.title.string if soup.title else '',
+        'headings': [h.get_text().strip() for h in soup.find_all(['h1', 'h2', 'h3'])],
+        'paragraphs': [p.get_text().strip() for p in soup.find_all('p') if p.get_text().strip()],
+        'lists': [li.get_text().strip() for li in soup.find_all('li') if li.get_text().strip()]
+    }
+    if topic:
+        keywords = set(topic.lower().split())
+        content['topic_specific'] = [
+            {'type': element.name, 'content': element.get_text().strip()}
+            for element in soup.find_all(['p', 'h1', 'h2', 'h3', 'li'])
+            if any(keyword in element.get_text().strip().lower() for keyword in keywords)
+        ]
+    return content
+
+
+def synthetic_page(target_bytes=1_000_000):
+    """A news-style page with navigation, sidebars, comments, scripts and a long article"""
+    random.seed(7)
+    words = ("market city council vote budget storm river school energy policy report economy "
+             "health transit housing election court weather sports season team coach").split()
+
+    def sentence():
+        return " ".join(random.choice(words) for _ in range(random.randint(8, 20))).capitalize() + ", and more."
+
+    parts = ["<html><head><title>City News</title><script>var tracking = {};</script>"
+             "<style>body { font-family: sans-serif; }</style></head><body>",
+             "<nav><ul>" + "".join(f"<li><a href='/s{i}'>Section {i}</a></li>" for i in range(40)) + "</ul></nav>"]
+    while sum(len(p) for p in parts) < target_bytes:
+        parts.append("<div class='sidebar'><ul>" +
+                     "".join(f"<li><a href='/r{i}'>{sentence()}</a></li>" for i in range(10)) + "</ul></div>")
+        parts.append("<article class='story-content'><h1>" + sentence() + "</h1>" +
+                     "".join(f"<p>{sentence()} {sentence()} <a href='#'>link</a> {sentence()}</p>" for _ in range(15)) +
+                     "<h2>" + sentence() + "</h2><ul>" + "".join(f"<li>{sentence()}</li>" for _ in range(5)) +
+                     "</ul></article>")
+        parts.append("<div id='comments'>" + "".join(f"<p>{sentence()}</p>" for _ in range(10)) + "</div>")
+        parts.append("<script>window.ads = [" + ",".join(str(i) for i in range(200)) + "];</script>")
+    parts.append("<footer><p>Copyright City News</p></footer></body></html>")
+    return "".join(parts)
+
+
+def time_it(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("corpus", nargs="?", help="directory of saved .html pages")
+    parser.add_argument("--topic", default="city council budget vote")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    pages = []
+    if args.corpus:
+        for path in sorted(glob.glob(os.path.join(args.corpus, "*.htm*"))):
+            with open(path, encoding="utf-8", errors="replace") as f:
+                pages.append((os.path.basename(path), f.read()))
+    if not pages:
+        pages = [("synthetic-news.html", synthetic_page())]
+
+    backends = ["stdlib"] + (["lxml"] if htmlExtract.lxml_etree is not None else [])
+    header = f"{'page':<32}{'KB':>8}" + "".join(f"{name + ' ms':>14}" for name in backends)
+    header += f"{'bs4 ms':>12}{'speedup':>10}" if BeautifulSoup else ""
+    print(header)
+
+    for name, html in pages:
+        row = f"{name[:31]:<32}{len(html) / 1024:>8.0f}"
+        timings = {}
+        for backend in backends:
+            timings[backend] = time_it(lambda: htmlExtract.extract_content(html, args.topic, backend=backend), args.repeat)
+            row += f"{timings[backend]:>14.1f}"
+        if BeautifulSoup:
+            legacy = time_it(lambda: legacy_extract(html, args.topic), args.repeat)
+            row += f"{legacy:>12.1f}{legacy / min(timings.values()):>9.1f}x"
+        print(row)
+
+        content = htmlExtract.extract_content(html, args.topic)
+        print(f"{'':<32}kept {len(content['paragraphs'])} paragraphs, {len(content['lists'])} list items, "
+              f"{len(content['topic_specific'])} topic matches")
+
+
+if __name__ == "__main__":
+    main()
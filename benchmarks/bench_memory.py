@@ -0,0 +1,81 @@
+# Benchmark the conversation memory store: batched background writes and FTS5 recall.
+# Usage: python benchmarks/bench_memory.py [--turns N] [--queries N] [--db path]
+# Without --db a temporary database is filled with synthetic turns and removed afterwards.
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from AgentFunctions.memoryStore import MemoryStore  # noqa: E402
+
+TOPICS = ("weather forecast austin rain storm commute traffic highway downtown restaurant pizza "
+          "tacos coffee meeting calendar dentist appointment python code bug deploy server "
+          "database index query flight hotel vacation budget taxes invoice mortgage garden "
+          "tomatoes basil soccer playoffs score guitar chords recipe lasagna marathon training "
+          "battery laptop screen monitor keyboard spreadsheet presentation slides birthday gift").split()
+FILLER = "i you the a to and of it is that what can please tell me about my for on with".split()
+
+
+def synthetic_turn(rng):
+    words = rng.sample(TOPICS, rng.randint(2, 5)) + rng.choices(FILLER, k=rng.randint(6, 20))
+    rng.shuffle(words)
+    return " ".join(words).capitalize() + "."
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--db", help="existing or new database path to use instead of a temp file")
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    directory = None
+    path = args.db
+    if not path:
+        directory = tempfile.TemporaryDirectory()
+        path = os.path.join(directory.name, "memory.sqlite")
+
+    store = MemoryStore(path=path)
+    started = time.perf_counter()
+    enqueue_samples = []
+    for i in range(args.turns):
+        turn = synthetic_turn(rng)
+        start = time.perf_counter()
+        store.record("user" if i % 2 == 0 else "assistant", turn)
+        enqueue_samples.append((time.perf_counter() - start) * 1e6)
+    enqueued = time.perf_counter() - started
+    store.flush(timeout=600)
+    written = time.perf_counter() - started
+    print(f"recorded {args.turns} turns: enqueue {enqueued:.2f}s "
+          f"(p99 {percentile(enqueue_samples, 0.99):.1f} us per call), committed after {written:.2f}s "
+          f"({args.turns / written:,.0f} turns/s)")
+
+    queries = [synthetic_turn(rng) for _ in range(args.queries)]
+    for label, fn in (("search", lambda q: store.search(q)), ("recall + budget", lambda q: store.recall(q))):
+        samples = []
+        for query in queries:
+            start = time.perf_counter()
+            fn(query)
+            samples.append((time.perf_counter() - start) * 1000)
+        print(f"{label:<16} p50 {statistics.median(samples):6.2f} ms   p95 {percentile(samples, 0.95):6.2f} ms   "
+              f"max {max(samples):6.2f} ms")
+
+    print("example recall:\n" + store.recall(queries[0]))
+    store.close()
+    if directory:
+        directory.cleanup()
+
+
+if __name__ == "__main__":
+    main()
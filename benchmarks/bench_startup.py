@@ -0,0 +1,108 @@
+# Measure worker startup phase by phase, each run in a fresh interpreter so imports are cold.
+# "Time to greeting" is everything the entrypoint does before assistant.say(); connecting to
+# the room and synthesizing the greeting are network-bound and not included.
+# Usage: python benchmarks/bench_startup.py [--repeat N] [--assistants web,screen]
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r"""
+import os, sys, json, time, asyncio, tempfile
+sys.path.insert(0, {root!r})
+timings = {{}}
+
+def phase(name, fn):
+    start = time.perf_counter()
+    try:
+        fn()
+        timings[name] = (time.perf_counter() - start) * 1000
+    except Exception as e:
+        timings[name] = f"{{type(e).__name__}}: {{e}}"
+
+def import_livekit():
+    import livekit.agents
+    from livekit.plugins import openai, silero, deepgram
+
+phase("import livekit + plugins", import_livekit)
+phase("import Functions", lambda: __import__("Functions"))
+phase("import memory + compaction", lambda: (__import__("AgentFunctions.memoryStore"),
+                                             __import__("AgentFunctions.contextCompactor")))
+
+async def main():
+    from Functions import AgentFunctions
+    from AgentFunctions.memoryStore import MemoryStore
+    from AgentFunctions.contextCompactor import ContextCompactor
+    holder = {{}}
+    phase("AgentFunctions()", lambda: holder.update(fnc=AgentFunctions()))
+    directory = tempfile.mkdtemp()
+    phase("MemoryStore() + ContextCompactor()", lambda: holder.update(
+        memory=MemoryStore(path=os.path.join(directory, "memory.sqlite")), compactor=ContextCompactor()))
+    fnc = holder.get("fnc")
+    if fnc is None:
+        return
+    for name in {assistants!r}:
+        if {warm!r}:
+            start = time.perf_counter()
+            await fnc.warm_up([name])
+            ok = name in fnc._assistants
+            timings[f"background warm-up: {{name}}"] = (time.perf_counter() - start) * 1000 if ok else "failed"
+        else:
+            phase(f"first use on the event loop: {{name}}", lambda: fnc._assistant(name))
+    if "memory" in holder:
+        holder["memory"].close()
+
+asyncio.run(main())
+print("TIMINGS " + json.dumps(timings))
+"""
+
+GREETING_PHASES = ["import livekit + plugins", "import Functions", "import memory + compaction",
+                   "AgentFunctions()", "MemoryStore() + ContextCompactor()"]
+
+
+def run_child(assistants, warm):
+    code = CHILD.format(root=ROOT, assistants=assistants, warm=warm)
+    env = dict(os.environ, WARM_UP_ASSISTANTS="", SCREEN_WATCHER="0", CHROME_PREWARM="0")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=ROOT, env=env)
+    for line in result.stdout.splitlines():
+        if line.startswith("TIMINGS "):
+            return json.loads(line[len("TIMINGS "):])
+    raise RuntimeError(f"benchmark child failed:\n{result.stderr[-2000:]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--assistants", default="web,screen")
+    args = parser.parse_args()
+    assistants = [name for name in args.assistants.split(",") if name]
+
+    runs = [run_child(assistants, warm=(i % 2 == 1)) for i in range(args.repeat * 2)]
+    names = []
+    for run in runs:
+        names.extend(name for name in run if name not in names)
+
+    greeting = []
+    for run in runs:
+        parts = [run.get(name) for name in GREETING_PHASES]
+        if all(isinstance(part, float) for part in parts):
+            greeting.append(sum(parts))
+
+    print(f"{'phase':<44}{'median':>10}{'min':>10}")
+    for name in names:
+        samples = [run[name] for run in runs if isinstance(run.get(name), float)]
+        if samples:
+            print(f"{name:<44}{statistics.median(samples):>8.1f}ms{min(samples):>8.1f}ms")
+        else:
+            error = next(run[name] for run in runs if name in run)
+            print(f"{name:<44}  unavailable ({error[:60]})")
+    if greeting:
+        print(f"{'time to greeting (before network)':<44}{statistics.median(greeting):>8.1f}ms{min(greeting):>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+# Logger setup shared by the assistants: console output plus an optional dated file in logs/.
+# The logs directory and the file are only created when the first record is written, so
+# importing a module that logs costs nothing on disk.
+import os
+import logging
+from datetime import datetime
+
+LOG_DIR = os.getenv("LOG_DIR", "logs")
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+class LazyFileHandler(logging.FileHandler):
+    """FileHandler that creates its directory and opens the file on the first record"""
+
+    def __init__(self, filename: str, encoding: str = "utf-8") -> None:
+        super().__init__(filename, encoding=encoding, delay=True)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
+def create_logger(name: str, file_prefix: str = None, level: int = logging.INFO) -> logging.Logger:
+    """Logger with a console handler and, given a prefix, logs/<prefix>_YYYY-MM-DD.log"""
+    logger = logging.getLogger(name)
+    logger.setLevel(level)
+    if logger.handlers:
+        return logger  # already set up by an earlier import
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    if file_prefix:
+        file_handler = LazyFileHandler(
+            os.path.join(LOG_DIR, f'{file_prefix}_{datetime.now().strftime("%Y-%m-%d")}.log')
+        )
+        file_handler.setFormatter(formatter)
+        file_handler.setLevel(level)
+        logger.addHandler(file_handler)
+
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(formatter)
+    console_handler.setLevel(level)
+    logger.addHandler(console_handler)
+    return logger
@@ -12,6 +12,10 @@ from livekit.agents import AutoSubscribe, JobContext, cli, llm, WorkerOptions
 from livekit.agents.voice_assistant import VoiceAssistant, VoicePipelineAgent
 from livekit.plugins import openai, silero, deepgram
 from Functions import AgentFunctions
+from AgentFunctions.llmStream import ToolAnswerLLM, chain_before_llm
+from AgentFunctions.memoryStore import MemoryStore, MEMORY_ENABLED
+from AgentFunctions.contextCompactor import ContextCompactor, CONTEXT_COMPACTION
+from AgentFunctions.promptBudget import load_encoding
 from contextlib import asynccontextmanager
 import aiofiles.os
 
@@ -128,14 +132,34 @@ async def entrypoint(ctx: JobContext):
             ),
         )
         
+        fnc_ctx = None
+        memory = None
+        compactor = None
+        warm_up_task = None
         try:
             # Connect to room
             await ctx.connect(auto_subscribe=AutoSubscribe.AUDIO_ONLY)
             logger.info("Connected to room successfully")
 
+            # The tokenizer may need downloading the first time; fetch it off the event loop
+            asyncio.get_event_loop().run_in_executor(None, load_encoding)
+
             # Initialize functions with cleanup handling
             fnc_ctx = AgentFunctions()
             logger.info("Initialized agent functions")
+
+            # Long-term memory: turns are written in the background and relevant ones recalled before each reply
+            # and the chat context is compacted so long sessions don't slow every turn down
+            before_llm_hooks = []
+            if CONTEXT_COMPACTION:
+                compactor = ContextCompactor()
+                before_llm_hooks.append(compactor.before_llm)
+            if MEMORY_ENABLED:
+                memory = MemoryStore()
+                before_llm_hooks.append(memory.before_llm)
+            agent_options = {}
+            if before_llm_hooks:
+                agent_options["before_llm_cb"] = chain_before_llm(*before_llm_hooks)
             
             # Create assistant with better configuration
             assistant = VoicePipelineAgent(
@@ -145,17 +169,24 @@ async def entrypoint(ctx: JobContext):
                     model="nova-2",
                     language="en"
                 ),
-                llm=openai.LLM(
+                # Plays streamed tool answers as the reply to the tool call
+                llm=ToolAnswerLLM(openai.LLM(
                     temperature=0.7,
-                ),
+                )),
                 tts=openai.TTS(),
                 chat_ctx=initial_ctx,
                 fnc_ctx=fnc_ctx,
                 min_endpointing_delay=1.5,
                 allow_interruptions=True,
-                interrupt_speech_duration=1.0
+                interrupt_speech_duration=1.0,
+                **agent_options
             )
+            if memory:
+                memory.attach(assistant)
             
+            # Let tools stream long explanations straight into TTS
+            fnc_ctx.attach_agent(assistant)
+
             # Start assistant and give initial greeting
             assistant.start(ctx.room)
             logger.info("Assistant started successfully")
@@ -164,6 +195,9 @@ async def entrypoint(ctx: JobContext):
             await assistant.say("Hey, how can I help you today!", allow_interruptions=True)
             logger.info("Initial greeting sent")
 
+            # Load the tool assistants in the background now that the user has been greeted
+            warm_up_task = asyncio.create_task(fnc_ctx.warm_up())
+
             # Main conversation loop with better exit handling
             while not ctx.should_exit:
                 await asyncio.sleep(0.1)
@@ -171,8 +205,14 @@ async def entrypoint(ctx: JobContext):
         except Exception as e:
             logger.error(f"Error in entrypoint: {str(e)}", exc_info=True)
         finally:
+            if warm_up_task and not warm_up_task.done():
+                warm_up_task.cancel()
             if fnc_ctx:
                 await fnc_ctx.cleanup()
+            if memory:
+                memory.close()
+            if compactor:
+                await compactor.close()
             logger.info("Assistant cleanup completed")
 
 if __name__ == "__main__":
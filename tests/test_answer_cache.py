@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+
+from AgentFunctions.answerCache import AnswerCache
+
+ANSWER = "A cached summary."
+
+
+@pytest.mark.parametrize("stored, asked", [
+    ("flights from boston to denver", "flights from denver to boston"),
+    ("how to install docker compose on ubuntu server", "how to uninstall docker compose on ubuntu server"),
+    ("python not working", "python working"),
+    ("side effects of ibuprofen for children under twelve",
+     "side effects of acetaminophen for children under twelve"),
+    ("install docker compose on ubuntu server", "install docker compose on debian server"),
+    ("reset password on iphone", "reset password on android"),
+])
+def test_queries_with_different_meaning_miss(stored, asked):
+    cache = AnswerCache()
+    cache.store(stored, ANSWER)
+    assert cache.lookup(asked) is None
+
+
+@pytest.mark.parametrize("stored, asked", [
+    ("austin weather 2026-10-18", "weather in austin 2026-10-18"),
+    ("best pizza places in chicago", "best pizza place chicago"),
+    ("how to reset my password on iphone", "reset iphone password"),
+])
+def test_rephrased_queries_hit(stored, asked):
+    cache = AnswerCache()
+    cache.store(stored, ANSWER)
+    assert cache.lookup(asked)["answer"] == ANSWER
+
+
+def test_stream_that_fails_part_way_is_not_cached():
+    cache = AnswerCache()
+
+    async def chunks():
+        yield "The first half of the answer."
+        yield "Sorry, I lost the connection before I could finish that."
+
+    async def consume():
+        return [chunk async for chunk in cache.record_stream(chunks(), "python packaging guide")]
+
+    assert len(asyncio.run(consume())) == 2
+    assert cache.lookup("python packaging guide") is None
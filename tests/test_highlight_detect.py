@@ -0,0 +1,37 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from AgentFunctions.highlightDetect import find_highlight_regions
+
+SELECTION_BLUE = (51, 144, 255)
+BUTTON_BLUE = (0, 120, 215)
+
+
+def blank():
+    return np.full((1080, 1920, 3), 255, dtype=np.uint8)
+
+
+def select_text(frame, top, left, width):
+    """A one-line selection: blue band with dark glyphs cut out of it"""
+    frame[top:top + 22, left:left + width] = SELECTION_BLUE
+    for x in range(left + 4, left + width - 4, 9):
+        frame[top + 5:top + 18, x:x + 4] = 20
+
+
+@pytest.mark.parametrize("top, left", [(500, 800), (0, 0), (2, 2)])
+def test_text_selection_is_found(top, left):
+    frame = blank()
+    select_text(frame, top, left, 500)
+    regions = find_highlight_regions(frame)
+    assert len(regions) == 1
+    region_left, region_top, region_right, region_bottom = regions[0]
+    assert region_left <= left and region_top <= top and region_right >= left + 500
+
+
+@pytest.mark.parametrize("top, left", [(500, 800), (0, 0), (2, 2), (3, 3), (1040 - 3, 1700 - 3)])
+def test_solid_button_is_not_a_highlight(top, left):
+    frame = blank()
+    frame[top:top + 40, left:left + 220] = BUTTON_BLUE
+    assert find_highlight_regions(frame) == []
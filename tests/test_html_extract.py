@@ -0,0 +1,28 @@
+import pytest
+
+from AgentFunctions import htmlExtract
+from AgentFunctions.htmlExtract import extract_content
+
+ARTICLE = " ".join(["The council approved the new transit plan, adding routes, stops and later hours."] * 3)
+
+# Unclosed <li> and <p> elements that HTML ends implicitly at their container's end tag
+PAGE = f"""<html><head><title>Transit</title></head><body>
+<div class="article-content">
+  <p>{ARTICLE}
+  <p>{ARTICLE}
+  <ul><li>item one<li>item two</ul>
+</div>
+<div class="sidebar">Sidebar junk text that should never be read aloud.<p>Subscribe to our newsletter today</div>
+</body></html>"""
+
+
+def test_stdlib_backend_applies_implied_end_tags():
+    content = extract_content(PAGE, backend="stdlib")
+    assert content["lists"] == ["item one", "item two"]
+    assert content["paragraphs"] == [ARTICLE, ARTICLE]
+
+
+def test_backends_agree():
+    if htmlExtract.lxml_etree is None:
+        pytest.skip("lxml is not installed")
+    assert extract_content(PAGE, backend="stdlib") == extract_content(PAGE, backend="lxml")
@@ -0,0 +1,69 @@
+import random
+
+import pytest
+
+from AgentFunctions import promptBudget
+from AgentFunctions.promptBudget import PromptBuilder, DEFAULT_MODEL, count_tokens, truncate_to_tokens
+
+WORDS = "the quick brown fox jumps over a lazy dog while seventeen zebras quietly graze nearby".split()
+
+
+class FakeEncoding:
+    """Offline stand-in for a tiktoken encoding, one token per character"""
+
+    def encode(self, text, disallowed_special=()):
+        return [ord(ch) for ch in text]
+
+    def decode(self, tokens):
+        return "".join(chr(token) for token in tokens)
+
+
+@pytest.fixture(autouse=True, params=["estimate", "encoding"])
+def encoding(request, monkeypatch):
+    # Never touch the network: either the estimator or a fake encoding does the counting
+    monkeypatch.setattr(promptBudget, "_encodings",
+                        {DEFAULT_MODEL: None if request.param == "estimate" else FakeEncoding()})
+
+
+def paragraph(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)) + "."
+
+
+@pytest.mark.parametrize("max_tokens", [1, 5, 21, 64, 300])
+def test_truncation_stays_within_the_limit(max_tokens):
+    text = paragraph(random.Random(max_tokens), 500)
+    assert count_tokens(truncate_to_tokens(text, max_tokens)) <= max_tokens
+
+
+@pytest.mark.parametrize("budget", [30, 45, 80, 150, 400])
+def test_built_prompt_stays_within_the_budget(budget):
+    rng = random.Random(budget)
+    prompt = PromptBuilder(budget) \
+        .add("Question:", [paragraph(rng, 40)], priority=0) \
+        .add("Sources:", [paragraph(rng, 300), paragraph(rng, 20)], priority=1) \
+        .add("Notes:", [paragraph(rng, 15) for _ in range(10)], priority=2, max_item_tokens=12) \
+        .build()
+    assert prompt
+    assert count_tokens(prompt) <= budget
+
+
+def test_long_first_item_is_truncated_not_dropped():
+    rng = random.Random(0)
+    prompt = PromptBuilder(100).add("Source:", [paragraph(rng, 400)], priority=0).build()
+    assert prompt.startswith("Source:\n") and prompt.endswith("…")
+    assert count_tokens(prompt) <= 100
+
+
+def test_encoding_that_fails_to_load_falls_back_to_estimates(monkeypatch):
+    class BrokenTiktoken:
+        calls = 0
+
+        @classmethod
+        def encoding_for_model(cls, model):
+            cls.calls += 1
+            raise ConnectionError("no network")
+
+    monkeypatch.setattr(promptBudget, "tiktoken", BrokenTiktoken)
+    monkeypatch.setattr(promptBudget, "_encodings", {})
+    assert count_tokens("twelve characters") == count_tokens("twelve characters") > 0
+    assert BrokenTiktoken.calls == 1
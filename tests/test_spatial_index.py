@@ -0,0 +1,41 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from AgentFunctions import spatialIndex
+from AgentFunctions.spatialIndex import SpatialIndex
+
+
+def test_neighbours_across_the_antimeridian(monkeypatch):
+    monkeypatch.setattr(spatialIndex, "BRUTE_FORCE_LIMIT", 0)  # always walk the grid
+    index = SpatialIndex()
+    index.add("fiji-east", "East", "", -17.0, 179.99)
+    index.add("fiji-west", "West", "", -17.0, -179.99)
+    index.add("far", "Far", "", 40.0, 0.0)
+
+    assert index.nearest(-17.0, -179.999, k=2)[1]["key"] == "fiji-east"
+    assert [p["key"] for p in index.within(-17.0, 179.995, 5)] == ["fiji-east", "fiji-west"]
+    assert [p["key"] for p in index.within(-17.0, -179.995, 5)] == ["fiji-west", "fiji-east"]
+
+
+def test_oldest_places_are_evicted_past_the_size_limit(tmp_path):
+    path = str(tmp_path / "places.sqlite")
+    index = SpatialIndex(path, max_places=2)
+    for key in "abc":
+        index.add(key, key, "", 10.0, 10.0 + ord(key) * 0.01)
+    assert len(index) == 2
+    assert index.nearest(10.0, 10.0 + ord("a") * 0.01, k=1)[0]["key"] == "b"
+    index.close()
+
+    reopened = SpatialIndex(path, max_places=2)
+    assert sorted(p["key"] for p in reopened.within(10.0, 11.0, 100)) == ["b", "c"]
+    reopened.close()
+
+
+def test_expired_places_are_dropped_on_load(tmp_path):
+    path = str(tmp_path / "places.sqlite")
+    index = SpatialIndex(path)
+    index.add("a", "a", "", 10.0, 10.0)
+    index.close()
+
+    assert len(SpatialIndex(path, ttl=0)) == 0
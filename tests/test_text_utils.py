@@ -0,0 +1,19 @@
+import pytest
+
+from AgentFunctions.textUtils import canonical_query
+
+
+@pytest.mark.parametrize("first, second", [
+    ("What's the weather in Austin?", "weather austin"),
+    ("news October 18, 2026", "news 10/18/2026"),
+])
+def test_rephrasings_share_a_key(first, second):
+    assert canonical_query(first) == canonical_query(second)
+
+
+@pytest.mark.parametrize("first, second", [
+    ("flights from boston to denver", "flights from denver to boston"),
+    ("python not working", "python working"),
+])
+def test_order_negation_and_direction_keep_keys_apart(first, second):
+    assert canonical_query(first) != canonical_query(second)
@@ -0,0 +1,30 @@
+import asyncio
+
+from AgentFunctions.toolScheduler import ToolScheduler
+
+
+async def work(value, seconds=0.01):
+    await asyncio.sleep(seconds)
+    return value
+
+
+def test_calls_past_the_old_queue_cap_wait_their_turn():
+    async def main():
+        scheduler = ToolScheduler(limits={"web": 1}, timeout=5)
+        return await asyncio.gather(*(scheduler.run("web", work, i) for i in range(20)))
+
+    assert asyncio.run(main()) == list(range(20))
+
+
+def test_queued_call_that_misses_its_deadline_is_cancelled():
+    async def main():
+        scheduler = ToolScheduler(limits={"screen": 1}, timeout=5)
+        slow = asyncio.ensure_future(scheduler.run("screen", work, "slow", 0.3))
+        await asyncio.sleep(0)
+        late = await scheduler.run("screen", work, "late", timeout=0.05)
+        return await slow, late, scheduler.busy()
+
+    slow, late, busy = asyncio.run(main())
+    assert slow == "slow"
+    assert late.startswith("Sorry, that took longer than 0.05 seconds")
+    assert busy == {"screen": 0}